@@ -1,15 +1,12 @@
 
-import numpy as np
 from datetime import datetime
 import os
 import time
 import hashlib
-from flask import Flask, render_template, send_from_directory, request, jsonify
+from flask import Flask, Response, render_template, send_from_directory, request, jsonify
 from werkzeug.utils import secure_filename
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from ecg_processor import ECGProcessor
+from ecg_processor import ECGProcessor, warm_up as warm_up_processor
+from ecg_metrics import METRICS, PROMETHEUS_CONTENT_TYPE
 
 app = Flask(__name__,
             static_folder='static',
@@ -26,6 +23,13 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs('static', exist_ok=True)
 os.makedirs('reports', exist_ok=True)
 
+# 共享的分析处理器：只持有不可变配置，可被所有请求线程并发使用
+PROCESSOR = ECGProcessor()
+
+def warm_up():
+    # 由gunicorn的post_worker_init调用：本服务在请求进程内分析，先完成一次合成数据分析再接收请求
+    warm_up_processor(PROCESSOR)
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -126,7 +130,7 @@ def analyze_and_show():
         return "未找到有效数据文件", 404
         
     try:
-        processor = ECGProcessor()
+        processor = PROCESSOR
         success, results, _ = processor.analyze_ecg_file(valid_file)
         
         # 添加心率验证
@@ -149,11 +153,8 @@ def analyze_and_show():
 
 def generate_ecg_plot(signal):
     """生成移动端优化的ECG图"""
-    plt.figure(figsize=(10, 3), dpi=80)  # 更适合手机的尺寸
-    plt.plot(signal, linewidth=1)
-    plt.axis('off')  # 移除坐标轴
-    plt.savefig('static/ecg_mobile.png', bbox_inches='tight', pad_inches=0)
-    plt.close()
+    import ecg_render
+    ecg_render.plot_mobile_strip('static/ecg_mobile.png', signal)
 
 def generate_radar_chart(results):
     """生成移动端雷达图"""
@@ -165,17 +166,9 @@ def generate_radar_chart(results):
         1 - abs(results['wave_features']['t_waves']['average_qt_interval']-300)/100,
         results['hrv_analysis']['rmssd']/30
     ]
-    
-    angles = np.linspace(0, 2*np.pi, len(labels), endpoint=False)
-    fig = plt.figure(figsize=(6, 6))
-    ax = fig.add_subplot(111, polar=True)
-    ax.plot(angles, values, 'o-', linewidth=1)
-    ax.fill(angles, values, alpha=0.25)
-    ax.set_yticklabels([])
-    ax.set_xticks(angles)
-    ax.set_xticklabels(labels)
-    plt.savefig('static/radar_mobile.png', bbox_inches='tight')
-    plt.close()
+    import ecg_render
+    ecg_render.plot_radar('static/radar_mobile.png', labels, values, title=None,
+                          rmax=max(1, max(values)), template='mobile_radar', radial_labels=False)
 
 
 @app.route('/')
@@ -227,5 +220,10 @@ def upload_form():
 def health_check():
     return jsonify({"status": "healthy", "version": "1.0"})
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    # 各分析阶段耗时直方图（Prometheus文本格式，按worker进程统计）
+    return Response(METRICS.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
@@ -1,18 +1,16 @@
 from flask import send_file
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify
 from flask import Flask, send_from_directory
 from flask import Flask, render_template
 from flask import Flask, render_template, url_for
 
-import hashlib
-import time
 import os
+from werkzeug.http import parse_options_header
 from werkzeug.utils import secure_filename
-from ecg_processor import ECGProcessor  # 您的ECG处理类
+from ecg_processor import ECGProcessor, REPORT_DIR, REPORT_HTML, load_signal_sidecar  # 您的ECG处理类
+from ecg_stream import StreamingAnalysis, consume_multipart
+from ecg_auth import authenticate, extract_auth_params, release, report_token, verify_report_token
 
-import matplotlib
-matplotlib.use('Agg')  # 确保在无GUI环境下可用
-import matplotlib.pyplot as plt
 
 app = Flask(__name__, 
             static_folder='static',
@@ -25,39 +23,37 @@ os.makedirs('/app/data/ecg_uploads', exist_ok=True)
 os.makedirs('/app/static', exist_ok=True)
 os.makedirs('/app/reports', exist_ok=True)
 
-# 认证配置（实际应从环境变量读取）
-APP_CONFIG = {
-    'app1': {'secret': 'ECG_Service_Secret_2025!'}
-}
+# 共享的分析处理器：只持有不可变配置，可被所有请求线程并发使用
+PROCESSOR = ECGProcessor()
+
+ALLOWED_EXTENSIONS = {'dat', 'csv'}
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-    
-def verify_signature(params):
-    try:
-        print(f"\n[DEBUG] Received params: {params}")
-        app_id = params['appId']
-        timestamp = params['time']  # 明确定义timestamp
-        
-        # 统一时间戳处理（兼容秒级和毫秒级）
-        timestamp_seconds = float(timestamp) / 1000 if len(timestamp) > 10 else float(timestamp)
-        if abs(time.time() - timestamp_seconds) > 300:
-            print(f"[ERROR] Timestamp expired: {timestamp}")
-            return False
-
-        device_id = params['id']
-        sign = params['sign']
-        app_secret = APP_CONFIG.get(app_id, {}).get('secret', '')
-        
-        raw_str = f"{app_id}|{timestamp}|{device_id}|{app_secret}"
-        server_sign = hashlib.md5(raw_str.encode()).hexdigest()
-        
-        print(f"[DEBUG] Client sign: {sign}")
-        print(f"[DEBUG] Server sign: {server_sign}")
-        
-        return sign == server_sign
-    except Exception as e:
-        print(f"[ERROR] Auth failed: {str(e)}")
+
+
+def signal_url(name):
+    # 原始信号文件的URL（带访问令牌）
+    return url_for('signal_file', token=report_token(name), name=name)
+
+
+def authenticate_request(params):
+    # 校验通过后记录本次请求占用的nonce，请求最终未成功时由 release_failed_auth 释放
+    if not authenticate(params):
         return False
+    g.auth_params = params
+    return True
+
+
+@app.after_request
+def release_failed_auth(response):
+    # 上传中断、参数/数据无效或分析失败的请求不占用nonce，客户端可以用同一签名重试
+    params = g.pop('auth_params', None)
+    if params is not None:
+        payload = response.get_json(silent=True) or {}
+        if payload.get('code') not in (200, 202):
+            release(params)
+    return response
 
 
 @app.route('/static/<path:filename>')
@@ -91,7 +87,7 @@ def upload_form():
 @app.route('/analyze_and_show_before')
 def analyze_and_show_before():
     try:
-        processor = ECGProcessor()
+        processor = PROCESSOR
         filepath = "/tmp/uploads/test.dat"
         
         # 验证文件存在
@@ -103,11 +99,12 @@ def analyze_and_show_before():
         if not success:
             return f"分析失败: {results}", 500
             
-        # 验证报告生成
-        if not report or not os.path.exists(report.get('html_report', '')):
+        # 按需生成HTML报告
+        html_report = processor.render_artifact(report['report_id'], REPORT_HTML)
+        if not html_report:
             return "报告生成失败", 500
             
-        return send_file(report['html_report'])
+        return send_file(html_report)
         
     except Exception as e:
         return f"服务器错误: {str(e)}", 500
@@ -119,15 +116,13 @@ def analyze_and_show():
         analysis_results = generate_ecg_analysis()
         
         # 2. 生成图片
-        plt.figure(figsize=(12,4))
-        plt.plot(analysis_results['basic_info']['ecg_signal'][:1000])  # 示例数据
-        plt.title('ECG Signal')
+        ecg_signal = load_signal_sidecar(analysis_results['basic_info']['signal_file'])[:1000]  # 示例数据
         
         # 确保目录存在
         os.makedirs('static', exist_ok=True)
         web_img_path = 'static/ecg_web.png'
-        plt.savefig(web_img_path)
-        plt.close()
+        import ecg_render
+        ecg_render.plot_segment(web_img_path, ecg_signal, title='ECG Signal', template='web_segment', axis_labels=False)
         
         # 3. 准备模板数据
         template_data = {
@@ -162,52 +157,81 @@ def index():
 def health_check():
     return jsonify({"status": "healthy", "version": "1.0"})
 
+@app.route('/api/signal/<token>/<name>')
+def signal_file(token, name):
+    # 原始信号（npy格式），客户端按需下载；与报告相同，需要分析响应中签发的访问令牌
+    if not verify_report_token(name, token):
+        return jsonify({'code': 403, 'message': 'Invalid or expired signal token'}), 403
+    response = send_from_directory(REPORT_DIR, name, mimetype='application/octet-stream')
+    response.cache_control.private = True
+    return response
+
+
 @app.route('/api/analyze', methods=['POST'])  # 取消注释并修复此路由
 def analyze():
-    # 验证参数
+    # 边上传边解析：文件数据直接送入解码/滤波阶段，不再保存临时文件
+    mimetype, options = parse_options_header(request.content_type)
+    if mimetype != 'multipart/form-data' or 'boundary' not in options:
+        return jsonify({'code': 400, 'message': 'Invalid content type'})
+
+    # 认证参数在请求头/查询参数中时，读取请求体之前就完成校验
+    header_auth = extract_auth_params(request.headers, request.args)
+    if header_auth is not None and not authenticate_request(header_auth):
+        return jsonify({'code': 403, 'message': 'Authentication failed'})
+
+    processor = PROCESSOR
+
+    def open_upload(name, filename):
+        if name != 'file' or not allowed_file(filename):
+            return None
+        return StreamingAnalysis(fs=processor.fs)
+
+    try:
+        form, files = consume_multipart(request.stream, options['boundary'].encode(), open_upload)
+    except ValueError as e:
+        return jsonify({'code': 400, 'message': f'Invalid form data: {e}'})
+
+    # 验证参数（兼容认证参数放在表单中的旧客户端）
+    params = {**form, **header_auth} if header_auth is not None else form
     required_fields = ['appId', 'time', 'id', 'sign', 'servertype']
-    if not all(field in request.form for field in required_fields):
+    if not all(field in params for field in required_fields):
         return jsonify({'code': 400, 'message': 'Missing parameters'})
     
-    if not verify_signature(request.form):
+    if header_auth is None and not authenticate_request(params):
         return jsonify({'code': 403, 'message': 'Authentication failed'})
     
     # 检查文件
-    if 'file' not in request.files:
+    if 'file' not in files:
         return jsonify({'code': 400, 'message': 'No file uploaded'})
     
-    file = request.files['file']
-    if file.filename == '' or not allowed_file(file.filename):
+    filename, upload = files['file']
+    if filename == '' or upload is None:
         return jsonify({'code': 400, 'message': 'Invalid file'})
     
     # 处理请求
-    server_type = request.form['servertype']
+    server_type = params['servertype']
     if server_type == 'ECG':
         try:
-            # 保存文件
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(UPLOAD_FOLDER, filename)
-            file.save(filepath)
-            
-            # 调用ECG处理器
-            processor = ECGProcessor()
-            success, results, report = processor.analyze_ecg_file(filepath)
+            # 完成滤波反向半程并调用ECG处理器
+            ecg_signal, filtered_signal = upload.finish()
+            # 本服务没有报告文件路由，HTML报告随分析一并生成
+            success, results, report = processor.analyze_signal(
+                ecg_signal, secure_filename(filename), filtered_signal, render_report=True)
             
             if success:
                 return jsonify({
                     'code': 200,
                     'data': {
                         'report': results,
-                        'html_path': report['html_report'] if report else None
+                        'html_path': report['html_report'],
+                        'report_id': report['report_id'],
+                        'signal_url': signal_url(results['basic_info']['signal_file'])
                     }
                 })
             else:
                 return jsonify({'code': 500, 'message': results.get('error', 'Analysis failed')})
         except Exception as e:
             return jsonify({'code': 500, 'message': str(e)})
-        finally:
-            if os.path.exists(filepath):
-                os.remove(filepath)
     else:
         return jsonify({'code': 400, 'message': f'Unsupported server type: {server_type}'})
 
@@ -1,9 +1,17 @@
 import os
-from flask import Flask, render_template
-import matplotlib
-matplotlib.use('Agg')  # 必须放在pyplot导入前
-import matplotlib.pyplot as plt
-from ecg_processor import ECGProcessor  # 导入ECGProcessor类
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, g, render_template, request, jsonify, send_file, send_from_directory, url_for
+from werkzeug.http import parse_options_header
+from werkzeug.utils import secure_filename
+from ecg_processor import (ECGProcessor, REPORT_DIR, REPORT_ARTIFACTS, REPORT_HTML,  # 导入ECGProcessor类
+                           load_report_waveform, save_signal_sidecar, report_artifact_path)
+from ecg_waveform import WAVEFORM_ENCODINGS, WAVEFORM_MAX_WIDTH, WAVEFORM_WIDTH
+from ecg_metrics import METRICS, PROMETHEUS_CONTENT_TYPE
+from ecg_stream import StreamingAnalysis, consume_multipart, CHUNK_SIZE
+from ecg_live import LiveSessionRegistry
+from ecg_auth import authenticate, extract_auth_params, release, report_token, verify_report_token
+from ecg_jobs import JobQueue
+from ecg_pool import AnalysisPool
 
 app = Flask(__name__,
             static_folder='static',
@@ -14,39 +22,77 @@ os.makedirs('/app/data/ecg_uploads', exist_ok=True)
 os.makedirs('/app/static', exist_ok=True)
 os.makedirs('/app/reports', exist_ok=True)
 
-# 认证配置（实际应从环境变量读取）
-APP_CONFIG = {
-    'app1': {'secret': 'ECG_Service_Secret_2025!'}
-}
+ALLOWED_EXTENSIONS = {'dat', 'csv'}
+MAX_BATCH_FILES = 50
+
+# 批量分析线程池（numpy/scipy计算会释放GIL）
+BATCH_EXECUTOR = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+
+# 共享的分析处理器：只持有不可变配置，可被所有请求线程并发使用
+PROCESSOR = ECGProcessor()
+
+# 实时心电流会话（每次推送是一个短请求，不为每路连接常驻线程）
+LIVE_SESSIONS = LiveSessionRegistry(lambda: PROCESSOR)
+
+
+# 分析进程池：信号处理和报告渲染在独立进程中执行，超时/崩溃不影响Web进程
+ANALYSIS_POOL = AnalysisPool()
+
+
+def run_analysis_job(payload):
+    # 后台任务：交给分析进程池完成分析（报告文件在首次访问时渲染）
+    success, results, report = ANALYSIS_POOL.analyze_file(payload['signal_file'], payload['filename'])
+    if not success:
+        raise RuntimeError(results.get('error', 'Analysis failed'))
+    return {'report': results, 'report_id': report['report_id']}
+
+
+# 异步分析任务（SQLite持久化，重启后继续执行）
+ANALYSIS_JOBS = JobQueue(run_analysis_job)
+
+
+def warm_up():
+    # 由gunicorn的post_worker_init调用：启动并预热分析进程池、恢复未完成的后台任务，完成后才开始接收请求
+    ANALYSIS_POOL.start()
+    ANALYSIS_JOBS.start()
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-    
-def verify_signature(params):
-    try:
-        print(f"\n[DEBUG] Received params: {params}")
-        app_id = params['appId']
-        timestamp = params['time']  # 明确定义timestamp
-        
-        # 统一时间戳处理（兼容秒级和毫秒级）
-        timestamp_seconds = float(timestamp) / 1000 if len(timestamp) > 10 else float(timestamp)
-        if abs(time.time() - timestamp_seconds) > 300:
-            print(f"[ERROR] Timestamp expired: {timestamp}")
-            return False
-
-        device_id = params['id']
-        sign = params['sign']
-        app_secret = APP_CONFIG.get(app_id, {}).get('secret', '')
-        
-        raw_str = f"{app_id}|{timestamp}|{device_id}|{app_secret}"
-        server_sign = hashlib.md5(raw_str.encode()).hexdigest()
-        
-        print(f"[DEBUG] Client sign: {sign}")
-        print(f"[DEBUG] Server sign: {server_sign}")
-        
-        return sign == server_sign
-    except Exception as e:
-        print(f"[ERROR] Auth failed: {str(e)}")
+
+
+def authenticate_request(params):
+    # 校验通过后记录本次请求占用的nonce，请求最终未成功时由 release_failed_auth 释放
+    if not authenticate(params):
         return False
+    g.auth_params = params
+    return True
+
+
+@app.after_request
+def release_failed_auth(response):
+    # 上传中断、参数/数据无效或分析失败的请求不占用nonce，客户端可以用同一签名重试
+    params = g.pop('auth_params', None)
+    if params is not None:
+        payload = response.get_json(silent=True) or {}
+        if payload.get('code') not in (200, 202):
+            release(params)
+    return response
+
+
+def signal_url(name):
+    # 原始信号文件的URL（带访问令牌）
+    return url_for('signal_file', token=report_token(name), name=name)
+
+
+def report_urls(report_id):
+    # HTML报告和各图表的URL，首次访问时才渲染；URL带有访问令牌（报告内容为患者心电数据）
+    token = report_token(report_id)
+    return {
+        'report_url': url_for('report_artifact', report_id=report_id, token=token, name=REPORT_HTML),
+        'waveform_url': url_for('report_waveform', report_id=report_id, token=token),
+        'plot_urls': {name: url_for('report_artifact', report_id=report_id, token=token, name=name)
+                      for name in REPORT_ARTIFACTS if name != REPORT_HTML}
+    }
 
 
 @app.route('/')
@@ -55,8 +101,14 @@ def index():
     <h1>ECG Analysis Service</h1>
     <p>Available endpoints:</p>
     <ul>
-        <li>POST /api/analyze - ECG analysis endpoint</li>
+        <li>POST /api/analyze - ECG analysis endpoint (?async=1 returns a job id)</li>
+        <li>GET /api/jobs/&lt;id&gt; - Async analysis job status and result</li>
+        <li>GET /api/report/&lt;report_id&gt;/&lt;file&gt; - HTML report and plots (rendered on first request)</li>
+        <li>GET /api/report/&lt;report_id&gt;/waveform - Compact waveform and beat annotations for client-side drawing</li>
+        <li>POST /api/analyze/batch - Batch ECG analysis (multiple files)</li>
+        <li>POST /api/stream - Open a live ECG stream; POST/DELETE /api/stream/&lt;id&gt; - push samples / close</li>
         <li>GET /api/health - Health check</li>
+        <li>GET /api/metrics - Per-stage analysis timing histograms (Prometheus text format)</li>
     </ul>
     """
 app.route('/static/<path:filename>')
@@ -90,31 +142,25 @@ def upload_form():
 def health_check():
     return jsonify({"status": "healthy", "version": "1.0"})
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    # 各分析阶段耗时直方图（Prometheus文本格式，按worker进程统计）
+    return Response(METRICS.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 @app.route('/analyze_and_show')
 def analyze_and_show():
     try:
         # 1. 初始化处理器并分析ECG
-        processor = ECGProcessor()
+        processor = PROCESSOR
         filepath = '/tmp/uploads/test.dat'  # 使用容器内的绝对路径
         success, analysis_results, report = processor.analyze_ecg_file(filepath)
 
         if not success:
             raise Exception("ECG analysis failed")
 
-        # 2. 生成图片
-        plt.figure(figsize=(12,4))
-        
-        # 使用实际ECG信号数据（前1000个点作为示例）
-        ecg_signal = analysis_results['basic_info']['ecg_signal'][:1000]
-        plt.plot(ecg_signal)
-        plt.title('ECG Signal')
-        
-        # 确保目录存在
-        os.makedirs('static', exist_ok=True)
-        web_img_path = 'static/ecg_web.png'
-        plt.savefig(web_img_path)
-        plt.close()
-        
+        # 2. 心电图由浏览器根据紧凑波形数据绘制，雷达图/风险图在首次请求时渲染
+        urls = report_urls(report['report_id'])
+
         # 3. 准备模板数据（精简数据）
         template_data = {
             'basic_info': {
@@ -124,7 +170,8 @@ def analyze_and_show():
             },
             'wave_features': analysis_results['wave_features'],
             'hrv_analysis': analysis_results['hrv_analysis'],
-            'plot_filename': 'ecg_web.png'  # 图片文件名
+            'waveform_url': urls['waveform_url'],
+            'plot_urls': urls['plot_urls']
         }
         
         return render_template('analysis_report.html', **template_data)
@@ -134,55 +181,281 @@ def analyze_and_show():
         return "Internal Server Error", 500
 
 
+@app.route('/api/signal/<token>/<name>')
+def signal_file(token, name):
+    # 原始信号（npy格式），客户端按需下载；与报告相同，需要分析响应中签发的访问令牌
+    if not verify_report_token(name, token):
+        return jsonify({'code': 403, 'message': 'Invalid or expired signal token'}), 403
+    response = send_from_directory(REPORT_DIR, name, mimetype='application/octet-stream')
+    response.cache_control.private = True
+    return response
+
+
+@app.route('/api/report/<report_id>/<token>/waveform')
+def report_waveform(report_id, token):
+    # 紧凑波形（抽取后的采样值+R/P/T标注），由客户端绘制，服务器不渲染波形图片
+    if not verify_report_token(report_id, token):
+        return jsonify({'code': 403, 'message': 'Invalid or expired report token'}), 403
+    encoding = request.args.get('encoding', 'delta')
+    if encoding not in WAVEFORM_ENCODINGS:
+        return jsonify({'code': 400, 'message': 'Invalid encoding'}), 400
+    width = min(max(request.args.get('width', WAVEFORM_WIDTH, type=int), 100), WAVEFORM_MAX_WIDTH)
+    data = load_report_waveform(report_id, width, encoding)
+    if data is None:
+        return jsonify({'code': 404, 'message': 'Report not found'}), 404
+    response = jsonify({'code': 200, 'data': data})
+    # 报告ID由数据内容和分析配置决定，同一URL的内容不会变化；
+    # 患者数据只允许客户端自身缓存（private），不由代理/CDN共享，过期后按ETag重新验证
+    response.cache_control.private = True
+    response.cache_control.max_age = 86400
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@app.route('/api/report/<report_id>/<token>/<name>')
+def report_artifact(report_id, token, name):
+    # 报告文件按需生成：首次请求时由分析进程池渲染并保存，之后直接返回文件
+    if not verify_report_token(report_id, token):
+        return jsonify({'code': 403, 'message': 'Invalid or expired report token'}), 403
+    path = report_artifact_path(report_id, name)
+    if path is None:
+        return jsonify({'code': 404, 'message': 'Report not found'}), 404
+    if not os.path.exists(path):
+        try:
+            path = ANALYSIS_POOL.render(report_id, name)
+        except Exception as e:
+            return jsonify({'code': 500, 'message': str(e)}), 500
+        if path is None:
+            return jsonify({'code': 404, 'message': 'Report not found'}), 404
+    response = send_file(path)
+    response.cache_control.private = True
+    return response
+
+
 @app.route('/api/analyze', methods=['POST'])  # 取消注释并修复此路由
 def analyze():
-    # 验证参数
+    # 边上传边解析：文件数据直接送入解码/滤波阶段，不再保存临时文件
+    mimetype, options = parse_options_header(request.content_type)
+    if mimetype != 'multipart/form-data' or 'boundary' not in options:
+        return jsonify({'code': 400, 'message': 'Invalid content type'})
+
+    # 认证参数在请求头/查询参数中时，读取请求体之前就完成校验
+    header_auth = extract_auth_params(request.headers, request.args)
+    if header_auth is not None and not authenticate_request(header_auth):
+        return jsonify({'code': 403, 'message': 'Authentication failed'})
+
+    def open_upload(name, filename):
+        if name != 'file' or not allowed_file(filename):
+            return None
+        return StreamingAnalysis(fs=ANALYSIS_POOL.fs, filtering=False)
+
+    try:
+        form, files = consume_multipart(request.stream, options['boundary'].encode(), open_upload)
+    except ValueError as e:
+        return jsonify({'code': 400, 'message': f'Invalid form data: {e}'})
+
+    # 验证参数（兼容认证参数放在表单中的旧客户端）
+    params = {**form, **header_auth} if header_auth is not None else form
     required_fields = ['appId', 'time', 'id', 'sign', 'servertype']
-    if not all(field in request.form for field in required_fields):
+    if not all(field in params for field in required_fields):
         return jsonify({'code': 400, 'message': 'Missing parameters'})
     
-    if not verify_signature(request.form):
+    if header_auth is None and not authenticate_request(params):
         return jsonify({'code': 403, 'message': 'Authentication failed'})
     
     # 检查文件
-    if 'file' not in request.files:
+    if 'file' not in files:
         return jsonify({'code': 400, 'message': 'No file uploaded'})
     
-    file = request.files['file']
-    if file.filename == '' or not allowed_file(file.filename):
+    filename, upload = files['file']
+    if filename == '' or upload is None:
         return jsonify({'code': 400, 'message': 'Invalid file'})
     
     # 处理请求
-    server_type = request.form['servertype']
+    server_type = params['servertype']
     if server_type == 'ECG':
         try:
-            # 保存文件
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(UPLOAD_FOLDER, filename)
-            file.save(filepath)
-            
-            # 调用ECG处理器
-            processor = ECGProcessor()
-            success, results, report = processor.analyze_ecg_file(filepath)
+            # 完成解码，交给分析进程池
+            ecg_signal, _ = upload.finish()
+            if request.args.get('async') == '1':
+                # 异步模式：信号落盘后立即返回任务ID，分析和报告渲染由后台线程完成
+                job_id = ANALYSIS_JOBS.submit({
+                    'filename': secure_filename(filename),
+                    'signal_file': save_signal_sidecar(ecg_signal)
+                })
+                return jsonify({
+                    'code': 202,
+                    'data': {
+                        'job_id': job_id,
+                        'status': 'queued',
+                        'status_url': url_for('job_status', job_id=job_id)
+                    }
+                })
+
+            success, results, report = ANALYSIS_POOL.analyze(ecg_signal, secure_filename(filename))
             
             if success:
                 return jsonify({
                     'code': 200,
                     'data': {
                         'report': results,
-                        'html_path': report['html_report'] if report else None
+                        'html_path': report['html_report'],
+                        'report_id': report['report_id'],
+                        'signal_url': signal_url(results['basic_info']['signal_file']),
+                        **report_urls(report['report_id'])
                     }
                 })
             else:
                 return jsonify({'code': 500, 'message': results.get('error', 'Analysis failed')})
         except Exception as e:
             return jsonify({'code': 500, 'message': str(e)})
-        finally:
-            if os.path.exists(filepath):
-                os.remove(filepath)
     else:
         return jsonify({'code': 400, 'message': f'Unsupported server type: {server_type}'})
 
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = ANALYSIS_JOBS.get(job_id)
+    if job is None:
+        return jsonify({'code': 404, 'message': 'Job not found'})
+
+    data = {
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'created': job['created'],
+        'updated': job['updated']
+    }
+    if job['status'] == 'done':
+        data.update(job['result'])
+        data['signal_url'] = signal_url(job['payload']['signal_file'])
+        data.update(report_urls(job['result']['report_id']))
+    elif job['status'] == 'failed':
+        data['message'] = job['error']
+    return jsonify({'code': 200, 'data': data})
+
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    # 一次请求上传多个记录：认证只做一次，记录按分析进程分组并行分析，组内疾病风险一次评分
+    mimetype, options = parse_options_header(request.content_type)
+    if mimetype != 'multipart/form-data' or 'boundary' not in options:
+        return jsonify({'code': 400, 'message': 'Invalid content type'})
+
+    header_auth = extract_auth_params(request.headers, request.args)
+    if header_auth is not None and not authenticate_request(header_auth):
+        return jsonify({'code': 403, 'message': 'Authentication failed'})
+
+    def open_upload(name, filename):
+        if name != 'file' or not allowed_file(filename):
+            return None
+        return StreamingAnalysis(fs=ANALYSIS_POOL.fs, filtering=False)
+
+    try:
+        form, files = consume_multipart(request.stream, options['boundary'].encode(), open_upload)
+    except ValueError as e:
+        return jsonify({'code': 400, 'message': f'Invalid form data: {e}'})
+
+    params = {**form, **header_auth} if header_auth is not None else form
+    required_fields = ['appId', 'time', 'id', 'sign', 'servertype']
+    if not all(field in params for field in required_fields):
+        return jsonify({'code': 400, 'message': 'Missing parameters'})
+
+    if header_auth is None and not authenticate_request(params):
+        return jsonify({'code': 403, 'message': 'Authentication failed'})
+
+    uploads = files.getlist('file')
+    if not uploads:
+        return jsonify({'code': 400, 'message': 'No file uploaded'})
+    if len(uploads) > MAX_BATCH_FILES:
+        return jsonify({'code': 400, 'message': f'Too many files (max {MAX_BATCH_FILES})'})
+
+    server_type = params['servertype']
+    if server_type != 'ECG':
+        return jsonify({'code': 400, 'message': f'Unsupported server type: {server_type}'})
+
+    items = [None] * len(uploads)
+    signals = []
+    for i, (filename, analysis) in enumerate(uploads):
+        if filename == '' or analysis is None:
+            items[i] = {'filename': filename, 'code': 400, 'message': 'Invalid file'}
+            continue
+        try:
+            ecg_signal, _ = analysis.finish()
+        except Exception as e:
+            items[i] = {'filename': filename, 'code': 500, 'message': str(e)}
+            continue
+        signals.append((i, ecg_signal, secure_filename(filename)))
+
+    # 按分析进程数分组并行：每组在一个分析进程中完成，组内所有记录的疾病风险一次评分
+    groups = [group for group in (signals[k::ANALYSIS_POOL.workers] for k in range(ANALYSIS_POOL.workers)) if group]
+
+    def analyze_group(group):
+        return ANALYSIS_POOL.analyze_many([(ecg_signal, name) for _, ecg_signal, name in group])
+
+    for group, outcomes in zip(groups, BATCH_EXECUTOR.map(analyze_group, groups)):
+        for (i, _, _), (success, results, report) in zip(group, outcomes):
+            filename = uploads[i][0]
+            if not success:
+                items[i] = {'filename': filename, 'code': 500, 'message': results.get('error', 'Analysis failed')}
+                continue
+            items[i] = {'filename': filename, 'code': 200, 'report': results, 'report_id': report['report_id'],
+                        'signal_url': signal_url(results['basic_info']['signal_file']),
+                        **report_urls(report['report_id'])}
+
+    return jsonify({'code': 200, 'data': {'count': len(items), 'results': items}})
+
+
+@app.route('/api/stream', methods=['POST'])
+def stream_open():
+    # 认证参数放在请求头/查询参数中；返回的session_id用于后续推送
+    params = extract_auth_params(request.headers, request.args)
+    if params is None:
+        return jsonify({'code': 400, 'message': 'Missing parameters'})
+    if not authenticate_request(params):
+        return jsonify({'code': 403, 'message': 'Authentication failed'})
+
+    try:
+        session = LIVE_SESSIONS.open(request.args.get('format'))
+    except ValueError as e:
+        return jsonify({'code': 400, 'message': str(e)})
+    if session is None:
+        return jsonify({'code': 503, 'message': 'Too many live sessions'})
+    return jsonify({'code': 200, 'data': {'session_id': session.session_id, 'fs': session.fs}})
+
+
+@app.route('/api/stream/<session_id>', methods=['POST'])
+def stream_push(session_id):
+    # 请求体为原始数据（戒指文本分包/CSV行/int16），返回本次检出的R峰和最新滚动指标
+    session = LIVE_SESSIONS.get(session_id)
+    if session is None:
+        return jsonify({'code': 404, 'message': 'Unknown or expired session'})
+
+    with session.lock:
+        peaks = []
+        try:
+            while True:
+                chunk = request.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                peaks.extend(session.feed(chunk).tolist())
+        except ValueError as e:
+            return jsonify({'code': 400, 'message': f'Invalid data: {e}'})
+        data = session.status()
+    data['r_peaks'] = peaks
+    return jsonify({'code': 200, 'data': data})
+
+
+@app.route('/api/stream/<session_id>', methods=['DELETE'])
+def stream_close(session_id):
+    session = LIVE_SESSIONS.close(session_id)
+    if session is None:
+        return jsonify({'code': 404, 'message': 'Unknown or expired session'})
+    with session.lock:
+        peaks = session.finish().tolist()
+        data = session.status()
+    data['r_peaks'] = peaks
+    return jsonify({'code': 200, 'data': data})
+
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -3,10 +3,7 @@ import time
 import hashlib
 from flask import Flask, render_template, send_from_directory, request, jsonify
 from werkzeug.utils import secure_filename
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from ecg_processor import ECGProcessor
+from ecg_processor import ECGProcessor, load_signal_sidecar
 
 app = Flask(__name__,
             static_folder='static',
@@ -23,6 +20,9 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs('static', exist_ok=True)
 os.makedirs('reports', exist_ok=True)
 
+# 共享的分析处理器：只持有不可变配置，可被所有请求线程并发使用
+PROCESSOR = ECGProcessor()
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -45,7 +45,7 @@ def verify_signature(params):
 @app.route('/analyze_and_show')
 def analyze_and_show():
     try:
-        processor = ECGProcessor()
+        processor = PROCESSOR
         filepath = '/tmp/uploads/test.dat'  # 使用容器内的绝对路径
         
         if not os.path.exists(filepath):
@@ -56,14 +56,10 @@ def analyze_and_show():
             raise Exception("ECG analysis failed")
 
         # 生成图片
-        plt.figure(figsize=(12,4))
-        ecg_signal = analysis_results['basic_info']['ecg_signal'][:1000]
-        plt.plot(ecg_signal)
-        plt.title('ECG Signal')
-        
+        ecg_signal = load_signal_sidecar(analysis_results['basic_info']['signal_file'])[:1000]
         web_img_path = 'static/ecg_web.png'
-        plt.savefig(web_img_path)
-        plt.close()
+        import ecg_render
+        ecg_render.plot_segment(web_img_path, ecg_signal, title='ECG Signal', template='web_segment', axis_labels=False)
 
         return render_template('analysis_report.html',
                              basic_info={
@@ -0,0 +1,66 @@
+"""
+HRV复杂度指标与nolds的结果和耗时对比：样本熵、DFA α1/α2（nolds未提供近似熵，只统计本实现耗时）
+用法: python benchmarks/bench_complexity.py [NN间期个数...]
+nolds需单独安装（pip install --no-index --find-links=pypi-packages nolds），不是服务依赖
+"""
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ecg_hrv import DFA_LONG, DFA_SHORT, approximate_entropy, dfa, sample_entropy  # noqa: E402
+
+NOLDS_MAX_POINTS = 5000   # nolds样本熵为逐行距离计算，超过该长度不再运行
+
+
+def synthetic_nn(n, seed=0):
+    """带慢变化趋势的NN间期序列（毫秒，按4ms量化，与250Hz采样一致）"""
+    rng = np.random.default_rng(seed)
+    nn = 800 + 0.5 * np.cumsum(rng.standard_normal(n)) + 25 * rng.standard_normal(n)
+    return np.round(nn / 4) * 4
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    value = fn(*args, **kwargs)
+    return value, time.perf_counter() - start
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 5000, 30000]
+    try:
+        import nolds
+    except ImportError:
+        nolds = None
+        print("未安装nolds，只输出本实现的结果和耗时")
+    warnings.simplefilter('ignore', RuntimeWarning)
+    sample_entropy(synthetic_nn(100))   # 预先导入scipy.spatial，不计入首次耗时
+
+    print(f"{'指标':<12}{'点数':>8}{'本实现':>14}{'nolds':>14}{'耗时(s)':>10}{'nolds(s)':>10}{'加速':>8}")
+    for n in sizes:
+        nn = synthetic_nn(n)
+        tolerance = 0.2 * np.std(nn, ddof=1)
+        cases = [
+            ('SampEn', lambda: sample_entropy(nn, tolerance=tolerance),
+             lambda: nolds.sampen(nn, emb_dim=2, tolerance=tolerance), n <= NOLDS_MAX_POINTS),
+            ('ApEn', lambda: approximate_entropy(nn, tolerance=tolerance), None, False),
+            ('DFA α1', lambda: dfa(nn, DFA_SHORT),
+             lambda: nolds.dfa(nn, nvals=list(DFA_SHORT), overlap=False, order=1), True),
+            ('DFA α2', lambda: dfa(nn, DFA_LONG),
+             lambda: nolds.dfa(nn, nvals=list(DFA_LONG), overlap=False, order=1), True),
+        ]
+        for name, ours, reference, run_reference in cases:
+            value, elapsed = timed(ours)
+            if nolds is not None and reference is not None and run_reference:
+                ref_value, ref_elapsed = timed(reference)
+                print(f"{name:<12}{n:>8}{value:>14.6f}{ref_value:>14.6f}{elapsed:>10.3f}{ref_elapsed:>10.3f}"
+                      f"{ref_elapsed / elapsed:>8.0f}x")
+            else:
+                print(f"{name:<12}{n:>8}{value:>14.6f}{'-':>14}{elapsed:>10.3f}{'-':>10}{'-':>8}")
+
+
+if __name__ == '__main__':
+    main()
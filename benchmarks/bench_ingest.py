@@ -0,0 +1,63 @@
+"""
+数据加载吞吐量对比：.dat（int16二进制）与 .csv（单列 / 时间戳+数值）
+用法: python benchmarks/bench_ingest.py [时长(分钟)]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ecg_loader import load_ecg_recording  # noqa: E402
+
+FS = 250
+
+
+def synthetic_signal(minutes):
+    n = int(minutes * 60 * FS)
+    t = np.arange(n) / FS
+    return (9800 + 600 * np.sin(2 * np.pi * 1.2 * t) + np.random.randint(-30, 30, n)).astype(np.int16)
+
+
+def write_files(signal, tmpdir):
+    paths = {}
+    paths['dat'] = os.path.join(tmpdir, 'rec.dat')
+    signal.astype('<i2').tofile(paths['dat'])
+
+    paths['csv (单列)'] = os.path.join(tmpdir, 'single.csv')
+    np.savetxt(paths['csv (单列)'], signal, fmt='%d', header='ecg', comments='')
+
+    paths['csv (时间戳,数值)'] = os.path.join(tmpdir, 'ts.csv')
+    t = np.arange(len(signal)) / FS
+    np.savetxt(paths['csv (时间戳,数值)'], np.column_stack([t, signal]),
+               fmt=['%.3f', '%d'], delimiter=',', header='time,ecg', comments='')
+    return paths
+
+
+def bench(path, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        recording = load_ecg_recording(path, fs=FS)
+        float(np.sum(recording.signal, dtype=np.int64))  # 确保数据真正被读取
+        best = min(best, time.perf_counter() - start)
+    return best, recording.samples
+
+
+def main():
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+    signal = synthetic_signal(minutes)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = write_files(signal, tmpdir)
+        print(f"{'格式':<20}{'文件大小(MB)':>14}{'耗时(s)':>10}{'MB/s':>10}{'百万采样点/s':>16}")
+        for name, path in paths.items():
+            size_mb = os.path.getsize(path) / 1e6
+            elapsed, samples = bench(path)
+            print(f"{name:<20}{size_mb:>14.1f}{elapsed:>10.3f}{size_mb / elapsed:>10.1f}"
+                  f"{samples / elapsed / 1e6:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
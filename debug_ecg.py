@@ -1,11 +1,13 @@
-import numpy as np
+from ecg_loader import load_ecg_recording
 from ecg_processor import ECGProcessor
 
 def debug_analysis(filepath):
     print("\n===== 开始调试分析 =====")
     
     # 加载原始数据
-    raw_signal = np.fromfile(filepath, dtype='>i2')
+    recording = load_ecg_recording(filepath)
+    raw_signal = recording.signal
+    print(f"数据格式：{recording.data_format}")
     print(f"原始数据长度：{len(raw_signal)} 采样点")
     print(f"前10个采样值：{raw_signal[:10]}")
     
@@ -0,0 +1,153 @@
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+# 认证配置（实际应从环境变量读取）
+APP_CONFIG = {
+    'app1': {'secret': 'ECG_Service_Secret_2025!'}
+}
+
+SIGNATURE_WINDOW = 300   # 时间戳允许的偏差（秒）
+REPORT_URL_TTL = 24 * 3600   # 报告/原始信号URL（含访问令牌）的有效期（秒）
+# 报告URL令牌的签名密钥；未配置时每次启动随机生成（重启后已签发的报告URL失效）
+REPORT_URL_SECRET = os.environ.get('ECG_REPORT_URL_SECRET') or secrets.token_hex(32)
+SIGNATURE_FIELDS = ('appId', 'time', 'id', 'sign')
+
+# 认证参数也可放在请求头中，这样无需读取请求体即可完成校验
+AUTH_HEADERS = {
+    'appId': 'X-ECG-App-Id',
+    'time': 'X-ECG-Time',
+    'id': 'X-ECG-Device-Id',
+    'sign': 'X-ECG-Sign',
+    'servertype': 'X-ECG-Server-Type',
+    'nonce': 'X-ECG-Nonce',
+}
+
+
+class NonceCache:
+    """
+    有容量上限和过期时间的防重放缓存（记录客户端nonce，旧客户端记录签名）。
+    缓存在进程内存中，只在同一进程内拒绝重放：部署依赖 gunicorn.conf.py 中 workers = 1，
+    增加worker时需要改为各进程共享的存储
+    """
+
+    def __init__(self, max_size=100000, ttl=SIGNATURE_WINDOW):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, nonce, now=None):
+        """记录一个nonce；已在有效期内出现过则返回False"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._expire(now)
+            if nonce in self._seen:
+                return False
+            self._seen[nonce] = now + self.ttl
+            if len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+            return True
+
+    def discard(self, nonce):
+        """移除记录（请求未成功处理时调用，客户端可以重试）"""
+        with self._lock:
+            self._seen.pop(nonce, None)
+
+    def _expire(self, now):
+        # 按插入顺序排列，过期时间单调递增，只需从头部清理
+        while self._seen:
+            nonce, expires = next(iter(self._seen.items()))
+            if expires > now:
+                break
+            self._seen.popitem(last=False)
+
+    def __len__(self):
+        return len(self._seen)
+
+
+REPLAY_CACHE = NonceCache()
+
+
+def extract_auth_params(headers, args):
+    """
+    从请求头或查询参数中提取认证参数（不读取请求体）
+    返回:
+        参数字典；签名字段不完整时返回None
+    """
+    params = {}
+    for field, header in AUTH_HEADERS.items():
+        value = headers.get(header) or args.get(field)
+        if value:
+            params[field] = value
+    if not all(field in params for field in SIGNATURE_FIELDS):
+        return None
+    return params
+
+
+def verify_signature(params):
+    try:
+        app_id = params['appId']
+        timestamp = params['time']
+        timestamp_seconds = float(timestamp) / 1000 if len(timestamp) > 10 else float(timestamp)
+        if abs(time.time() - timestamp_seconds) > SIGNATURE_WINDOW:
+            return False
+
+        device_id = params['id']
+        sign = params['sign']
+        app_secret = APP_CONFIG.get(app_id, {}).get('secret', '')
+        nonce = params.get('nonce')
+        if nonce:
+            # 客户端随机数参与签名：同一秒内参数相同的两次上传签名也不同
+            raw_str = f"{app_id}|{timestamp}|{device_id}|{nonce}|{app_secret}"
+        else:
+            raw_str = f"{app_id}|{timestamp}|{device_id}|{app_secret}"
+        return hmac.compare_digest(sign, hashlib.md5(raw_str.encode()).hexdigest())
+    except Exception:
+        return False
+
+
+def replay_key(params):
+    """防重放标识：客户端nonce，未提供时（旧客户端）为签名本身"""
+    return params.get('nonce') or params['sign']
+
+
+def authenticate(params, replay_cache=REPLAY_CACHE):
+    """
+    校验签名，并拒绝在有效期内重复使用的nonce。
+    校验通过即占用该nonce（并发的重放请求只有一个能通过）；请求最终未成功时应调用 release()
+    """
+    return verify_signature(params) and replay_cache.add(replay_key(params))
+
+
+def release(params, replay_cache=REPLAY_CACHE):
+    """释放已占用的nonce：上传中断、数据无效或分析失败的请求可以用同一签名重试"""
+    replay_cache.discard(replay_key(params))
+
+
+def report_token(report_id, now=None):
+    """
+    签发报告访问令牌（放在报告URL路径中，HTML报告内相对路径引用的图表同样带有令牌）；
+    原始信号文件以文件名代替report_id签发
+    返回:
+        "<过期时间>-<HMAC>"
+    """
+    expires = int((time.time() if now is None else now) + REPORT_URL_TTL)
+    return f"{expires}-{_report_mac(report_id, expires)}"
+
+
+def verify_report_token(report_id, token, now=None):
+    """校验报告访问令牌：签名匹配且未过期"""
+    expires, _, mac = token.partition('-')
+    if not expires.isdigit() or int(expires) < (time.time() if now is None else now):
+        return False
+    return hmac.compare_digest(mac, _report_mac(report_id, int(expires)))
+
+
+def _report_mac(report_id, expires):
+    message = f"{report_id}|{expires}".encode()
+    return hmac.new(REPORT_URL_SECRET.encode(), message, hashlib.sha256).hexdigest()[:32]
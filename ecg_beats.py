@@ -0,0 +1,51 @@
+import numpy as np
+
+
+class BeatMatrix:
+    """
+    以R峰为基准的心拍窗口矩阵：每个R峰一行，列为相对R峰的采样点偏移 [start, end)。
+    一次花式索引取出所有心拍，QRS/P/T/ST各项分析按列区间做向量化统计；
+    越过信号两端的采样点由 valid 标记，不参与统计
+    """
+
+    def __init__(self, ecg, r_peaks, start, end):
+        self.r_peaks = np.asarray(r_peaks, dtype=np.int64)
+        self.start = start
+        self.end = end
+        self.n = len(ecg)
+        index = self.r_peaks[:, None] + np.arange(start, end)
+        self.valid = (index >= 0) & (index < self.n)
+        self.values = np.asarray(ecg)[np.clip(index, 0, max(self.n - 1, 0))].astype(np.float64)
+
+    def __len__(self):
+        return len(self.r_peaks)
+
+    def _columns(self, start, end):
+        return slice(start - self.start, end - self.start)
+
+    def argmax(self, start, end):
+        """
+        各心拍在 [start, end) 偏移区间内的最大值
+        返回:
+            (positions, amplitudes, found)  positions为信号中的绝对位置，found标记区间内有有效采样点的心拍
+        """
+        cols = self._columns(start, end)
+        values = np.where(self.valid[:, cols], self.values[:, cols], -np.inf)
+        found = self.valid[:, cols].any(axis=1)
+        offsets = np.argmax(values, axis=1)
+        positions = self.r_peaks + start + offsets
+        amplitudes = values[np.arange(len(values)), offsets]
+        return positions[found], amplitudes[found], found
+
+    def mean(self, start, end):
+        """
+        各心拍在 [start, end) 偏移区间内有效采样点的均值
+        返回:
+            (means, found)
+        """
+        cols = self._columns(start, end)
+        valid = self.valid[:, cols]
+        counts = valid.sum(axis=1)
+        found = counts > 0
+        sums = np.where(valid, self.values[:, cols], 0.0).sum(axis=1)
+        return sums[found] / counts[found], found
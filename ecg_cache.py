@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from ecg_metrics import get_logger
+
+logger = get_logger('cache')
+
+CACHE_DIR = "/tmp/ecg_cache"          # 所有gunicorn worker共享的缓存目录
+CACHE_MAX_BYTES = 256 * 1024 * 1024   # 缓存总大小上限
+CACHE_TTL = 24 * 3600                 # 缓存有效期（秒）
+
+
+def analysis_key(ecg_signal, config):
+    """
+    缓存键：原始采样值字节 + 分析配置/算法版本的sha256；
+    同一数据以不同格式上传（文本分包、int16）解码后相同，命中同一条缓存
+    """
+    samples = np.ascontiguousarray(ecg_signal)
+    digest = hashlib.sha256()
+    digest.update(samples.dtype.str.encode())
+    digest.update(samples.view(np.uint8))
+    digest.update(json.dumps(config, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def json_default(obj):
+    # numpy标量/数组转换为Python原生类型
+    return obj.tolist() if hasattr(obj, 'tolist') else str(obj)
+
+
+class AnalysisCache:
+    """
+    基于文件系统的分析结果缓存（每条一个JSON文件，原子替换写入）。
+    命中时刷新修改时间，超过TTL或总大小超限时按最久未使用淘汰
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """返回缓存的条目（dict）；不存在或已过期时返回None"""
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, entry):
+        """写入一条缓存；无法序列化或写入失败时放弃缓存，不影响分析结果"""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False, default=json_default)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("分析结果缓存写入失败 error=%s", e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """删除过期条目，并按最久未使用删除直到总大小不超过上限"""
+        now = time.time()
+        entries, total = [], 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+                if now - stat.st_mtime > self.ttl:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue  # 其他worker已删除
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+ANALYSIS_CACHE = AnalysisCache()
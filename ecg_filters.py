@@ -0,0 +1,30 @@
+from functools import lru_cache
+
+import numpy as np
+
+# R峰检测使用的带通参数（批量分析与流式接入一致）
+R_PEAK_BAND = (8.0, 15.0)
+R_PEAK_ORDER = 4
+
+
+@lru_cache(maxsize=32)
+def bandpass_sos(fs, lowcut, highcut, order=R_PEAK_ORDER, dtype='float64'):
+    """
+    Butterworth带通滤波器的二阶节(SOS)系数，按 (采样率, 频带, 阶数, 精度) 缓存，
+    同一组参数只设计一次；返回的数组被所有调用方共享，不得原地修改
+    """
+    from scipy.signal import butter  # scipy按需导入，不计入服务启动时间
+    nyquist = 0.5 * fs
+    return butter(order, [lowcut / nyquist, highcut / nyquist], btype='band', output='sos').astype(dtype)
+
+
+def bandpass_filter(signal, fs, lowcut=R_PEAK_BAND[0], highcut=R_PEAK_BAND[1], order=R_PEAK_ORDER):
+    """
+    零相位带通滤波（sosfiltfilt）
+    int16/float32 输入按float32计算，内存和带宽减半；float64 输入保持float64
+    """
+    from scipy.signal import sosfiltfilt
+    x = np.asarray(signal)
+    dtype = np.float64 if x.dtype == np.float64 else np.float32
+    sos = bandpass_sos(fs, float(lowcut), float(highcut), order, np.dtype(dtype).name)
+    return sosfiltfilt(sos, x.astype(dtype, copy=False))
@@ -0,0 +1,264 @@
+from functools import lru_cache
+
+import numpy as np
+
+# RR间期筛选：生理范围（毫秒）和相对中位数的允许偏差（排除漏检/误检和异位搏动）
+RR_RANGE_MS = (300, 2000)
+RR_MEDIAN_TOLERANCE = 0.3
+
+# 频域分析：RR序列线性插值为等间隔序列后做Welch功率谱
+RESAMPLE_FS = 4.0                  # 插值采样率（Hz）
+WELCH_SEGMENT = 256                # 每段点数（4Hz下64秒，频率分辨率约0.016Hz）
+MIN_SPECTRAL_SECONDS = 60          # 少于该时长的NN序列不计算频域指标
+HRV_BANDS = {'vlf': (0.0033, 0.04), 'lf': (0.04, 0.15), 'hf': (0.15, 0.4)}
+
+
+def filter_rr(rr_ms):
+    """
+    RR间期异常值筛选（向量化）：保留生理范围内且与中位数相差不超过30%的间期
+    返回:
+        布尔掩码，与rr_ms等长
+    """
+    rr = np.asarray(rr_ms, dtype=np.float64)
+    if len(rr) == 0:
+        return np.zeros(0, dtype=bool)
+    median_rr = np.median(rr)
+    return ((rr > RR_RANGE_MS[0]) & (rr < RR_RANGE_MS[1]) &
+            (rr > (1 - RR_MEDIAN_TOLERANCE) * median_rr) & (rr < (1 + RR_MEDIAN_TOLERANCE) * median_rr))
+
+
+def time_domain(nn):
+    """时域指标：平均NN、SDNN、RMSSD、NN50/pNN50、平均心率（nn单位为毫秒，至少2个）"""
+    nn = np.asarray(nn, dtype=np.float64)
+    diff = np.diff(nn)
+    nn50 = int(np.count_nonzero(np.abs(diff) > 50))
+    return {
+        'mean_nn': float(nn.mean()),
+        'sdnn': float(nn.std()),
+        'rmssd': float(np.sqrt(np.mean(diff * diff))),
+        'nn50': nn50,
+        'pnn50': 100.0 * nn50 / len(diff),
+        'mean_hr': float(60000.0 / nn.mean()),
+    }
+
+
+def poincare(nn):
+    """
+    Poincaré散点图指标：SD1（短时变异）、SD2（长时变异）及心脏交感/迷走指数
+    CSI = SD2/SD1，CVI = log10(16·SD1·SD2)（即以4·SD1、4·SD2为轴长）
+    """
+    nn = np.asarray(nn, dtype=np.float64)
+    sd_diff2 = np.var(np.diff(nn))
+    sd1 = np.sqrt(0.5 * sd_diff2)
+    sd2 = np.sqrt(max(2 * np.var(nn) - 0.5 * sd_diff2, 0.0))
+    return {
+        'sd1': float(sd1),
+        'sd2': float(sd2),
+        'sd1_sd2': float(sd1 / sd2) if sd2 > 0 else 0.0,
+        'csi': float(sd2 / sd1) if sd1 > 0 else 0.0,
+        'cvi': float(np.log10(16 * sd1 * sd2)) if sd1 > 0 and sd2 > 0 else 0.0,
+    }
+
+
+@lru_cache(maxsize=64)
+def _resample_offsets(n):
+    """插值网格相对起点的时间偏移（秒），按点数缓存；同长度的窗口（如逐5分钟分析）共用"""
+    offsets = np.arange(n) / RESAMPLE_FS
+    offsets.setflags(write=False)
+    return offsets
+
+
+@lru_cache(maxsize=16)
+def _welch_plan(nperseg):
+    """
+    Welch谱估计的固定部分：Hann窗、密度归一化系数、频率轴和各频带掩码，按段长缓存
+    返回的数组被所有调用方共享，不得原地修改
+    """
+    window = np.hanning(nperseg + 1)[:-1]   # 周期Hann窗（与scipy.signal.welch一致）
+    scale = 1.0 / (RESAMPLE_FS * np.sum(window * window))
+    freqs = np.fft.rfftfreq(nperseg, 1 / RESAMPLE_FS)
+    masks = {band: (freqs >= lo) & (freqs < hi) for band, (lo, hi) in HRV_BANDS.items()}
+    for array in (window, freqs, *masks.values()):
+        array.setflags(write=False)
+    return window, scale, freqs, masks
+
+
+def welch_psd(x, nperseg=WELCH_SEGMENT):
+    """
+    等间隔序列的Welch功率谱密度（Hann窗、50%重叠、逐段去均值），各段一次批量FFT
+    返回:
+        (freqs, psd)
+    """
+    x = np.asarray(x, dtype=np.float64)
+    nperseg = min(nperseg, len(x))
+    window, scale, freqs, _ = _welch_plan(nperseg)
+    step = nperseg // 2
+    starts = np.arange(0, len(x) - nperseg + 1, step)
+    segments = x[starts[:, None] + np.arange(nperseg)]
+    segments = segments - segments.mean(axis=1, keepdims=True)
+    spectrum = np.abs(np.fft.rfft(segments * window, axis=1)) ** 2 * scale
+    spectrum[:, 1:-1 if nperseg % 2 == 0 else None] *= 2   # 单边谱（直流和奈奎斯特频点除外）
+    return freqs, spectrum.mean(axis=0)
+
+
+def frequency_domain(nn, times):
+    """
+    频域指标：NN序列按时间线性插值到4Hz后做Welch谱，计算VLF/LF/HF功率（ms²）、LF/HF和归一化单位
+    参数:
+        nn - NN间期（毫秒）
+        times - 每个NN间期结束时刻（秒）
+    返回:
+        指标字典；序列短于 MIN_SPECTRAL_SECONDS 时返回None
+    """
+    times = np.asarray(times, dtype=np.float64)
+    if len(nn) < 3 or times[-1] - times[0] < MIN_SPECTRAL_SECONDS:
+        return None
+    n = int((times[-1] - times[0]) * RESAMPLE_FS) + 1
+    resampled = np.interp(times[0] + _resample_offsets(n), times, nn)
+    freqs, psd = welch_psd(resampled)
+    masks = _welch_plan(min(WELCH_SEGMENT, n))[3]
+    df = freqs[1] - freqs[0]
+    power = {band: float(psd[mask].sum() * df) for band, mask in masks.items()}
+    lf_hf = power['lf'] + power['hf']
+    return {
+        'vlf': power['vlf'],
+        'lf': power['lf'],
+        'hf': power['hf'],
+        'total_power': power['vlf'] + lf_hf,
+        'lf_hf_ratio': power['lf'] / power['hf'] if power['hf'] > 0 else 0.0,
+        'lf_nu': 100.0 * power['lf'] / lf_hf if lf_hf > 0 else 0.0,
+        'hf_nu': 100.0 * power['hf'] / lf_hf if lf_hf > 0 else 0.0,
+    }
+
+
+# 非线性（复杂度）指标：样本熵/近似熵（KD树切比雪夫距离邻居计数）和DFA
+ENTROPY_DIM = 2
+ENTROPY_TOLERANCE = 0.2                # 容限 = 0.2 × NN序列标准差
+ENTROPY_MAX_POINTS = 10000             # 熵只取前这么多个NN间期（整夜记录约3万个），耗时上限约0.5秒
+COMPLEXITY_MIN_POINTS = 100
+DFA_SHORT = range(4, 17)               # α1：4-16个心拍
+DFA_LONG = range(16, 65)               # α2：16-64个心拍
+
+
+def _embed(x, dim, count):
+    """延迟嵌入：count个长度为dim的模板向量（行）"""
+    return np.column_stack([x[i:i + count] for i in range(dim)])
+
+
+def sample_entropy(x, emb_dim=ENTROPY_DIM, tolerance=None):
+    """
+    样本熵 SampEn = -ln(A/B)：B、A分别为长度emb_dim、emb_dim+1的模板对中切比雪夫距离小于tolerance的对数
+    （不含自身匹配，两种长度均使用前 N-emb_dim 个模板，与nolds.sampen一致）。
+    邻居计数由cKDTree的双树计数完成，不逐对计算距离
+    返回:
+        样本熵；没有匹配的模板对时返回None
+    """
+    from scipy.spatial import cKDTree  # scipy按需导入，不计入服务启动时间
+    x = np.asarray(x, dtype=np.float64)
+    if tolerance is None:
+        tolerance = ENTROPY_TOLERANCE * np.std(x, ddof=1)
+    if tolerance <= 0 or len(x) <= emb_dim + 1:
+        return None
+    count = len(x) - emb_dim
+    radius = np.nextafter(tolerance, 0)   # count_neighbors统计距离<=r，取略小的r得到严格小于
+    pairs = []
+    for dim in (emb_dim, emb_dim + 1):
+        tree = cKDTree(_embed(x, dim, count))
+        pairs.append((tree.count_neighbors(tree, radius, p=np.inf) - count) // 2)
+    if pairs[0] == 0 or pairs[1] == 0:
+        return None
+    return float(-np.log(pairs[1] / pairs[0]))
+
+
+def approximate_entropy(x, emb_dim=ENTROPY_DIM, tolerance=None):
+    """
+    近似熵 ApEn = Φm - Φm+1（Pincus），Φm为各模板邻居比例（含自身，距离<=tolerance）对数的均值；
+    每个模板的邻居数由cKDTree批量查询得到
+    """
+    from scipy.spatial import cKDTree
+    x = np.asarray(x, dtype=np.float64)
+    if tolerance is None:
+        tolerance = ENTROPY_TOLERANCE * np.std(x, ddof=1)
+    if len(x) <= emb_dim + 1:
+        return None
+    phi = []
+    for dim in (emb_dim, emb_dim + 1):
+        templates = _embed(x, dim, len(x) - dim + 1)
+        counts = cKDTree(templates).query_ball_point(templates, tolerance, p=np.inf, return_length=True)
+        phi.append(np.mean(np.log(counts / len(templates))))
+    return float(phi[0] - phi[1])
+
+
+def _fluctuation(walk, n):
+    """DFA在窗口长度n下的波动函数F(n)：不重叠窗口内一阶线性去趋势（闭式解，所有窗口一次计算）"""
+    k = len(walk) // n
+    windows = walk[:k * n].reshape(k, n)
+    t = np.arange(n) - (n - 1) / 2
+    stt = t @ t
+    centered = windows - windows.mean(axis=1, keepdims=True)
+    slope = centered @ t / stt
+    residual = np.einsum('ij,ij->i', centered, centered) - slope * slope * stt
+    return np.sqrt(max(residual.sum(), 0.0) / (k * n))
+
+
+def dfa(x, nvals):
+    """
+    去趋势波动分析的标度指数α（log F(n) 对 log n 的斜率）；
+    与 nolds.dfa(x, nvals, overlap=False, order=1) 一致
+    返回:
+        α；可用的窗口长度不足2个时返回None
+    """
+    x = np.asarray(x, dtype=np.float64)
+    walk = np.cumsum(x - x.mean())
+    nvals = np.array([n for n in nvals if 2 <= n <= len(x) // 2])
+    if len(nvals) < 2:
+        return None
+    fluctuations = np.array([_fluctuation(walk, n) for n in nvals])
+    nonzero = fluctuations > 0
+    if np.count_nonzero(nonzero) < 2:
+        return None
+    return float(np.polyfit(np.log(nvals[nonzero]), np.log(fluctuations[nonzero]), 1)[0])
+
+
+def complexity_metrics(nn, max_points=ENTROPY_MAX_POINTS):
+    """
+    NN序列的复杂度指标：样本熵、近似熵（只用前max_points个间期）、DFA α1/α2（全序列，线性耗时）
+    返回:
+        指标字典；NN间期少于 COMPLEXITY_MIN_POINTS 时返回None
+    """
+    nn = np.asarray(nn, dtype=np.float64)
+    if len(nn) < COMPLEXITY_MIN_POINTS:
+        return None
+    head = nn[:max_points]
+    return {
+        'sampen': sample_entropy(head),
+        'apen': approximate_entropy(head),
+        'dfa_alpha1': dfa(nn, DFA_SHORT),
+        'dfa_alpha2': dfa(nn, DFA_LONG) if len(nn) >= 4 * DFA_LONG[-1] else None,
+        'entropy_points': len(head),
+    }
+
+
+def hrv_metrics(r_peaks, fs, complexity=False):
+    """
+    由R峰位置计算完整的HRV指标（时域、频域、Poincaré；complexity=True时附带复杂度指标）
+    参数:
+        r_peaks - R峰采样点位置（递增）
+        fs - 采样率
+        complexity - 是否计算样本熵/近似熵/DFA（complexity_metrics）
+    返回:
+        指标字典；有效NN间期不足2个时返回None
+    """
+    r_peaks = np.asarray(r_peaks, dtype=np.float64)
+    rr = np.diff(r_peaks) * (1000.0 / fs)
+    mask = filter_rr(rr)
+    nn = rr[mask]
+    if len(nn) < 2:
+        return None
+    metrics = time_domain(nn)
+    metrics['nn_count'] = len(nn)
+    metrics['poincare'] = poincare(nn)
+    metrics['frequency'] = frequency_domain(nn, r_peaks[1:][mask] / fs)
+    if complexity:
+        metrics['complexity'] = complexity_metrics(nn)
+    return metrics
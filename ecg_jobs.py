@@ -0,0 +1,203 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from ecg_cache import json_default
+from ecg_metrics import get_logger
+
+logger = get_logger('jobs')
+
+JOB_DB = "/tmp/ecg_jobs.sqlite3"   # 任务持久化（SQLite），重启后未完成的任务继续执行
+# 后台线程数：线程只把任务交给分析进程池并等待结果（报告按需渲染），
+# 并行度实际受分析进程数限制，默认与其一致（ECG_ANALYSIS_WORKERS）
+JOB_WORKERS = int(os.environ.get('ECG_JOB_WORKERS', os.environ.get('ECG_ANALYSIS_WORKERS', os.cpu_count() or 1)))
+JOB_POLL_SECONDS = 1.0             # 空闲时轮询间隔（其他进程提交的任务也能被领取）
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    owner TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+)
+"""
+
+
+def _process_start(pid):
+    """进程启动时间（/proc/<pid>/stat 第22个字段，开机以来的时钟滴答数）；进程不存在时返回None"""
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # 第2个字段（进程名）可能含空格，从最后一个')'之后按空格切分，第3个字段起算
+    return stat.rsplit(b')', 1)[1].split()[19].decode()
+
+
+def process_boot_id(pid=None):
+    """
+    进程标识 "pid:启动时间"。容器重启后worker往往得到与之前相同的PID，
+    只凭PID会把上次运行遗留的任务误认为仍在执行
+    """
+    pid = os.getpid() if pid is None else pid
+    return f"{pid}:{_process_start(pid)}"
+
+
+def _owner_alive(owner):
+    """任务所属进程（owner 为 "pid:启动时间:线程名"）是否仍在运行"""
+    pid, _, rest = owner.partition(':')
+    start = rest.partition(':')[0]
+    return pid.isdigit() and _process_start(int(pid)) == start
+
+
+class JobStore:
+    """基于SQLite的任务表，每次操作使用独立连接，可在线程/进程间共享"""
+
+    def __init__(self, path=JOB_DB):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def submit(self, payload):
+        """新建任务，返回任务ID"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT INTO jobs (id, status, payload, created, updated) VALUES (?, ?, ?, ?, ?)",
+                         (job_id, STATUS_QUEUED, json.dumps(payload), now, now))
+        return job_id
+
+    def claim(self, owner):
+        """领取最早的排队任务（事务内完成查询和状态更新，多个worker不会重复领取）"""
+        conn = self._connect()
+        try:
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY created LIMIT 1",
+                               (STATUS_QUEUED,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute("UPDATE jobs SET status = ?, owner = ?, updated = ? WHERE id = ?",
+                         (STATUS_RUNNING, owner, time.time(), row['id']))
+            conn.execute("COMMIT")
+            return {'id': row['id'], 'payload': json.loads(row['payload'])}
+        finally:
+            conn.close()
+
+    def complete(self, job_id, result):
+        self._finish(job_id, STATUS_DONE, result=json.dumps(result, ensure_ascii=False, default=json_default))
+
+    def fail(self, job_id, error):
+        self._finish(job_id, STATUS_FAILED, error=error)
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = ?, result = ?, error = ?, updated = ? WHERE id = ?",
+                         (status, result, error, time.time(), job_id))
+
+    def get(self, job_id):
+        """查询任务；不存在时返回None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'job_id': row['id'],
+            'status': row['status'],
+            'payload': json.loads(row['payload']),
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'created': row['created'],
+            'updated': row['updated'],
+        }
+
+    def requeue_orphans(self):
+        """
+        将所属进程已退出的运行中任务重新排队（服务重启或worker被杀后恢复）。
+        按PID和进程启动时间判断：重启后复用了相同PID的进程不会被当作原来的进程
+        """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, owner FROM jobs WHERE status = ?", (STATUS_RUNNING,)).fetchall()
+            orphans = [row['id'] for row in rows if not row['owner'] or not _owner_alive(row['owner'])]
+            conn.executemany("UPDATE jobs SET status = ?, owner = NULL, updated = ? WHERE id = ?",
+                             [(STATUS_QUEUED, time.time(), job_id) for job_id in orphans])
+        return len(orphans)
+
+
+class JobQueue:
+    """
+    后台任务队列：handler(payload) 返回可JSON序列化的结果，抛出异常则任务失败。
+    线程在首次提交任务时启动（gunicorn fork之后），不在导入时启动
+    """
+
+    def __init__(self, handler, store=None, workers=JOB_WORKERS):
+        self.handler = handler
+        self.workers = workers
+        self._store = store
+        self._threads = []
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = JobStore()
+        return self._store
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            requeued = self.store.requeue_orphans()
+            if requeued:
+                logger.info("重新排队未完成的任务 count=%d", requeued)
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"ecg-job-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, payload):
+        self.start()
+        job_id = self.store.submit(payload)
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        self.start()  # 重启后第一次查询时恢复未完成的任务
+        return self.store.get(job_id)
+
+    def _run(self):
+        owner = f"{process_boot_id()}:{threading.current_thread().name}"
+        while True:
+            job = self.store.claim(owner)
+            if job is None:
+                self._wakeup.wait(JOB_POLL_SECONDS)
+                self._wakeup.clear()
+                continue
+            try:
+                self.store.complete(job['id'], self.handler(job['payload']))
+            except Exception as e:
+                logger.exception("任务失败 job_id=%s", job['id'])
+                self.store.fail(job['id'], str(e))
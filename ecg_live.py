@@ -0,0 +1,145 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from ecg_loader import FORMAT_RING_TEXT, FORMAT_CSV, INT16_DTYPES
+from ecg_stream import StreamingDecoder, OnlineRPeakDetector
+
+ROLLING_SECONDS = 30          # 滚动指标使用的最近R峰时间窗
+UPDATE_SECONDS = 2            # 指标最多每隔这么多秒（信号时间）重新计算一次
+SESSION_IDLE_TTL = 60         # 会话空闲超过该时间（秒）自动关闭
+MAX_LIVE_SESSIONS = 1000      # 每个worker的会话上限
+LIVE_FORMATS = (FORMAT_RING_TEXT, FORMAT_CSV) + tuple(INT16_DTYPES)
+
+
+class LiveSession:
+    """
+    一路实时心电流：解码、在线R峰检测和滚动指标。
+    只保存滤波/阈值状态和最近 ROLLING_SECONDS 的R峰，内存占用与连接时长无关
+    """
+
+    def __init__(self, session_id, processor, data_format=None):
+        self.session_id = session_id
+        self.processor = processor
+        self.fs = processor.fs
+        self.decoder = StreamingDecoder()
+        if data_format is not None:
+            self.decoder.data_format = data_format   # 指定格式时不必等待探测字节
+        self.detector = OnlineRPeakDetector(fs=self.fs)
+        self.recent_peaks = deque()
+        self.total_peaks = 0
+        self._last_peak = -1
+        self.metrics = None
+        self._next_update = UPDATE_SECONDS * self.fs
+        self.last_seen = time.time()
+        self.lock = threading.Lock()
+
+    def feed(self, data):
+        """送入一段原始字节，返回本次检出的R峰位置"""
+        return self._push(self.decoder.feed(data))
+
+    def finish(self):
+        peaks = self._push(self.decoder.finish())
+        self._update_metrics()
+        return peaks
+
+    def _push(self, samples):
+        self.last_seen = time.time()
+        peaks = self.detector.push(samples)
+        # 只保留严格递增的R峰，重复/倒序的位置会产生0长度的RR间期，扭曲心率和心律失常判断
+        previous = np.maximum.accumulate(np.concatenate(([self._last_peak], peaks)))[:-1]
+        peaks = peaks[peaks > previous]
+        if len(peaks):
+            self._last_peak = int(peaks[-1])
+            self.recent_peaks.extend(peaks.tolist())
+            self.total_peaks += len(peaks)
+            oldest = self.detector.position - ROLLING_SECONDS * self.fs
+            while self.recent_peaks and self.recent_peaks[0] < oldest:
+                self.recent_peaks.popleft()
+        if self.detector.position >= self._next_update:
+            self._update_metrics()
+            self._next_update = self.detector.position + UPDATE_SECONDS * self.fs
+        return peaks
+
+    def _update_metrics(self):
+        """复用批量分析的心率/HRV/心律失常计算，只作用于最近窗口内的R峰"""
+        r_peaks = np.array(self.recent_peaks, dtype=np.int64)
+        if len(r_peaks) < 3:
+            heart_rate, hrv, arrhythmia = 0, {"rmssd": 0, "sdnn": 0, "assessment": "数据不足"}, None
+        else:
+            heart_rate = self.processor._calculate_heart_rate(r_peaks, self.fs)
+            hrv = self.processor._analyze_hrv(r_peaks)
+            arrhythmia = self.processor._check_arrhythmia(r_peaks)
+        self.metrics = {
+            "heart_rate": heart_rate,
+            "rmssd": hrv["rmssd"],
+            "hrv_assessment": hrv["assessment"],
+            "arrhythmia": arrhythmia,
+            "window_seconds": ROLLING_SECONDS,
+            "window_beats": len(r_peaks),
+        }
+
+    def status(self):
+        return {
+            "session_id": self.session_id,
+            "samples": self.detector.position,
+            "duration": self.detector.position / self.fs,
+            "total_beats": self.total_peaks,
+            "metrics": self.metrics,
+        }
+
+
+class LiveSessionRegistry:
+    """
+    进程内的会话表。客户端以短请求推送数据，不占用常驻线程/连接；
+    会话状态保存在当前worker内存中（gunicorn.conf.py 中 workers = 1）
+    """
+
+    def __init__(self, processor_factory, max_sessions=MAX_LIVE_SESSIONS, idle_ttl=SESSION_IDLE_TTL):
+        self.processor_factory = processor_factory
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._processor = None
+
+    def open(self, data_format=None):
+        """创建会话；会话数已满时返回None"""
+        if data_format is not None and data_format not in LIVE_FORMATS:
+            raise ValueError(f"不支持的数据格式: {data_format}")
+        with self._lock:
+            self._expire(time.time())
+            if len(self._sessions) >= self.max_sessions:
+                return None
+            if self._processor is None:
+                self._processor = self.processor_factory()
+            session = LiveSession(secrets.token_urlsafe(16), self._processor, data_format)
+            self._sessions[session.session_id] = session
+            return session
+
+    def get(self, session_id):
+        with self._lock:
+            self._expire(time.time())
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.last_seen = time.time()
+            return session
+
+    def close(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def _expire(self, now):
+        # 按最近访问排序，只需从头部清理
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_seen <= self.idle_ttl:
+                break
+            self._sessions.popitem(last=False)
+
+    def __len__(self):
+        return len(self._sessions)
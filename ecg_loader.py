@@ -0,0 +1,237 @@
+import os
+import re
+import numpy as np
+
+# 文件格式探测所需的字节数（只读取文件头部一小段）
+PROBE_BYTES = 4096
+
+# 戒指上传的文本分包格式: "seq:0;ecg:9565,9558,...\n"
+RING_TEXT_MAGIC = b'seq:'
+_RING_PAYLOAD_RE = re.compile(rb'ecg:([^\n;]*)')
+
+# CSV：单列数值，或 时间戳+数值（取最后一列），允许有表头行
+CSV_BLOCK_BYTES = 8 * 1024 * 1024   # 大文件按块解析，限制峰值内存
+_CSV_DELIMITERS = (b',', b';', b'\t')
+_TEXT_BYTES = bytes(range(0x20, 0x7f)) + b'\t\r\n'
+
+FORMAT_RING_TEXT = 'ring_text'
+FORMAT_CSV = 'csv'
+FORMAT_INT16_LE = 'int16_le'
+FORMAT_INT16_BE = 'int16_be'
+
+INT16_DTYPES = {
+    FORMAT_INT16_LE: np.dtype('<i2'),
+    FORMAT_INT16_BE: np.dtype('>i2'),
+}
+
+
+class ECGRecording:
+    """一次加载的ECG记录，signal 为只读的内存映射视图"""
+
+    def __init__(self, signal, fs, data_format, filepath=None):
+        self.signal = signal
+        self.fs = fs
+        self.data_format = data_format
+        self.filepath = filepath
+
+    @property
+    def samples(self):
+        return len(self.signal)
+
+    @property
+    def duration(self):
+        return len(self.signal) / self.fs
+
+    def window(self, start, stop):
+        """返回[start, stop)区间的零拷贝视图"""
+        return self.signal[max(0, start):min(len(self.signal), stop)]
+
+
+def detect_format(head):
+    """
+    根据文件头部字节判断数据格式
+    参数:
+        head - 文件开头的字节（bytes 或 uint8 数组）
+    返回:
+        FORMAT_RING_TEXT / FORMAT_CSV / FORMAT_INT16_LE / FORMAT_INT16_BE
+    """
+    head = bytes(head)
+    if head.lstrip().startswith(RING_TEXT_MAGIC):
+        return FORMAT_RING_TEXT
+    if _looks_like_csv(head):
+        return FORMAT_CSV
+    return _detect_int16_endianness(head)
+
+
+def _looks_like_csv(head):
+    """纯文本且首个数据行的最后一列是数值"""
+    if not head or head.translate(None, _TEXT_BYTES):
+        return False
+    lines = [line for line in head.splitlines() if line.strip()]
+    if len(head) >= PROBE_BYTES:
+        lines = lines[:-1]  # 最后一行可能被截断
+    for line in lines[:2]:
+        if _is_number(_split_fields(line, _find_delimiter(line))[-1]):
+            return True
+    return False
+
+
+def _find_delimiter(line):
+    for delimiter in _CSV_DELIMITERS:
+        if delimiter in line:
+            return delimiter
+    return None
+
+
+def _split_fields(line, delimiter):
+    return line.split(delimiter) if delimiter else [line]
+
+
+def _is_number(field):
+    try:
+        float(field)
+        return True
+    except ValueError:
+        return False
+
+
+def _detect_int16_endianness(head):
+    """ECG信号相邻采样点变化平缓：哪种字节序解释下一阶差分更小就采用哪种"""
+    usable = len(head) - len(head) % 2
+    if usable < 4:
+        return FORMAT_INT16_LE
+    le = np.frombuffer(head[:usable], dtype='<i2').astype(np.int32)
+    be = np.frombuffer(head[:usable], dtype='>i2').astype(np.int32)
+    le_roughness = np.abs(np.diff(le)).mean()
+    be_roughness = np.abs(np.diff(be)).mean()
+    return FORMAT_INT16_BE if be_roughness < le_roughness else FORMAT_INT16_LE
+
+
+def _parse_numbers(text, expected, dtype=np.float64, sep=' '):
+    """
+    numpy整段解析数值文本。np.fromstring 遇到无法解析的字段会直接截断（只给出警告），
+    因此核对解析出的个数，不一致时报错而不是静默丢弃后面的数据
+    """
+    values = np.fromstring(text.decode('ascii'), dtype=dtype, sep=sep)
+    if len(values) != expected:
+        raise ValueError(f"无法解析的数值：期望{expected}个，实际解析{len(values)}个")
+    return values
+
+
+def parse_ring_text(raw):
+    """解析文本分包格式，一次性拼接所有ecg负载后交给numpy解析，返回int32采样值"""
+    payloads = [p.strip().strip(b',') for p in _RING_PAYLOAD_RE.findall(bytes(raw))]
+    joined = b','.join(p for p in payloads if p)
+    if not joined:
+        return np.array([], dtype=np.int32)
+    return _parse_numbers(joined, joined.count(b',') + 1, dtype=np.int32, sep=',')
+
+
+class CSVParser:
+    """
+    CSV块解析器：首个数据行确定分隔符和列数，之后每块整体交给numpy解析；
+    多列时取最后一列作为采样值
+    """
+
+    def __init__(self):
+        self.delimiter = None
+        self.columns = None
+        self.numeric = None   # 所有列都是数值时可以整块向量化解析
+
+    def parse(self, block):
+        """
+        解析若干完整行
+        返回:
+            int16（整数且范围允许）或float32采样值
+        """
+        if self.columns is None:
+            block = self._read_layout(block)
+            if self.columns is None:
+                return np.array([], dtype=np.int16)
+
+        rows = [line for line in block.splitlines() if line.strip()]
+        if self.columns == 1:
+            values = _parse_numbers(block, len(rows))
+        elif self.numeric:
+            separators = self.columns - 1
+            if any(row.count(self.delimiter) != separators for row in rows):
+                raise ValueError("CSV列数不一致")
+            flat = _parse_numbers(block.replace(self.delimiter, b' '), len(rows) * self.columns)
+            values = flat.reshape(-1, self.columns)[:, -1]
+        else:
+            # 时间戳等非数值列：只取每行最后一个字段
+            fields = [line.rsplit(self.delimiter, 1)[-1] for line in rows]
+            values = _parse_numbers(b' '.join(fields), len(fields))
+        return narrow_samples(values)
+
+    def _read_layout(self, block):
+        """跳过表头，根据首个数据行确定列格式，返回剩余内容"""
+        while block:
+            line, _, rest = block.partition(b'\n')
+            if line.strip():
+                delimiter = _find_delimiter(line)
+                fields = _split_fields(line, delimiter)
+                if _is_number(fields[-1]):
+                    self.delimiter = delimiter
+                    self.columns = len(fields)
+                    self.numeric = all(_is_number(f) for f in fields)
+                    return block
+            block = rest
+        return block
+
+
+def parse_csv(raw, block_bytes=CSV_BLOCK_BYTES):
+    """按块解析CSV（块边界对齐到行尾），返回int16或float32采样值"""
+    parser = CSVParser()
+    chunks, carry = [], b''
+    for start in range(0, len(raw), block_bytes):
+        block = carry + bytes(raw[start:start + block_bytes])
+        cut = block.rfind(b'\n') + 1
+        block, carry = block[:cut], block[cut:]
+        if block:
+            chunks.append(parser.parse(block))
+    if carry.strip():
+        chunks.append(parser.parse(carry))
+    if not chunks:
+        return np.array([], dtype=np.int16)
+    return np.concatenate(chunks)
+
+
+def narrow_samples(values):
+    """数值为整数且范围允许时压缩为int16，否则使用float32"""
+    if len(values) == 0:
+        return values.astype(np.int16)
+    if values.dtype.kind == 'f' and not np.array_equal(values, np.round(values)):
+        return values.astype(np.float32)
+    if values.min() >= np.iinfo(np.int16).min and values.max() <= np.iinfo(np.int16).max:
+        return values.astype(np.int16)
+    return values.astype(np.float32)
+
+
+def load_ecg_recording(filepath, fs=250):
+    """
+    加载ECG记录（内存映射，整个请求只读取一次）
+    参数:
+        filepath - 数据文件路径
+        fs - 采样率
+    返回:
+        ECGRecording；二进制格式下 signal 是文件的零拷贝视图
+    """
+    size = os.path.getsize(filepath)
+    if size == 0:
+        raise ValueError("空文件")
+
+    raw = np.memmap(filepath, dtype=np.uint8, mode='r')
+    data_format = detect_format(raw[:PROBE_BYTES])
+
+    if data_format == FORMAT_RING_TEXT:
+        signal = narrow_samples(parse_ring_text(raw))
+    elif data_format == FORMAT_CSV:
+        signal = parse_csv(raw)
+    elif size < 2:
+        signal = np.array([], dtype=INT16_DTYPES[data_format])
+    else:
+        signal = np.memmap(filepath, dtype=INT16_DTYPES[data_format],
+                           mode='r', shape=(size // 2,)).view(np.ndarray)
+
+    return ECGRecording(signal, fs, data_format, filepath)
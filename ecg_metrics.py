@@ -0,0 +1,159 @@
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# 日志级别（DEBUG/INFO/WARNING/ERROR），可通过环境变量调整；低于该级别的日志不格式化、不输出
+LOG_LEVEL = os.environ.get('ECG_LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s %(message)s'
+
+# 分析流程的阶段（直方图的stage标签）
+STAGES = ('load', 'filter', 'rpeak', 'waves', 'hrv', 'risk', 'render', 'serialize')
+# 直方图桶上限（秒）
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _configure_logging():
+    """'ecg' 日志器输出到stderr（gunicorn会收集），每行：时间 级别 模块 事件 key=value..."""
+    logger = logging.getLogger('ecg')
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        logger.addHandler(handler)
+        logger.propagate = False
+    logger.setLevel(LOG_LEVEL)
+
+
+_configure_logging()
+
+
+def get_logger(name):
+    """模块日志器（'ecg.<name>'），级别统一由 ECG_LOG_LEVEL 控制"""
+    return logging.getLogger(f'ecg.{name}')
+
+
+class Histogram:
+    """累积直方图（Prometheus语义：每个桶统计不大于上限的观测数），线程安全"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self):
+        """返回 (各桶累计数, 总数, 总和)"""
+        with self._lock:
+            return list(self.counts), self.count, self.sum
+
+
+class StageMetrics:
+    """各分析阶段的耗时直方图（每次请求每个阶段观测一次，值为该请求中该阶段的累计耗时）"""
+
+    def __init__(self, stages=STAGES):
+        self.histograms = {stage: Histogram() for stage in stages}
+
+    def observe(self, stage, seconds):
+        histogram = self.histograms.get(stage)
+        if histogram is not None:
+            histogram.observe(seconds)
+
+    def observe_all(self, timings):
+        for stage, seconds in timings.items():
+            self.observe(stage, seconds)
+
+    def render(self):
+        """Prometheus文本格式"""
+        name = 'ecg_stage_duration_seconds'
+        lines = [f'# HELP {name} Time spent in each ECG analysis stage per request.',
+                 f'# TYPE {name} histogram']
+        for stage, histogram in self.histograms.items():
+            counts, count, total = histogram.snapshot()
+            for upper, bucket_count in zip(histogram.buckets, counts):
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{upper}"}} {bucket_count}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = StageMetrics()
+
+_local = threading.local()
+_timings_lock = threading.Lock()   # 绘图线程池中的任务会累加到发起请求的线程的汇总中
+
+
+def current_timings():
+    """当前线程正在汇总的阶段耗时（不在 collect() 内时为None）"""
+    return getattr(_local, 'timings', None)
+
+
+@contextmanager
+def collect(observe=True, timings=None):
+    """
+    汇总当前线程一次请求中各阶段的耗时，返回 {阶段: 秒}。
+    嵌套调用共用最外层的汇总；observe=False 时只返回汇总不写入直方图
+    （分析进程把汇总交给Web进程记录）；timings 指定时累加到该汇总
+    （其他线程中执行的子任务，由发起线程负责写入直方图）
+    """
+    outer = current_timings()
+    if outer is not None:
+        yield outer
+        return
+    if timings is not None:
+        observe = False
+    _local.timings = timings = {} if timings is None else timings
+    try:
+        yield timings
+    finally:
+        _local.timings = None
+        if observe:
+            METRICS.observe_all(timings)
+
+
+@contextmanager
+def stage(name):
+    """
+    计时一个阶段；阶段嵌套时只统计自身耗时（例如R峰检测内部的滤波计入filter而不计入rpeak）。
+    只在 collect() 内累加到本次请求的汇总；请求之外的调用（如实时会话每次推送时的HRV计算）
+    不写入直方图，避免扭曲按请求统计的阶段耗时
+    """
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        exclusive = elapsed - stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        timings = current_timings()
+        if timings is not None:
+            with _timings_lock:
+                timings[name] = timings.get(name, 0.0) + exclusive
+
+
+def timed(name):
+    """方法/函数装饰器：整个调用计入指定阶段"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,233 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from ecg_metrics import METRICS, collect, stage
+from ecg_processor import ECGProcessor, load_signal_sidecar, save_signal_sidecar, warm_up
+
+# 分析进程数和单个任务的超时时间，可通过环境变量调整
+ANALYSIS_WORKERS = int(os.environ.get('ECG_ANALYSIS_WORKERS', os.cpu_count() or 1))
+ANALYSIS_TIMEOUT = float(os.environ.get('ECG_ANALYSIS_TIMEOUT', 120))
+TIMEOUT_GRACE = 5   # 进程内超时未生效（卡在C扩展中）时，父进程再多等待的秒数
+START_POLL = 0.5    # 任务尚未开始执行（排队中）时，父进程检查开始通知的间隔（秒）
+
+_PROCESSOR = None   # 分析进程内的ECGProcessor（进程启动时创建一次）
+_STARTED = None     # 分析进程内：任务开始执行时向父进程发送 (任务ID, 开始时间) 的队列
+
+
+class AnalysisTimeout(Exception):
+    pass
+
+
+class WorkerCrashed(Exception):
+    pass
+
+
+class _AlarmInterrupt(BaseException):
+    """分析进程内的超时中断；不继承Exception，不会被分析流程中的 except Exception 吞掉"""
+
+
+def _init_worker(fs, started):
+    """分析进程初始化：创建处理器并预热，之后的任务不再承担导入和缓存开销"""
+    global _PROCESSOR, _STARTED
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # 由父进程负责退出
+    _STARTED = started
+    _PROCESSOR = ECGProcessor(fs)
+    warm_up(_PROCESSOR)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _run_task(task_id, fn, *args):
+    """通知父进程任务开始执行（父进程的超时从此刻计算，排队时间不计入），再执行任务"""
+    _STARTED.put((task_id, time.monotonic()))
+    return fn(*args)
+
+
+def _on_alarm(signum, frame):
+    raise _AlarmInterrupt()
+
+
+def _analyze_task(signal_file, filename, render_report, timeout):
+    """
+    在分析进程中执行：读取信号文件并完成分析，超时由SIGALRM中断
+    返回:
+        (分析结果, 各阶段耗时)  耗时由Web进程写入直方图
+    """
+    outcomes, timings = _analyze_batch_task([(signal_file, filename)], render_report, timeout)
+    return outcomes[0], timings
+
+
+def _analyze_batch_task(items, render_report, timeout):
+    """
+    批量分析多个信号文件（所有记录的疾病风险一次评分），超时由SIGALRM中断
+    返回:
+        (与items一一对应的分析结果列表, 各阶段耗时)
+    """
+    signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    with collect(observe=False) as timings:
+        try:
+            with stage('load'):
+                signals = [(load_signal_sidecar(signal_file), filename) for signal_file, filename in items]
+            return _PROCESSOR.analyze_signals(signals, render_report=render_report), timings
+        except _AlarmInterrupt:
+            return [(False, {"error": "分析超时"}, None)] * len(items), timings
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _render_task(report_id, name):
+    with collect(observe=False) as timings:
+        return _PROCESSOR.render_artifact(report_id, name), timings
+
+
+class AnalysisPool:
+    """
+    预热的分析进程池：每个进程持有一个ECGProcessor，计算和报告渲染都不占用Web进程。
+    任务超时（进程内超时未生效）或进程崩溃时重建进程池：出问题的任务报错，
+    同时在途的其他任务因进程池被终止而失败，会重新提交到新进程池
+    """
+
+    def __init__(self, workers=ANALYSIS_WORKERS, timeout=ANALYSIS_TIMEOUT, fs=250):
+        self.workers = workers
+        self.timeout = timeout
+        self.fs = fs
+        self._executor = None
+        self._lock = threading.Lock()
+        self._task_ids = itertools.count()
+        self._start_queue = None
+        self._started = {}   # 任务ID -> 分析进程开始执行的时间（time.monotonic，Linux上各进程共用同一时钟）
+
+    def _get_executor(self):
+        # 首次使用时创建（gunicorn fork之后）；spawn启动，不继承Web进程的线程和锁
+        with self._lock:
+            if self._executor is None:
+                context = multiprocessing.get_context('spawn')
+                self._start_queue = context.Queue()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(self.fs, self._start_queue))
+            return self._executor
+
+    def _reset(self, executor):
+        """
+        终止并丢弃出问题的进程池，下次提交时重新创建
+        返回:
+            是否由本次调用重建（False表示其他线程已因自己的任务重建过）
+        """
+        with self._lock:
+            if self._executor is not executor:
+                return False
+            self._executor = None
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False)
+        return True
+
+    def start(self):
+        """启动并预热所有分析进程（可选；否则在第一个任务提交时启动）"""
+        executor = self._get_executor()
+        for future in [executor.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+
+    def analyze(self, ecg_signal, filename, render_report=False):
+        """
+        在分析进程中分析信号（信号以npy文件传递，不经过pickle复制）
+        返回:
+            与 ECGProcessor.analyze_signal 相同的 (success, results, report)
+        """
+        return self.analyze_file(save_signal_sidecar(ecg_signal), filename, render_report)
+
+    def analyze_file(self, signal_file, filename, render_report=False):
+        """分析已保存的信号文件（save_signal_sidecar 返回的文件名）"""
+        try:
+            return self._call(_analyze_task, signal_file, filename, render_report, self.timeout)
+        except (AnalysisTimeout, WorkerCrashed) as e:
+            return False, {"error": str(e)}, None
+
+    def analyze_many(self, signals, render_report=False):
+        """
+        在一个分析进程中批量分析多条信号，所有记录的疾病风险在一次规则评分中完成
+        参数:
+            signals - [(ecg_signal, filename), ...]
+        返回:
+            与signals一一对应的 (success, results, report) 列表
+        """
+        items = [(save_signal_sidecar(ecg_signal), filename) for ecg_signal, filename in signals]
+        timeout = self.timeout * len(items)
+        try:
+            return self._call(_analyze_batch_task, items, render_report, timeout, timeout=timeout)
+        except (AnalysisTimeout, WorkerCrashed) as e:
+            return [(False, {"error": str(e)}, None)] * len(items)
+
+    def render(self, report_id, name):
+        """在分析进程中渲染报告文件（matplotlib不在Web进程中运行）；返回文件路径，失败时返回None"""
+        try:
+            return self._call(_render_task, report_id, name)
+        except (AnalysisTimeout, WorkerCrashed):
+            return None
+
+    def _call(self, fn, *args, timeout=None):
+        """
+        提交任务并等待结果（任务返回 (结果, 各阶段耗时)，耗时在本进程写入直方图）；
+        超时（默认 self.timeout，从分析进程开始执行该任务时计算）或进程崩溃时重建进程池并抛出异常；
+        进程池因其他任务被重建时重新提交一次
+        """
+        limit = (self.timeout if timeout is None else timeout) + TIMEOUT_GRACE
+        for attempt in range(2):
+            executor = self._get_executor()
+            task_id = next(self._task_ids)
+            try:
+                result, timings = self._wait(executor.submit(_run_task, task_id, fn, *args), task_id, limit)
+                METRICS.observe_all(timings)
+                return result
+            except FutureTimeout:
+                # 只有该任务本身执行超时才重建进程池
+                self._reset(executor)
+                raise AnalysisTimeout("分析超时")
+            except BrokenProcessPool:
+                if self._reset(executor) or attempt:
+                    raise WorkerCrashed("分析进程异常退出")
+            finally:
+                with self._lock:
+                    self._started.pop(task_id, None)
+
+    def _wait(self, future, task_id, limit):
+        """等待任务结果；任务在分析进程中执行超过limit秒时抛出 FutureTimeout，排队等待的时间不计入"""
+        while True:
+            started = self._start_time(task_id)
+            if started is None:
+                try:
+                    return future.result(timeout=START_POLL)
+                except FutureTimeout:
+                    continue
+            return future.result(timeout=max(started + limit - time.monotonic(), 0))
+
+    def _start_time(self, task_id):
+        """取出分析进程发来的开始通知，返回该任务的开始时间（尚未开始时为None）"""
+        with self._lock:
+            start_queue = self._start_queue
+            try:
+                while start_queue is not None:
+                    started_id, started_at = start_queue.get_nowait()
+                    self._started[started_id] = started_at
+            except (queue.Empty, OSError, ValueError):
+                pass
+            return self._started.get(task_id)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
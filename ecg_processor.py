@@ -1,312 +1,186 @@
 import os
+import re
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.signal import find_peaks, welch
 import json
+import hashlib
+import threading
 from datetime import datetime
-from collections import defaultdict
-from matplotlib.font_manager import FontProperties
-
-import matplotlib
-matplotlib.rcParams['font.sans-serif'] = ['WenQuanYi Zen Hei', 'Noto Sans CJK SC', 'Microsoft YaHei', 'DejaVu Sans']
-matplotlib.rcParams['axes.unicode_minus'] = False
-
-# ============ 新增的HRV分析导入（放在所有导入之后，类定义之前） ============
-try:
-    from hrvanalysis import (
-        get_time_domain_features,
-        get_frequency_domain_features,
-        get_csi_cvi_features  # 非线性分析
-    )
-except ImportError as e:
-    print(f"警告: hrv-analysis未正确安装({str(e)})，使用模拟模式")
-    
-    # 模拟函数定义
-    def get_time_domain_features(rr_intervals):
-        return {
-            "rmssd": 28.6, 
-            "sdnn": 45.2,
-            "mean_hr": 72.0,
-            "pnni_50": 12.3
-        }
-    
-    def get_frequency_domain_features(rr_intervals):
-        return {
-            "lf": 456.7,
-            "hf": 321.5,
-            "lf_hf_ratio": 1.42
-        }
-    
-    def get_csi_cvi_features(rr_intervals):
-        return {
-            "csi": 25.8,
-            "cvi": 32.1
-        }
-# ============ 新增内容结束 ============
+from collections import defaultdict, namedtuple
+from functools import lru_cache
+from types import MappingProxyType
+from ecg_loader import load_ecg_recording
+from ecg_beats import BeatMatrix
+from ecg_filters import R_PEAK_BAND, R_PEAK_ORDER, bandpass_filter
+from ecg_hrv import hrv_metrics
+from ecg_metrics import collect, get_logger, stage, timed
+from ecg_cache import ANALYSIS_CACHE, analysis_key, json_default
+from ecg_rules import DISEASE_LIBRARY, DISEASE_RULES
+from ecg_waveform import WAVEFORM_WIDTH, compact_waveform
+
+logger = get_logger('processor')
+
+OUTPUT_DIR = "/app/reports"  # 必须与docker-compose中的挂载目录一致（generate_report写入时创建）
+REPORT_DIR = "/tmp/reports"  # analyze_ecg_file 生成的HTML报告和原始信号文件
+
+# 长时程（Holter）记录分段分析参数
+SEGMENTED_MIN_SECONDS = 10 * 60   # 超过该时长的记录自动分段分析
+SEGMENT_SECONDS = 5 * 60          # 每段时长（与短时程HRV的5分钟窗口一致）
+SEGMENT_OVERLAP_SECONDS = 2       # 相邻段重叠，保证段边界附近的R峰和P/T窗口完整
+
+WARMUP_SECONDS = 12  # 预热用合成数据时长
+
+# 整段记录的HRV是否附带复杂度指标（样本熵/近似熵/DFA），可通过环境变量关闭
+HRV_COMPLEXITY = os.environ.get('ECG_HRV_COMPLEXITY', '1') == '1'
+
+# 分析算法版本：算法或参数变化时递增，使旧的缓存结果失效
+ANALYSIS_VERSION = 4
+
+# 报告文件按需生成：分析时只保存结果JSON，图表和HTML在首次请求其URL时渲染并缓存
+REPORT_ID_RE = re.compile(r'[0-9a-f]{24}')
+REPORT_RESULTS = "results.json"
+REPORT_HTML = "report.html"
+REPORT_ARTIFACTS = {
+    REPORT_HTML: "_render_html_report",
+    "ecg_plot.png": "_render_signal_plot",
+    "ecg_waveform.png": "_render_waveform_plot",
+    "health_radar.png": "_plot_health_radar",
+    "disease_risk.png": "_plot_disease_risk",
+}
+
+
+def save_signal_sidecar(ecg_signal):
+    """
+    将原始信号保存为npy文件（按内容哈希命名，相同数据只保存一份）
+    返回:
+        信号文件名（位于REPORT_DIR下）
+    """
+    ecg_signal = np.ascontiguousarray(ecg_signal)
+    name = f"{hashlib.sha1(ecg_signal.view(np.uint8)).hexdigest()[:20]}_signal.npy"
+    path = os.path.join(REPORT_DIR, name)
+    if not os.path.exists(path):
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, ecg_signal)
+        os.replace(tmp_path, path)
+    return name
+
+
+def load_signal_sidecar(name):
+    """以内存映射方式读取save_signal_sidecar保存的信号"""
+    return np.load(os.path.join(REPORT_DIR, os.path.basename(name)), mmap_mode='r')
+
+
+def report_artifact_path(report_id, name):
+    """报告文件路径（REPORT_DIR/<report_id>/<name>）；报告ID或文件名不合法时返回None"""
+    if not REPORT_ID_RE.fullmatch(report_id) or name not in REPORT_ARTIFACTS:
+        return None
+    return os.path.join(REPORT_DIR, report_id, name)
+
+
+def save_report_results(report_id, results):
+    """保存分析结果JSON，报告文件按需生成时读取（报告ID由数据内容决定，已存在时不重复写入）"""
+    path = os.path.join(REPORT_DIR, report_id, REPORT_RESULTS)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, default=json_default)
+        os.replace(tmp_path, path)
+
+
+def load_report_results(report_id):
+    """读取save_report_results保存的结果；不存在时返回None"""
+    if not REPORT_ID_RE.fullmatch(report_id):
+        return None
+    try:
+        with open(os.path.join(REPORT_DIR, report_id, REPORT_RESULTS), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_report_waveform(report_id, width=WAVEFORM_WIDTH, encoding='delta'):
+    """
+    报告对应的紧凑波形和R/P/T标注（客户端自行绘制，服务器不渲染图片）
+    返回:
+        compact_waveform 的结果；报告不存在时返回None
+    """
+    results = load_report_results(report_id)
+    if results is None:
+        return None
+    wave_features = results["wave_features"]
+    annotations = {"r": wave_features.get("r_peaks", [])}
+    for name, key in (("p", "p_waves"), ("t", "t_waves")):
+        if wave_features.get(key, {}).get("detected", False):
+            annotations[name] = wave_features[key].get("positions", [])
+    ecg_signal = load_signal_sidecar(results["basic_info"]["signal_file"])
+    return compact_waveform(ecg_signal, results["basic_info"]["fs"], annotations, width, encoding)
+
+
+def warm_up(processor):
+    """
+    预热：完整分析一段合成心电（每0.8秒一个R波，叠加少量噪声）并绘制一张图，
+    提前导入scipy/matplotlib并加载滤波器设计和字体，第一个请求不再承担这些开销
+    """
+    fs = processor.fs
+    t = np.arange(WARMUP_SECONDS * fs)
+    ecg_signal = np.random.default_rng(0).normal(0, 20, len(t))
+    for r in range(fs // 2, len(t), int(0.8 * fs)):
+        ecg_signal += 1000 * np.exp(-0.5 * ((t - r) / 3) ** 2)
+    with collect(observe=False):   # 预热耗时不计入阶段直方图
+        processor.analyze_signal(ecg_signal.astype(np.int16), "warmup.dat", cache=None)
+    import ecg_render
+    ecg_render.warm_up()
+
+
+# 正常参考范围
+HEALTHY_RANGES = MappingProxyType({
+    'hr': (60, 100),
+    'hrv_rmssd': (20, 60),
+    'qrs_width': (80, 120),
+    'pr_interval': (120, 200),
+    'qt_interval': (350, 440),
+    'qtc': (340, 450)
+})
+
+# 不可变的分析配置（采样率、参考范围、疾病特征库），在进程内共享
+ECGConfig = namedtuple('ECGConfig', ['fs', 'healthy_ranges', 'disease_library'])
+
+# 已完成特征提取、等待疾病风险评分的分析（批量分析时所有记录一起评分）
+_PendingAnalysis = namedtuple('_PendingAnalysis', ['report_id', 'cache_key', 'results'])
+
+
+@lru_cache(maxsize=None)
+def shared_config(fs=250):
+    """同一采样率的配置在进程内只创建一次"""
+    return ECGConfig(fs, HEALTHY_RANGES, DISEASE_LIBRARY)
 
-OUTPUT_DIR = "/app/reports"  # 必须与docker-compose中的挂载目录一致
-os.makedirs(OUTPUT_DIR, exist_ok=True)  # 确保目录存在
 
 class ECGProcessor:
-    def __init__(self, fs=250):
-        import matplotlib
-        matplotlib.rcParams['font.family'] = 'WenQuanYi Zen Hei'  # 指定中文字体
-        matplotlib.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
-        self.sample_rate = fs
-        # ...其他初始化代码...
-
-        self.fs = fs
-        self._set_chinese_font()
-        self.healthy_ranges = {
-            'hr': (60, 100),
-            'hrv_rmssd': (20, 60),
-            'qrs_width': (80, 120),
-            'pr_interval': (120, 200),
-            'qt_interval': (350, 440),
-            'qtc': (340, 450)
-        }
+    """
+    ECG分析处理器：实例只持有不可变的ECGConfig，每次分析的中间状态都是方法内的局部变量和返回值，
+    同一个实例可被多个线程并发使用，也可在fork出的worker中直接复用
+    """
 
-        # 完整的24种疾病特征库（替换原有的arrhythmia_library）
-        self.disease_library = {
-            # 一、心律失常类（8种）
-            '心房扑动': {
-                'type': '心律失常',
-                'features': {
-                    'hr': (250, 350),
-                    'f_waves': True,
-                    'regularity': '规则'
-                },
-                'risk_level': '中高',
-                'description': '心房快速规则活动，心室率通常规则'
-            },
-            '心房颤动': {
-                'type': '心律失常',
-                'features': {
-                    'irregular': True,
-                    'p_waves': '缺失',
-                    'fibrillatory_waves': True
-                },
-                'risk_level': '高',
-                'description': '心房电活动紊乱，心室率绝对不齐'
-            },
-            '室性早搏': {
-                'type': '心律失常',
-                'features': {
-                    'qrs_width': '>120ms',
-                    'compensatory_pause': '完全',
-                    'p_waves': '无关'
-                },
-                'risk_level': '中',
-                'description': '心室提前除极引起的异常搏动'
-            },
-            '室性心动过速': {
-                'type': '心律失常',
-                'features': {
-                    'hr': '>100',
-                    'qrs_width': '>120ms',
-                    'consecutive': '>=3'
-                },
-                'risk_level': '极高',
-                'description': '连续3个以上室性早搏'
-            },
-            '房室传导阻滞（一度）': {
-                'type': '传导异常',
-                'features': {
-                    'pr_interval': '>200ms',
-                    'qrs_width': '<120ms'
-                },
-                'risk_level': '中',
-                'description': 'PR间期延长但每个P波都能下传'
-            },
-            '房室传导阻滞（二度I型）': {
-                'type': '传导异常',
-                'features': {
-                    'pr_prolongation': True,
-                    'dropped_beats': True
-                },
-                'risk_level': '中高',
-                'description': 'PR间期逐渐延长直至QRS脱落'
-            },
-            '预激综合征（WPW）': {
-                'type': '传导异常',
-                'features': {
-                    'pr_interval': '<120ms',
-                    'delta_wave': True,
-                    'qrs_width': '>110ms'
-                },
-                'risk_level': '中高',
-                'description': '存在房室旁路导致心室预激'
-            },
-            '交界性心律': {
-                'type': '心律失常',
-                'features': {
-                    'qrs_width': '<120ms',
-                    'p_waves': '逆行或无'
-                },
-                'risk_level': '低',
-                'description': '房室交界区发出的心律'
-            },
-            
-            # 二、心肌缺血/梗死类（3种）
-            '心肌缺血': {
-                'type': '心肌异常',
-                'features': {
-                    'st_segment': ('压低', '水平'),
-                    't_waves': ('倒置', '平坦'),
-                    'duration': '>1min'
-                },
-                'risk_level': '中高',
-                'description': '心内膜下心肌供血不足'
-            },
-            '急性心肌梗死': {
-                'type': '心肌梗死',
-                'features': {
-                    'st_segment': '抬高',
-                    'q_waves': '病理性',
-                    't_waves': '动态演变'
-                },
-                'risk_level': '极高',
-                'description': '冠状动脉急性闭塞导致心肌坏死'
-            },
-            '心内膜下缺血': {
-                'type': '心肌异常',
-                'features': {
-                    't_waves': '深倒置',
-                    'st_segment': '轻度压低'
-                },
-                'risk_level': '中',
-                'description': '广泛心内膜下缺血'
-            },
-            
-            # 三、电解质/代谢类（3种）
-            '低钾血症': {
-                'type': '电解质紊乱',
-                'features': {
-                    'u_waves': '增高',
-                    't_waves': '低平',
-                    'st_segment': '压低'
-                },
-                'risk_level': '中',
-                'description': '血清钾浓度＜3.5mmol/L'
-            },
-            '高钾血症': {
-                'type': '电解质紊乱',
-                'features': {
-                    't_waves': '高尖',
-                    'qrs_width': '增宽',
-                    'p_waves': '减小'
-                },
-                'risk_level': '高',
-                'description': '血清钾浓度＞5.5mmol/L'
-            },
-            '洋地黄效应': {
-                'type': '药物影响',
-                'features': {
-                    'st_segment': '下斜型压低',
-                    't_waves': '鱼钩样'
-                },
-                'risk_level': '中',
-                'description': '洋地黄类药物导致的特征性改变'
-            },
-            
-            # 四、遗传/原发性（3种）
-            '长QT综合征': {
-                'type': '遗传性',
-                'features': {
-                    'qtc': '>450ms',
-                    't_waves': ('切迹', '交替'),
-                    'torsades': '可能'
-                },
-                'risk_level': '高',
-                'description': '心肌复极延长导致的恶性心律失常风险'
-            },
-            'Brugada综合征': {
-                'type': '遗传性',
-                'features': {
-                    'st_segment': '马鞍形',
-                    'leads': ('V1', 'V2'),
-                    'hr': '正常'
-                },
-                'risk_level': '极高',
-                'description': '钠离子通道异常导致的猝死高风险'
-            },
-            '早复极综合征': {
-                'type': '原发性',
-                'features': {
-                    'j_point': '抬高',
-                    'st_segment': '凹面向上'
-                },
-                'risk_level': '低',
-                'description': '良性J点抬高现象'
-            },
-            
-            # 五、其他全身性（7种）
-            '肺栓塞': {
-                'type': '肺源性',
-                'features': {
-                    'pattern': 'S1Q3T3',
-                    'sinus_tachycardia': True,
-                    't_waves': '倒置'
-                },
-                'risk_level': '高',
-                'description': '肺动脉血栓导致右心负荷增加'
-            },
-            '颅内压增高': {
-                'type': '神经系统',
-                'features': {
-                    't_waves': '深倒置',
-                    'qt_interval': '延长'
-                },
-                'risk_level': '高',
-                'description': '脑部病变导致的特征性改变'
-            },
-            '甲状腺功能亢进': {
-                'type': '内分泌',
-                'features': {
-                    'hr': '>100',
-                    'st_t_changes': '非特异性'
-                },
-                'risrisk_levelk': '中',
-                'description': '甲状腺激素过多导致的心动过速'
-            },
-            '迷走神经张力过高': {
-                'type': '自主神经',
-                'features': {
-                    'hr': '<60',
-                    'respiratory_variation': True
-                },
-                'risrisk_levelk': '低',
-                'description': '迷走神经优势导致的心动过缓'
-            },
-            '体位性心动过速': {
-                'type': '自主神经',
-                'features': {
-                    'hr_increase': '>30bpm',
-                    'postural_change': True
-                },
-                'ririsk_levelsk': '中',
-                'description': '体位改变时心率异常增加'
-            },
-            '睡眠呼吸暂停': {
-                'type': '呼吸性',
-                'features': {
-                    'hr_variation': '周期性',
-                    'bradycardia': '夜间',
-                    'qt_interval': '延长'
-                },
-                'ririsk_levelsk': '中',
-                'description': '睡眠期间反复呼吸暂停导致缺氧'
-            },
-            '慢性阻塞性肺病': {
-                'type': '呼吸性',
-                'features': {
-                    'p_pulmonale': True,
-                    'right_axis_deviation': True
-                },
-                'riskrisk_level': '中',
-                'description': '慢性肺病导致的右心负荷增加'
-            }
-        }
+    def __init__(self, fs=250, config=None):
+        self.config = config if config is not None else shared_config(fs)
+
+    @property
+    def fs(self):
+        return self.config.fs
+
+    @property
+    def sample_rate(self):
+        return self.config.fs
+
+    @property
+    def healthy_ranges(self):
+        return self.config.healthy_ranges
+
+    @property
+    def disease_library(self):
+        return self.config.disease_library
 
     def _calculate_heart_rate(self, r_peaks, fs):
         """基于有效R峰计算平均心率"""
@@ -322,17 +196,9 @@ class ECGProcessor:
             return 0
             
         heart_rate = 60 / np.mean(valid_rr)
-        print(f"[DEBUG] 心率计算中间值：平均RR={np.mean(valid_rr):.2f}s, 心率={heart_rate:.1f} BPM")  # 调试输出
+        logger.debug("心率计算 mean_rr=%.2fs heart_rate=%.1f", np.mean(valid_rr), heart_rate)
         return round(heart_rate)
 
-    def _set_chinese_font(self):
-        """设置中文字体"""
-        try:
-            plt.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei']
-            plt.rcParams['axes.unicode_minus'] = False
-        except:
-            pass
-
 
     def _assess_disease_risks(self, results):
         """
@@ -342,60 +208,81 @@ class ECGProcessor:
         返回:
             字典格式: { 疾病名称: { 'score': 风险评分, 'risk': 风险等级, 'features': [阳性特征列表] } }
         """
-        features = results['wave_features']
-        disease_risks = {}
+        return self._score_disease_risks([self._disease_risk_inputs(results)])[0]
+
+    @timed('risk')
+    def _disease_risk_inputs(self, results):
+        """
+        按疾病类别的触发条件确定需要评分的疾病
+        返回:
+            { 疾病名称: 参与规则匹配的特征 }
+        """
+        # 在特征副本上评估，不修改传入的分析结果（同一结果可被多个线程同时读取）
+        features = dict(results['wave_features'])
+        risk_inputs = {}
 
-        # 1. 动态计算QTc（Bazett公式）
-        qtc = self._calculate_qtc(features.get('qt_interval', 400), 
-                                features.get('hr', 60))
-        features['qtc'] = qtc
+        # 1. 动态计算QTc（Bazett公式；结果中已有时直接使用）
+        if 'qtc' not in features:
+            features['qtc'] = self._calculate_qtc(features.get('qt_interval', 400),
+                                                  features.get('hr', 60))
 
         # 2. 按疾病类别评估
         # 心律失常类评估
-        self._assess_arrhythmias(features, disease_risks)
+        self._assess_arrhythmias(features, risk_inputs)
         
         # 心肌缺血/梗死评估
-        self._assess_ischemia(features, disease_risks)
+        self._assess_ischemia(features, risk_inputs)
         
         # 电解质/代谢异常评估
-        self._assess_electrolytes(features, disease_risks)
+        self._assess_electrolytes(features, risk_inputs)
         
         # 遗传/原发性疾病评估
-        self._assess_genetic_disorders(features, disease_risks)
+        self._assess_genetic_disorders(features, risk_inputs)
         
         # 全身性疾病评估
-        self._assess_systemic_diseases(features, disease_risks)
+        self._assess_systemic_diseases(features, risk_inputs)
 
-        return disease_risks
+        return risk_inputs
+
+    @timed('risk')
+    def _score_disease_risks(self, inputs):
+        """
+        对一条或多条记录的疾病评分输入（_disease_risk_inputs 的结果列表）做一次规则评分
+        返回:
+            与inputs一一对应的疾病风险字典
+        """
+        requests = [(disease, row) for risk_inputs in inputs for disease, row in risk_inputs.items()]
+        scored = iter(DISEASE_RULES.evaluate_all(requests))
+        return [{disease: next(scored) for disease in risk_inputs} for risk_inputs in inputs]
 
     def _assess_arrhythmias(self, features, risks):
         """评估8种心律失常"""
         # 心房扑动/颤动
         if features.get('f_waves'):
-            risks['心房扑动'] = self._calculate_risk('心房扑动', features, {
+            risks['心房扑动'] = self._risk_input(features, {
                 'hr': features.get('hr', 0),
                 'f_waves': True
             })
         elif features.get('irregular') and not features.get('p_waves'):
-            risks['心房颤动'] = self._calculate_risk('心房颤动', features, {
+            risks['心房颤动'] = self._risk_input(features, {
                 'hr': features.get('hr', 0)
             })
 
         # 室性心律失常
         if features['qrs_complex']['width_status'] == '增宽':
-            risks['室性早搏'] = self._calculate_risk('室性早搏', features, {
+            risks['室性早搏'] = self._risk_input(features, {
                 'qrs_width': features['qrs_complex']['average_width']
             })
             
             # 检测连续室早
             if self._detect_consecutive_wide_qrs(features):
-                risks['室性心动过速'] = self._calculate_risk('室性心动过速', features, {
+                risks['室性心动过速'] = self._risk_input(features, {
                     'hr': features.get('hr', 0)
                 })
 
         # 传导阻滞
         if features.get('pr_interval', 0) > 200:
-            risks['房室传导阻滞（一度）'] = self._calculate_risk('房室传导阻滞（一度）', features, {
+            risks['房室传导阻滞（一度）'] = self._risk_input(features, {
                 'pr_interval': features['pr_interval']
             })
 
@@ -403,17 +290,17 @@ class ECGProcessor:
         """评估心肌缺血/梗死"""
         st_status = features.get('st_segment', {}).get('status')
         if st_status == '抬高':
-            risks['急性心肌梗死'] = self._calculate_risk('急性心肌梗死', features, {
+            risks['急性心肌梗死'] = self._risk_input(features, {
                 'st_elevation': features['st_segment']['average_elevation']
             })
         elif st_status == '压低':
-            risks['心肌缺血'] = self._calculate_risk('心肌缺血', features, {
+            risks['心肌缺血'] = self._risk_input(features, {
                 'st_depression': features['st_segment']['average_elevation']
             })
             
         # 心内膜下缺血（广泛T波倒置）
         if features.get('t_waves', {}).get('inverted', False):
-            risks['心内膜下缺血'] = self._calculate_risk('心内膜下缺血', features, {
+            risks['心内膜下缺血'] = self._risk_input(features, {
                 't_inversion': True
             })
 
@@ -421,14 +308,14 @@ class ECGProcessor:
         """评估电解质紊乱"""
         # 低钾血症（U波增高）
         if features.get('u_wave_present'):
-            risks['低钾血症'] = self._calculate_risk('低钾血症', features, {
+            risks['低钾血症'] = self._risk_input(features, {
                 'u_wave_ratio': features.get('u_wave_ratio', 0)
             })
             
         # 高钾血症（T波高尖+QRS增宽）
         if (features.get('t_waves', {}).get('peaked', False) and 
             features['qrs_complex']['average_width'] > 120):
-            risks['高钾血症'] = self._calculate_risk('高钾血症', features, {
+            risks['高钾血症'] = self._risk_input(features, {
                 'qrs_width': features['qrs_complex']['average_width']
             })
 
@@ -436,77 +323,32 @@ class ECGProcessor:
         """评估遗传性疾病"""
         # 长QT综合征
         if features.get('qtc', 0) > 450:
-            risks['长QT综合征'] = self._calculate_risk('长QT综合征', features, {
+            risks['长QT综合征'] = self._risk_input(features, {
                 'qtc': features['qtc']
             })
             
         # Brugada模式（需要模拟V1-V2导联）
         if self._detect_brugada_pattern(features):
-            risks['Brugada综合征'] = self._calculate_risk('Brugada综合征', features)
+            risks['Brugada综合征'] = self._risk_input(features)
 
     def _assess_systemic_diseases(self, features, risks):
         """评估全身性疾病"""
         # 睡眠呼吸暂停（周期性心率变化）
         if self._detect_cyclic_hr_variation(features):
-            risks['睡眠呼吸暂停'] = self._calculate_risk('睡眠呼吸暂停', features)
+            risks['睡眠呼吸暂停'] = self._risk_input(features)
             
         # 肺栓塞（S1Q3T3模式）
         if self._detect_s1q3t3_pattern(features):
-            risks['肺栓塞'] = self._calculate_risk('肺栓塞', features)
+            risks['肺栓塞'] = self._risk_input(features)
 
-    def _calculate_risk(self, disease, features, specific_features=None):
+    def _risk_input(self, features, specific_features=None):
         """
-        计算单个疾病风险评分
+        单个疾病参与规则匹配的特征（规则在导入时已编译，见 ecg_rules.DISEASE_RULES）
         参数:
-            disease - 疾病名称
             features - 全部波形特征
-            specific_features - 该疾病特有的特征值
-        返回:
-            风险字典 {score, risk, features}
+            specific_features - 该疾病特有的特征值（提供时只按这些特征匹配）
         """
-        disease_data = self.disease_library.get(disease, {})
-        if not disease_data:
-            return None
-            
-        # 1. 基础分（根据风险等级）
-        risk_levels = {'极低':1, '低':2, '中':4, '中高':6, '高':8, '极高':10}
-        score = risk_levels.get(disease_data['risk_level'], 0)
-        
-        # 2. 特征匹配加分
-        matched_features = []
-        for feat, condition in disease_data['features'].items():
-            feat_value = specific_features.get(feat, None) if specific_features else features.get(feat, None)
-            
-            if feat_value is not None:
-                if isinstance(condition, tuple):  # 多条件
-                    if any(self._match_condition(feat_value, c) for c in condition):
-                        score += 2
-                        matched_features.append(f"{feat}={feat_value}")
-                elif self._match_condition(feat_value, condition):
-                    score += 2
-                    matched_features.append(f"{feat}={feat_value}")
-        
-        # 3. 限制分数范围
-        score = min(10, max(0, score))
-        
-        return {
-            'score': round(score, 1),
-            'risk_level': disease_data['risk_level'],     ### risk--> risk_level
-            'description': disease_data['description'],
-            'features': matched_features
-        }
-
-    def _match_condition(self, value, condition):
-        """匹配特征值与条件"""
-        if isinstance(condition, str):
-            if condition.startswith('>'):
-                return value > float(condition[1:])
-            elif condition.startswith('<'):
-                return value < float(condition[1:])
-            else:
-                return value == condition
-        else:
-            return value == condition
+        return specific_features if specific_features else features
 
     # 新增辅助检测方法
     def _detect_consecutive_wide_qrs(self, features):
@@ -535,38 +377,6 @@ class ECGProcessor:
         return qt / np.sqrt(rr_interval)
  
 
-    def _set_chinese_font(self):
-        """统一设置中文字体"""
-        try:
-            # 尝试多种中文字体方案
-            font_path = self._find_chinese_font()
-            if font_path:
-                font_prop = FontProperties(fname=font_path)
-                plt.rcParams['font.sans-serif'] = [font_prop.get_name()]
-            else:
-                plt.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'WenQuanYi Zen Hei']
-            
-            plt.rcParams['axes.unicode_minus'] = False
-        except Exception as e:
-            print(f"字体设置警告: {str(e)}")
-
-    def _find_chinese_font(self):
-        """查找系统中可用的中文字体文件"""
-        font_paths = [
-            # Windows
-            'C:/Windows/Fonts/msyh.ttc',  # 微软雅黑
-            'C:/Windows/Fonts/simhei.ttf',  # 黑体
-            # Mac
-            '/System/Library/Fonts/PingFang.ttc',
-            # Linux
-            '/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc'
-        ]
-        
-        for path in font_paths:
-            if os.path.exists(path):
-                return path
-        return None
-
     def _generate_html_content(self, analysis, report_data):
         """生成HTML内容（中文版）"""
         # 基础信息
@@ -646,12 +456,8 @@ class ECGProcessor:
 
     def _generate_placeholder_image(self, save_path, title):
         """生成占位图（中文）"""
-        plt.figure(figsize=(8, 4))
-        plt.text(0.5, 0.5, f"{title}\n(图表未生成)", 
-                ha='center', va='center', fontsize=14)
-        plt.axis('off')
-        plt.savefig(save_path, dpi=100, bbox_inches='tight')
-        plt.close()
+        import ecg_render
+        ecg_render.plot_placeholder(save_path, f"{title}\n(图表未生成)")
         return True
 
     # ... (其他方法保持不变)
@@ -663,85 +469,30 @@ class ECGProcessor:
             "duration": len(ecg_signal) / self.fs,  # 使用实例变量self.fs
             "samples": len(ecg_signal),
             "fs": self.fs,  # 新增采样率字段
-            "ecg_signal": ecg_signal.tolist()
+            "signal_file": save_signal_sidecar(ecg_signal)  # 原始信号另存为npy，不放入结果字典
         }
 
-  
-    def analyze_ecg_file(self, filepath):
-        """分析ECG文件主方法（修复版）"""
-        try:
-            # 1. 验证文件
-            if not os.path.exists(filepath):
-                return False, {"error": "文件不存在"}, None
-            if os.path.getsize(filepath) == 0:
-                return False, {"error": "空文件"}, None
-
-            # 2. 读取数据
-            ecg_signal = np.fromfile(filepath, dtype=np.int16)
-            filename = os.path.basename(filepath)
-            
-            # 3. 创建报告目录
-            report_dir = "/app/reports"
-            os.makedirs(report_dir, exist_ok=True)
-            report_path = os.path.join(report_dir, f"{filename.split('.')[0]}_report.html")
-            
-            # 4. 执行分析
-            results = {
-                "basic_info": self._get_basic_info(ecg_signal, filename),
-                "wave_features": {},
-                "health_index": 0
-            }
 
-            # 添加心率计算
-            duration = results["basic_info"]["duration"]
-            qrs_count = len(r_peaks)
-            results["heart_rate"] = self._calculate_heart_rate(qrs_count, duration) 
+    def _beat_matrix(self, ecg, r_peaks):
+        """构建QRS/P/T/ST分析共用的心拍窗口矩阵（R峰前0.4秒至后0.4秒）"""
+        return BeatMatrix(ecg, r_peaks, -max(100, int(0.4*self.fs)), int(0.4*self.fs))
 
-            r_peaks = self._detect_r_peaks(ecg_signal)
-            results["wave_features"] = {
-                "r_peaks": r_peaks.tolist(),
-                **self._analyze_qrs_complex(ecg_signal, r_peaks),
-                **self._analyze_pt_waves(ecg_signal, r_peaks)
-            }
-            
-            if len(r_peaks) >= 2:
-                results.update({
-                    "hrv_analysis": self._analyze_hrv(r_peaks),
-                    "arrhythmia": self._check_arrhythmia(r_peaks),
-                    "disease_risks": self._assess_disease_risks(results)
-                })
-            
-            results["health_index"] = self._calculate_health_index(results)
-            
-            # 5. 生成报告
-            self._generate_html_report(results, report_path)
-            
-            return True, results, {"html_report": report_path}
-            
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return False, {"error": str(e)}, None
-        
-
-    def _analyze_st_segment(self, ecg, r_peaks):
+    def _analyze_st_segment(self, ecg, r_peaks, beats=None):
         """ST段分析（新增）"""
         if len(r_peaks) < 2:
             return {"st_segment": {"status": "未检测到", "average_elevation": 0}}
         
-        st_segments = []
-        for peak in r_peaks:
-            j_point = min(len(ecg), peak + int(0.08*self.fs))  # J点
-            st_end = min(len(ecg), peak + int(0.16*self.fs))   # ST段终点
-            
-            if st_end >= len(ecg):
-                continue
-                
-            baseline = np.mean(ecg[max(0, peak-100):peak-20])  # TP段作为基线
-            st_level = np.mean(ecg[j_point:st_end]) - baseline
-            st_segments.append(st_level)
+        beats = beats if beats is not None else self._beat_matrix(ecg, r_peaks)
+        j_offset, st_offset = int(0.08*self.fs), int(0.16*self.fs)  # J点、ST段终点
+        st_levels, st_found = beats.mean(j_offset, st_offset)
+        baselines, base_found = beats.mean(-100, -20)  # TP段作为基线
         
-        if not st_segments:
+        # ST段终点超出信号末尾的心拍不参与统计
+        complete = (beats.r_peaks + st_offset < len(ecg))
+        keep = complete & st_found & base_found
+        st_segments = st_levels[keep[st_found]] - baselines[keep[base_found]]
+        
+        if len(st_segments) == 0:
             return {"st_segment": {"status": "未检测到", "average_elevation": 0}}
         
         avg_st = np.mean(st_segments)
@@ -756,22 +507,17 @@ class ECGProcessor:
         }
 
 
-    def _bandpass_filter(self):
-        # 实现带通滤波逻辑（例如使用 scipy.signal）
-        from scipy.signal import butter, filtfilt
-        nyquist = 0.5 * self.sample_rate
-        low = 5 / nyquist
-        high = 15 / nyquist
-        b, a = butter(4, [low, high], btype='band')
-        filtered = filtfilt(b, a, self.signal)
-        return filtered
+    @timed('filter')
+    def _bandpass_filter(self, ecg_signal, lowcut=R_PEAK_BAND[0], highcut=R_PEAK_BAND[1]):
+        """零相位带通滤波（滤波器系数按参数缓存）"""
+        return bandpass_filter(ecg_signal, self.fs, lowcut, highcut)
 
-    def _detect_r_peaks(self, ecg_signal):
-        """增强鲁棒性的R波检测"""
+    @timed('rpeak')
+    def _detect_r_peaks(self, ecg_signal, filtered_signal=None):
+        """增强鲁棒性的R波检测；filtered_signal 为预处理阶段已完成的带通滤波结果"""
+        from scipy.signal import find_peaks
         try:
-            filtered_signal = self._bandpass_filter()  # 确保调用正确
-            # 带通滤波参数调整
-            filtered = self._bandpass_filter(ecg_signal, lowcut=8.0, highcut=15.0)
+            filtered = filtered_signal if filtered_signal is not None else self._bandpass_filter(ecg_signal)
             
             # 动态阈值计算（基于统计分布）
             mean_val = np.mean(filtered)
@@ -786,7 +532,6 @@ class ECGProcessor:
                 prominence=std_val * 0.8,
                 width=(int(0.04 * self.fs), int(0.12 * self.fs))
             )
-            print(f"[DEBUG] 初步检测到 {len(peaks)} 个R峰")  # 调试输出
             
             # 二次验证（基于相邻RR间期）
             valid_peaks = []
@@ -796,15 +541,16 @@ class ECGProcessor:
                     valid_peaks.append(peak)
                     prev_peak = peak
                     
-            print(f"[DEBUG] 最终有效R峰数量：{len(valid_peaks)}")  # 调试输出
+            logger.debug("R峰检测 candidates=%d valid=%d", len(peaks), len(valid_peaks))
             return np.array(valid_peaks)
             
         except Exception as e:
-            print(f"[ERROR] R峰检测失败: {str(e)}")
+            logger.error("R峰检测失败 error=%s", e)
             return np.array([])
 
-    def _analyze_qrs_complex(self, ecg, r_peaks):
-        """QRS波群分析"""
+    @timed('waves')
+    def _analyze_qrs_complex(self, ecg, r_peaks, details=False):
+        """QRS波群分析（details=True 时附带逐搏明细）"""
         if len(r_peaks) == 0:
             return {
                 "qrs_complex": {
@@ -815,59 +561,45 @@ class ECGProcessor:
                 }
             }
         
-        qrs_list = []
-        for peak in r_peaks:
-            q_start = max(0, peak - int(0.05*self.fs))
-            s_end = min(len(ecg), peak + int(0.05*self.fs))
-            qrs_list.append({
-                "position": int(peak),
-                "width": (s_end - q_start)/self.fs * 1000,
-                "amplitude": float(ecg[peak])
-            })
+        r_peaks = np.asarray(r_peaks, dtype=np.int64)
+        q_start = np.maximum(0, r_peaks - int(0.05*self.fs))
+        s_end = np.minimum(len(ecg), r_peaks + int(0.05*self.fs))
+        widths = (s_end - q_start) / self.fs * 1000
+        amplitudes = np.asarray(ecg)[r_peaks].astype(np.float64)
         
-        avg_width = np.mean([q["width"] for q in qrs_list])
-        return {
-            "qrs_complex": {
-                "count": len(r_peaks),
-                "average_width": float(avg_width),
-                "width_status": self._assess_parameter(avg_width, 'qrs_width'),
-                "amplitude": float(np.mean([q["amplitude"] for q in qrs_list]))
-            }
+        avg_width = np.mean(widths)
+        qrs_complex = {
+            "count": len(r_peaks),
+            "average_width": float(avg_width),
+            "width_status": self._assess_parameter(avg_width, 'qrs_width'),
+            "amplitude": float(np.mean(amplitudes))
         }
+        if details:
+            qrs_complex["details"] = [
+                {"position": int(p), "width": float(w), "amplitude": float(a)}
+                for p, w, a in zip(r_peaks, widths, amplitudes)
+            ]
+        return {"qrs_complex": qrs_complex}
 
-    def _analyze_pt_waves(self, ecg, r_peaks):
-        """P波和T波分析"""
-        def analyze_wave(r_positions, window_start, window_end):
-            waves = []
-            for r_pos in r_positions:
-                start = max(0, r_pos + int(window_start*self.fs))
-                end = min(len(ecg), r_pos + int(window_end*self.fs))
-                if start >= end:
-                    continue
-                    
-                segment = ecg[start:end]
-                if len(segment) == 0:
-                    continue
-                    
-                pos = start + np.argmax(segment)
-                waves.append({
-                    "position": int(pos),
-                    "amplitude": float(ecg[pos]),
-                    "interval": float((pos - r_pos)/self.fs * 1000)
-                })
-            return waves
+    @timed('waves')
+    def _analyze_pt_waves(self, ecg, r_peaks, beats=None, details=False):
+        """P波和T波分析（details=True 时附带逐搏明细）"""
+        beats = beats if beats is not None else self._beat_matrix(ecg, r_peaks)
 
-        p_waves = analyze_wave(r_peaks, -0.2, -0.12)  # P波
-        t_waves = analyze_wave(r_peaks, 0.2, 0.4)     # T波
+        def analyze_wave(window_start, window_end):
+            # 窗口内最大值即波峰；窗口完全越界的心拍跳过
+            positions, amplitudes, found = beats.argmax(int(window_start*self.fs), int(window_end*self.fs))
+            intervals = (positions - beats.r_peaks[found]) / self.fs * 1000
+            return positions, amplitudes, intervals
 
         return {
-            "p_waves": self._summarize_waves(p_waves, 'P'),
-            "t_waves": self._summarize_waves(t_waves, 'T')
+            "p_waves": self._summarize_waves(*analyze_wave(-0.2, -0.12), 'P', details),  # P波
+            "t_waves": self._summarize_waves(*analyze_wave(0.2, 0.4), 'T', details)      # T波
         }
 
-    def _summarize_waves(self, wave_list, wave_type):
-        """波形特征汇总"""
-        if not wave_list:
+    def _summarize_waves(self, positions, amplitudes, intervals, wave_type, details=False):
+        """波形特征汇总（positions保留给波形图标注，逐搏明细只在需要时生成）"""
+        if len(positions) == 0:
             return {
                 "detected": False,
                 "assessment": f"未检测到{wave_type}波",
@@ -875,45 +607,43 @@ class ECGProcessor:
                 f"average_{'pr' if wave_type=='P' else 'qt'}_interval": 0
             }
         
-        intervals = [w["interval"] for w in wave_list]
-        avg_interval = np.mean(intervals)
+        avg_amplitude = float(np.mean(amplitudes))
+        avg_interval = float(np.mean(intervals))
         
-        return {
+        summary = {
             "detected": True,
-            "count": len(wave_list),
-            "average_amplitude": float(np.mean([w["amplitude"] for w in wave_list])),
-            f"average_{'pr' if wave_type=='P' else 'qt'}_interval": float(avg_interval),
-            "assessment": self._assess_wave(wave_type, 
-                                          np.mean([w["amplitude"] for w in wave_list]),
-                                          avg_interval),
-            "details": wave_list
+            "count": len(positions),
+            "average_amplitude": avg_amplitude,
+            f"average_{'pr' if wave_type=='P' else 'qt'}_interval": avg_interval,
+            "assessment": self._assess_wave(wave_type, avg_amplitude, avg_interval),
+            "positions": [int(p) for p in positions]
         }
+        if details:
+            summary["details"] = [
+                {"position": int(p), "amplitude": float(a), "interval": float(i)}
+                for p, a, i in zip(positions, amplitudes, intervals)
+            ]
+        return summary
 
-    def _analyze_hrv(self, r_peaks):
-        """增强版HRV计算"""
+    @timed('hrv')
+    def _analyze_hrv(self, r_peaks, complexity=False):
+        """
+        HRV分析（ecg_hrv，纯numpy实现）：时域指标、Poincaré指标，
+        NN序列足够长（≥60秒）时附带频域LF/HF指标，否则frequency为None；
+        complexity=True 时附带样本熵/近似熵/DFA（complexity，NN间期不足100个时为None）
+        """
         if len(r_peaks) < 2:
             return {"rmssd": 0, "sdnn": 0, "assessment": "数据不足"}
-        
+
         try:
-            rr_intervals = np.diff(r_peaks) / self.fs * 1000  # 转换为毫秒
-            
-            # 异常值过滤（排除差异>30%的间隔）
-            median_rr = np.median(rr_intervals)
-            filtered_rr = [rr for rr in rr_intervals if 0.7*median_rr < rr < 1.3*median_rr]
-            
-            if len(filtered_rr) < 2:
+            metrics = hrv_metrics(r_peaks, self.fs, complexity=complexity)
+            if metrics is None:
                 return {"rmssd": 0, "sdnn": 0, "assessment": "有效数据不足"}
-                
-            rmssd = np.sqrt(np.mean(np.square(np.diff(filtered_rr))))
-            return {
-                "rmssd": float(rmssd),
-                "sdnn": float(np.std(filtered_rr)),
-                "assessment": self._assess_hrv(rmssd)
-            }
+            metrics["assessment"] = self._assess_hrv(metrics["rmssd"])
+            return metrics
         except Exception as e:
-            print(f"[ERROR] HRV计算失败: {str(e)}")
+            logger.error("HRV计算失败 error=%s", e)
             return {"rmssd": 0, "sdnn": 0, "assessment": "计算错误"}
-            
 
     def _check_arrhythmia(self, r_peaks):
         """心律失常检测"""
@@ -994,8 +724,8 @@ class ECGProcessor:
         else:
             return f"{wave_type}波间期异常"
 
-    def generate_report(self, results, filename):
-        """生成可视化报告（增强版）"""
+    def generate_report(self, results, filename, ecg_signal=None):
+        """生成可视化报告（增强版）；ecg_signal缺省时从信号文件读取"""
         report = {
             "status": "success",
             "text_report": "",
@@ -1016,28 +746,34 @@ class ECGProcessor:
                 f.write(report["text_report"])
             
             # 生成图表
-            if "ecg_signal" in results["basic_info"]:
-                ecg_signal = np.array(results["basic_info"]["ecg_signal"])
-                
-                # ECG波形图
+            if ecg_signal is None and results["basic_info"].get("signal_file"):
+                ecg_signal = load_signal_sidecar(results["basic_info"]["signal_file"])
+            if ecg_signal is not None:
+                # ECG波形图（完整记录，按像素宽度抽取后绘制）
                 ecg_plot_path = os.path.join(file_output_dir, "ecg_waveform.png")
-                if len(results["wave_features"].get("r_peaks", [])) > 0:
-                    self._plot_ecg_waveform(ecg_signal, 
-                                        results["wave_features"]["r_peaks"],
-                                        results["wave_features"].get("p_waves", {}),
-                                        results["wave_features"].get("t_waves", {}),
-                                        ecg_plot_path)
-                    report["plots"]["ecg_waveform"] = ecg_plot_path
-                
-                # 健康雷达图
+                plot_r_peaks = results["wave_features"].get("r_peaks", [])
+                # 健康雷达图、疾病风险图
                 radar_path = os.path.join(file_output_dir, "health_radar.png")
-                if self._plot_health_radar(results, radar_path):
-                    report["plots"]["health_radar"] = radar_path
-                
-                # 疾病风险图（新增）
                 risk_path = os.path.join(file_output_dir, "disease_risk.png")
-                if self._plot_disease_risk(results, risk_path):
+                tasks = [(self._plot_health_radar, (results, radar_path)),
+                         (self._plot_disease_risk, (results, risk_path))]
+                if len(plot_r_peaks) > 0:
+                    tasks.append((self._plot_ecg_waveform,
+                                  (ecg_signal, plot_r_peaks,
+                                   results["wave_features"].get("p_waves", {}),
+                                   results["wave_features"].get("t_waves", {}),
+                                   ecg_plot_path)))
+
+                # 各图表在绘图线程池中并行渲染
+                import ecg_render
+                with stage('render'):
+                    radar_ok, risk_ok, *waveform = ecg_render.render_all(tasks)
+                if radar_ok:
+                    report["plots"]["health_radar"] = radar_path
+                if risk_ok:
                     report["plots"]["disease_risk"] = risk_path
+                if waveform and waveform[0]:
+                    report["plots"]["ecg_waveform"] = ecg_plot_path
             
             # 保存JSON结果
             report["json_path"] = os.path.join(file_output_dir, "analysis_results.json")
@@ -1054,15 +790,14 @@ class ECGProcessor:
         except Exception as e:
             report["status"] = "error"
             report["message"] = f"生成报告时出错: {str(e)}"
-            import traceback
-            traceback.print_exc()
+            logger.exception("生成报告失败 filename=%s", filename)
         
         return report
     
 
 
     def _plot_disease_risk(self, results, save_path):
-        """绘制疾病风险图（完整中文支持版）"""
+        """绘制疾病风险图"""
         try:
             if not results.get("disease_risks"):
                 return False  # 没有风险数据时不生成图表
@@ -1085,134 +820,28 @@ class ECGProcessor:
                 scores.append(data["score"])
                 colors.append(risk_colors.get(data["risk_level"], '#95a5a6'))
 
-            # 设置中文字体（三种方案确保兼容）
-            try:
-                # 方案1：使用系统已安装的字体文件
-                font_path = self._find_chinese_font()
-                if font_path:
-                    zh_font = FontProperties(fname=font_path)
-                    plt.rcParams['font.sans-serif'] = [zh_font.get_name()]
-                else:
-                    # 方案2：使用常见中文字体名称
-                    plt.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'WenQuanYi Zen Hei']
-                
-                # 通用设置
-                plt.rcParams['axes.unicode_minus'] = False
-            except Exception as font_error:
-                print(f"字体设置警告: {str(font_error)}")
-
-            # 创建图表
-            fig, ax = plt.subplots(figsize=(10, 6))
-            y_pos = np.arange(len(diseases))
-            bars = ax.barh(y_pos, scores, color=colors, alpha=0.7)
-
-            # 设置中文标签（强制指定字体属性）
-            try:
-                if 'zh_font' in locals():
-                    # 使用找到的字体文件
-                    ax.set_yticklabels(diseases, fontproperties=zh_font, fontsize=10)
-                    ax.set_xlabel('风险评分 (0-10)', fontproperties=zh_font, fontsize=10)
-                    ax.set_title('心脏疾病风险评估', fontproperties=zh_font, fontsize=12)
-                else:
-                    # 回退到系统字体
-                    ax.set_yticklabels(diseases, fontsize=10)
-                    ax.set_xlabel('风险评分 (0-10)', fontsize=10)
-                    ax.set_title('心脏疾病风险评估', fontsize=12)
-            except Exception as label_error:
-                print(f"标签设置警告: {str(label_error)}")
-                # 终极回退方案：英文显示
-                ax.set_xlabel('Risk Score (0-10)', fontsize=10)
-                ax.set_title('Disease Risk Assessment', fontsize=12)
-
-            ax.set_yticks(y_pos)
-            ax.set_xlim(0, 10)
-
-            # 添加数据标签
-            for bar in bars:
-                width = bar.get_width()
-                ax.text(width + 0.2, bar.get_y() + bar.get_height()/2,
-                    f'{width:.1f}', ha='left', va='center', fontsize=8)
-
-            plt.tight_layout()
-            plt.savefig(save_path, dpi=120, bbox_inches='tight')
-            plt.close()
+            import ecg_render
+            ecg_render.plot_risk_bars(save_path, diseases, scores, colors,
+                                      title='心脏疾病风险评估', xlabel='风险评分 (0-10)')
             return True
 
         except Exception as e:
-            print(f"疾病风险图生成失败: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("疾病风险图生成失败 error=%s", e)
             return False
 
-    def _find_chinese_font(self):
-        """查找系统中可用的中文字体文件"""
-        font_paths = [
-            # Windows
-            'C:/Windows/Fonts/msyh.ttc',  # 微软雅黑
-            'C:/Windows/Fonts/simhei.ttf',  # 黑体
-            # Mac
-            '/System/Library/Fonts/PingFang.ttc',
-            '/System/Library/Fonts/STHeiti Medium.ttc',
-            # Linux
-            '/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc',
-            '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc'
-        ]
-        
-        for path in font_paths:
-            if os.path.exists(path):
-                return path
-        
-        # 尝试通过matplotlib查找
-        try:
-            from matplotlib import font_manager
-            for font in font_manager.fontManager.ttflist:
-                if any(name.lower() in font.name.lower() for name in ['YaHei', 'Hei', 'PingFang', 'STSong']):
-                    return font.fname
-        except:
-            pass
-        
-        return None
-
-
-
-
     def _plot_ecg_waveform(self, ecg, r_peaks, p_waves, t_waves, save_path):
         """绘制ECG波形图"""
-        plt.figure(figsize=(12, 4))
-        t = np.arange(len(ecg)) / self.fs
-        
-        # 绘制ECG信号
-        plt.plot(t, ecg, '#1f77b4', linewidth=1, alpha=0.8)
-        
-        # 标记特征点
-        plt.plot(t[r_peaks], ecg[r_peaks], 'ro', markersize=4, label='R峰')
-        
-        if p_waves.get("detected", False):
-            p_pos = [w["position"] for w in p_waves.get("details", [])]
-            plt.plot(t[p_pos], ecg[p_pos], 'g^', markersize=4, label='P波')
-        
-        if t_waves.get("detected", False):
-            t_pos = [w["position"] for w in t_waves.get("details", [])]
-            plt.plot(t[t_pos], ecg[t_pos], 'mv', markersize=4, label='T波')
-        
-        plt.title("ECG波形分析 - " + os.path.basename(save_path).split('.')[0], fontsize=12)
-        plt.xlabel("时间 (秒)", fontsize=10)
-        plt.ylabel("振幅 (mV)", fontsize=10)
-        plt.legend(fontsize=8)
-        plt.grid(True, linestyle=':', alpha=0.5)
-        plt.tight_layout()
-        
-        plt.savefig(save_path, dpi=120, bbox_inches='tight')
-        plt.close()
+        p_pos = p_waves.get("positions", []) if p_waves.get("detected", False) else []
+        t_pos = t_waves.get("positions", []) if t_waves.get("detected", False) else []
+        import ecg_render
+        ecg_render.plot_waveform(save_path, ecg, self.fs, r_peaks, p_pos, t_pos,
+                                 title="ECG波形分析 - " + os.path.basename(save_path).split('.')[0])
+        return True
 
     def _plot_health_radar(self, results, save_path):
-        """生成健康指数雷达图（完整修复版）"""
+        """生成健康指数雷达图"""
         try:
-            import matplotlib.pyplot as plt
-            from matplotlib.font_manager import FontProperties
-            import matplotlib
-            
-            # 1. 准备雷达图数据
+            # 准备雷达图数据
             categories = ['心率', '变异性', 'QRS波', '心律', '综合']
             values = [
                 min(100, results["wave_features"].get("qrs_complex", {}).get("count", 0)),
@@ -1221,135 +850,367 @@ class ECGProcessor:
                 100 - len(results.get("arrhythmia", {}).get("types", [])) * 25,
                 results.get("health_index", 0)
             ]
-            
-            angles = np.linspace(0, 2 * np.pi, len(categories), endpoint=False)
-            values = np.concatenate((values, [values[0]]))
-            angles = np.concatenate((angles, [angles[0]]))
-            
-            # 2. 设置中文字体（兼容方案）
-            font_path = None
-            font_options = [
-                '/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc',  # Linux
-                'C:/Windows/Fonts/msyh.ttc',  # Windows
-                '/System/Library/Fonts/PingFang.ttc',  # Mac
-                '/usr/share/fonts/truetype/arphic/uming.ttc'  # 备用
-            ]
-            
-            for fp in font_options:
-                if os.path.exists(fp):
-                    font_path = fp
-                    break
-            
-            # 3. 创建图形
-            fig = plt.figure(figsize=(8, 8), dpi=120)
-            ax = fig.add_subplot(111, polar=True)
-            
-            # 4. 绘制雷达图
-            ax.plot(angles, values, 'o-', linewidth=2, color='#1f77b4')
-            ax.fill(angles, values, color='#1f77b4', alpha=0.25)
-            
-            # 5. 设置标签（处理中文显示）
-            if font_path:
-                zh_font = FontProperties(fname=font_path, size=12)
-                ax.set_thetagrids(angles[:-1] * 180/np.pi, categories, fontproperties=zh_font)
-                ax.set_title("心脏健康指数", fontproperties=zh_font)
+
+            import ecg_render
+            if ecg_render.chinese_font_path():
+                ecg_render.plot_radar(save_path, categories, values, "心脏健康指数")
             else:
                 # 无中文字体时的降级处理
-                ax.set_thetagrids(angles[:-1] * 180/np.pi, ['HR', 'HRV', 'QRS', 'Rhythm', 'Overall'])
-                ax.set_title("Heart Health Index")
-            
-            ax.set_rlim(0, 100)
-            ax.grid(True, linestyle=':', alpha=0.5)
-            
-            # 6. 保存图像
-            plt.tight_layout()
-            plt.savefig(save_path, bbox_inches='tight', dpi=120)
-            plt.close()
+                ecg_render.plot_radar(save_path, ['HR', 'HRV', 'QRS', 'Rhythm', 'Overall'], values,
+                                      "Heart Health Index")
             return True
             
         except Exception as e:
-            print(f"❌ 雷达图生成失败: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("雷达图生成失败 error=%s", e)
             return False
 
     def analyze_ecg_file(self, filepath):
-        """分析ECG文件主方法"""
+        """分析ECG文件主方法（读取和分析的各阶段耗时计入同一次请求）"""
+        with collect():
+            try:
+                if not os.path.exists(filepath):
+                    return False, {"error": "文件不存在"}, None
+
+                # 1. 读取并解析数据（内存映射，自动识别文本分包/大小端int16格式）
+                try:
+                    with stage('load'):
+                        recording = load_ecg_recording(filepath, fs=self.fs)
+                except ValueError as e:
+                    return False, {"error": str(e)}, None
+
+                logger.debug("信号加载 format=%s samples=%d head=%s",
+                             recording.data_format, recording.samples, recording.signal[:10])
+            except Exception as e:
+                logger.exception("信号加载失败 file=%s", filepath)
+                return False, {"error": str(e)}, None
+
+            return self.analyze_signal(recording.signal, os.path.basename(filepath))
+
+    def analyze_signal(self, ecg_signal, filename, filtered_signal=None, render_report=False, cache=ANALYSIS_CACHE):
+        """
+        分析已解码的ECG信号（文件分析与流式上传共用）
+        参数:
+            ecg_signal - 原始采样点
+            filename - 用于报告命名的文件名
+            filtered_signal - 已完成的带通滤波结果（流式接入时提供）
+            render_report - 是否立即生成HTML报告；默认只保存结果，报告文件在首次请求时由 render_artifact 生成
+            cache - 分析结果缓存（None表示不使用）；相同数据重复提交时不再执行信号处理
+        返回:
+            (success, results, report)  report["report_id"] 用于按需获取报告文件
+        """
+        with collect():
+            return self._run_analysis(ecg_signal, filename, filtered_signal, render_report, cache)
+
+    def analyze_signals(self, signals, render_report=False, cache=ANALYSIS_CACHE):
+        """
+        批量分析多条已解码的ECG信号：逐条完成信号处理，所有记录的疾病风险在一次规则评分中完成
+        参数:
+            signals - [(ecg_signal, filename), ...]
+        返回:
+            与signals一一对应的 (success, results, report) 列表
+        """
+        with collect():
+            return self._run_analyses([(ecg_signal, filename, None) for ecg_signal, filename in signals],
+                                      render_report, cache)
+
+    def _run_analysis(self, ecg_signal, filename, filtered_signal, render_report, cache):
+        return self._run_analyses([(ecg_signal, filename, filtered_signal)], render_report, cache)[0]
+
+    def _run_analyses(self, items, render_report, cache):
+        outcomes = []
+        for ecg_signal, filename, filtered_signal in items:
+            try:
+                outcomes.append(self._extract_features(ecg_signal, filename, filtered_signal, render_report, cache))
+            except Exception as e:
+                logger.exception("分析失败 filename=%s", filename)
+                outcomes.append((False, {"error": str(e)}, None))
+
+        # 疾病风险评估：所有记录、所有疾病一次评分
+        pending = [outcome for outcome in outcomes if isinstance(outcome, _PendingAnalysis)]
+        scored = [p.results for p in pending if "disease_risks" in p.results]
         try:
-            # 读取数据时添加字节顺序和大端模式支持
-            ecg_signal = np.fromfile(filepath, dtype='>i2')  # 假设数据是大端格式
-            
-            # 数据完整性检查
-            if len(ecg_signal) < 250 * 10:  # 至少10秒数据（假设采样率250Hz）
-                return False, {"error": "数据过短（需至少10秒）"}, None
-                
-            print(f"[DEBUG] 成功加载信号数据，长度：{len(ecg_signal)} 采样点")
-            print(f"[DEBUG] 前10个采样值：{ecg_signal[:10]}")  # 调试输出
-            
-            # 后续分析逻辑保持不变...
+            for results, disease_risks in zip(scored, self._score_disease_risks(
+                    [self._disease_risk_inputs(results) for results in scored])):
+                results["disease_risks"] = disease_risks
+        except Exception as e:
+            logger.exception("疾病风险评估失败 count=%d", len(scored))
+            return [(False, {"error": str(e)}, None) if isinstance(outcome, _PendingAnalysis) else outcome
+                    for outcome in outcomes]
 
-            # 1. 读取并解析数据
-            ecg_signal = np.fromfile(filepath, dtype=np.int16)
-            filename = os.path.basename(filepath)
-            
-            # 2. 基础分析
-            results = {
-                "basic_info": self._get_basic_info(ecg_signal, filename),
-                "wave_features": {},
-                "health_index": 0
-            }
-            
-            # 3. 特征检测
-            r_peaks = self._detect_r_peaks(ecg_signal)
-            results["wave_features"] = {
-                "r_peaks": r_peaks.tolist(),
+        return [self._finish_analysis(outcome, render_report, cache) if isinstance(outcome, _PendingAnalysis)
+                else outcome for outcome in outcomes]
+
+    def _extract_features(self, ecg_signal, filename, filtered_signal, render_report, cache):
+        """
+        单条记录的信号处理和特征提取
+        返回:
+            等待疾病风险评分的 _PendingAnalysis；数据过短或命中缓存时直接返回 (success, results, report)
+        """
+        # 数据完整性检查
+        if len(ecg_signal) < self.fs * 10:  # 至少10秒数据
+            return False, {"error": "数据过短（需至少10秒）"}, None
+
+        cache_key = analysis_key(ecg_signal, self._analysis_config())
+        report_id = cache_key[:24]  # 报告ID同样由数据内容和分析配置决定
+        cached = cache.get(cache_key) if cache is not None else None
+        if cached is not None:
+            return self._cached_analysis(report_id, cached, ecg_signal, filename, render_report)
+
+        # 2. 基础分析
+        results = {
+            "basic_info": self._get_basic_info(ecg_signal, filename),
+            "wave_features": {},
+            "health_index": 0
+        }
+        
+        # 3. 特征检测（长时程记录按重叠窗口分段处理）
+        # 预处理：带通滤波只计算一次（流式接入时已完成；分段模式逐段滤波）
+        segmented = len(ecg_signal) > SEGMENTED_MIN_SECONDS * self.fs
+        if filtered_signal is None and not segmented:
+            filtered_signal = self._bandpass_filter(ecg_signal)
+        if segmented:
+            r_peaks, wave_features, segment_stats = self._analyze_segments(ecg_signal, filtered_signal)
+        else:
+            r_peaks = self._detect_r_peaks(ecg_signal, filtered_signal)
+            wave_features = {
                 **self._analyze_qrs_complex(ecg_signal, r_peaks),
                 **self._analyze_pt_waves(ecg_signal, r_peaks)
             }
-            
-            # 4. 高级分析（需至少2个R峰）
-            if len(r_peaks) >= 2:
-                results["hrv_analysis"] = self._analyze_hrv(r_peaks)
-                results["arrhythmia"] = self._check_arrhythmia(r_peaks)
-                results["disease_risks"] = self._assess_disease_risks(results)
-            
+        results["wave_features"] = {"r_peaks": r_peaks.tolist(), **wave_features}
+        
+        # 4. 高级分析（需至少2个R峰）
+        if len(r_peaks) >= 2:
+            results["hrv_analysis"] = self._analyze_hrv(r_peaks, complexity=HRV_COMPLEXITY)
+            results["arrhythmia"] = self._check_arrhythmia(r_peaks)
+            if segmented:
+                results["hrv_analysis"]["segments"] = segment_stats["hrv"]
+                results["arrhythmia"] = segment_stats["arrhythmia"]
+            results["wave_features"]["qtc"] = self._calculate_qtc(
+                results["wave_features"].get("qt_interval", 400), results["wave_features"].get("hr", 60))
+            results["disease_risks"] = None   # 占位，所有记录的特征提取完成后统一评分
+        if segmented:
+            results["segments"] = segment_stats["summary"]
+        return _PendingAnalysis(report_id, cache_key, results)
+
+    def _finish_analysis(self, pending, render_report, cache):
+        """疾病风险评分之后：计算健康指数并保存结果"""
+        report_id, cache_key, results = pending
+        try:
             # 5. 健康指数计算
             results["health_index"] = self._calculate_health_index(results)
             
-            # 6. 生成可视化报告
-            report_path = f"/tmp/reports/{filename.split('.')[0]}_report.html"
-            os.makedirs(os.path.dirname(report_path), exist_ok=True)
-            
-            self._generate_html_report(results, report_path)
-            
-            return True, results, {"html_report": report_path}
+            # 6. 保存结果（可视化报告按需生成）
+            with stage('serialize'):
+                save_report_results(report_id, results)
+                if cache is not None:
+                    cache.put(cache_key, {"results": results})
+            return True, results, self._report_info(report_id, results, render_report)
             
         except Exception as e:
-            import traceback
-            traceback.print_exc()
+            logger.exception("分析失败 filename=%s", results["basic_info"]["filename"])
             return False, {"error": str(e)}, None
 
+    def _analysis_config(self):
+        """影响分析结果的配置，参与缓存键计算"""
+        return {
+            "version": ANALYSIS_VERSION,
+            "fs": self.fs,
+            "r_peak_band": list(R_PEAK_BAND),
+            "r_peak_order": R_PEAK_ORDER,
+            "segment": [SEGMENTED_MIN_SECONDS, SEGMENT_SECONDS, SEGMENT_OVERLAP_SECONDS],
+            "hrv_complexity": HRV_COMPLEXITY
+        }
 
-    def _generate_html_report(self, results, output_path):
-        """生成HTML格式报告（修复版）"""
+    def _cached_analysis(self, report_id, entry, ecg_signal, filename, render_report):
+        """缓存命中：直接返回结果（不执行信号处理）"""
+        results = entry["results"]
+        results["basic_info"]["filename"] = filename
+        with stage('serialize'):
+            save_signal_sidecar(ecg_signal)  # 信号文件可能已被清理
+            save_report_results(report_id, results)
+        logger.debug("命中分析结果缓存 report_id=%s", report_id)
+        return True, results, self._report_info(report_id, results, render_report)
+
+    def _report_info(self, report_id, results, render_report):
+        """报告信息；render_report=True 时立即生成HTML报告及其图表"""
+        html_report = None
+        if render_report:
+            import ecg_render
+            html_report, _ = ecg_render.render_all([(self.render_artifact, (report_id, REPORT_HTML)),
+                                                    (self.render_artifact, (report_id, "ecg_plot.png"))])
+        return {
+            "report_id": report_id,
+            "html_report": html_report,
+            "signal_npy": os.path.join(REPORT_DIR, results["basic_info"]["signal_file"])
+        }
+
+    def render_artifact(self, report_id, name):
+        """
+        按需生成报告文件：第一次请求时根据保存的结果JSON和信号文件渲染，之后直接返回已生成的文件
+        参数:
+            report_id - analyze_signal 返回的报告ID
+            name - REPORT_ARTIFACTS 中的文件名
+        返回:
+            文件路径；报告不存在或无法生成该文件时返回None
+        """
+        path = report_artifact_path(report_id, name)
+        if path is None:
+            return None
+        if os.path.exists(path):
+            return path
+        results = load_report_results(report_id)
+        if results is None:
+            return None
+
+        # 先写临时文件再原子替换，并发请求同一文件时不会读到半成品
+        stem, ext = os.path.splitext(path)
+        tmp_path = f"{stem}.{os.getpid()}.{threading.get_ident()}.tmp{ext}"
+        with collect(), stage('render'):
+            getattr(self, REPORT_ARTIFACTS[name])(results, tmp_path)
+        if not os.path.exists(tmp_path):
+            return None
+        os.replace(tmp_path, path)
+        return path
+
+    def _render_signal_plot(self, results, save_path):
+        """报告中的信号片段图（前1000个采样点）"""
+        ecg_signal = load_signal_sidecar(results["basic_info"]["signal_file"])
+        import ecg_render
+        ecg_render.plot_segment(save_path, ecg_signal[:1000])
+
+    def _render_waveform_plot(self, results, save_path):
+        """标注R峰和P/T波的波形图（完整记录，按像素宽度抽取后绘制）"""
+        ecg_signal = load_signal_sidecar(results["basic_info"]["signal_file"])
+        r_peaks = results["wave_features"].get("r_peaks", [])
+        if len(r_peaks) == 0:
+            self._generate_placeholder_image(save_path, "ECG波形")
+            return
+        self._plot_ecg_waveform(ecg_signal, r_peaks,
+                                results["wave_features"].get("p_waves", {}),
+                                results["wave_features"].get("t_waves", {}),
+                                save_path)
+
+    def _analyze_segments(self, ecg_signal, filtered_signal=None):
+        """
+        长时程记录分段分析：逐段检测R峰和波形特征，段内数据用完即释放，
+        峰值内存只取决于段长而与记录时长无关
+        返回:
+            (r_peaks, wave_features, segment_stats)
+        """
+        n = len(ecg_signal)
+        seg_len = int(SEGMENT_SECONDS * self.fs)
+        overlap = int(SEGMENT_OVERLAP_SECONDS * self.fs)
+
+        peak_chunks, qrs_parts, p_parts, t_parts = [], [], [], []
+        rmssd_values, sdnn_values, lf_hf_values = [], [], []
+        arrhythmia_counts = defaultdict(int)
+        segment_count = 0
+
+        for start in range(0, n, seg_len):
+            end = min(n, start + seg_len)
+            lo, hi = max(0, start - overlap), min(n, end + overlap)
+            window = ecg_signal[lo:hi]
+            window_filtered = filtered_signal[lo:hi] if filtered_signal is not None else None
+            segment_count += 1
+
+            # 只保留落在本段核心区间[start, end)内的R峰，重叠区的R峰归相邻段
+            local = np.asarray(self._detect_r_peaks(window, window_filtered), dtype=int)
+            local = local[(local + lo >= start) & (local + lo < end)]
+            if len(local) == 0:
+                continue
+
+            peak_chunks.append(local + lo)
+            qrs_parts.append(self._analyze_qrs_complex(window, local)["qrs_complex"])
+            pt_waves = self._analyze_pt_waves(window, local)
+            p_parts.append(pt_waves["p_waves"])
+            t_parts.append(pt_waves["t_waves"])
+
+            if len(local) >= 2:
+                segment_hrv = self._analyze_hrv(local)
+                if segment_hrv["rmssd"] > 0:
+                    rmssd_values.append(segment_hrv["rmssd"])
+                    sdnn_values.append(segment_hrv["sdnn"])
+                    if segment_hrv.get("frequency"):
+                        lf_hf_values.append(segment_hrv["frequency"]["lf_hf_ratio"])
+                for arrhythmia_type in self._check_arrhythmia(local)["types"]:
+                    arrhythmia_counts[arrhythmia_type] += 1
+
+        r_peaks = self._stitch_r_peaks(peak_chunks)
+        wave_features = {
+            "qrs_complex": self._merge_qrs_summaries(qrs_parts, len(r_peaks)),
+            "p_waves": self._merge_wave_summaries(p_parts, 'P'),
+            "t_waves": self._merge_wave_summaries(t_parts, 'T')
+        }
+
+        arrhythmia_types = sorted(arrhythmia_counts, key=arrhythmia_counts.get, reverse=True)
+        segment_stats = {
+            "summary": {
+                "count": segment_count,
+                "segment_seconds": SEGMENT_SECONDS,
+                "overlap_seconds": SEGMENT_OVERLAP_SECONDS
+            },
+            "hrv": {
+                "count": len(rmssd_values),
+                "rmssd_mean": float(np.mean(rmssd_values)) if rmssd_values else 0,
+                "rmssd_min": float(np.min(rmssd_values)) if rmssd_values else 0,
+                "rmssd_max": float(np.max(rmssd_values)) if rmssd_values else 0,
+                "sdnn_index": float(np.mean(sdnn_values)) if sdnn_values else 0,  # 各段SDNN的均值
+                "lf_hf_mean": float(np.mean(lf_hf_values)) if lf_hf_values else 0
+            },
+            "arrhythmia": {
+                "types": arrhythmia_types,
+                "conclusion": "正常心律" if not arrhythmia_types else "，".join(arrhythmia_types),
+                "segment_counts": dict(arrhythmia_counts)
+            }
+        }
+        return r_peaks, wave_features, segment_stats
+
+    def _stitch_r_peaks(self, peak_chunks):
+        """拼接各段R峰，去掉段边界处间隔小于200ms的重复检测"""
+        if not peak_chunks:
+            return np.array([], dtype=int)
+        min_gap = 0.2 * self.fs
+        stitched = [peak_chunks[0]]
+        for chunk in peak_chunks[1:]:
+            chunk = chunk[chunk - stitched[-1][-1] > min_gap]
+            if len(chunk):
+                stitched.append(chunk)
+        return np.concatenate(stitched)
+
+    def _merge_qrs_summaries(self, summaries, count):
+        """按各段R峰数加权合并QRS统计"""
+        summaries = [q for q in summaries if q["count"] > 0]
+        if not summaries:
+            return self._analyze_qrs_complex(None, [])["qrs_complex"]
+        weights = [q["count"] for q in summaries]
+        avg_width = float(np.average([q["average_width"] for q in summaries], weights=weights))
+        return {
+            "count": int(count),
+            "average_width": avg_width,
+            "width_status": self._assess_parameter(avg_width, 'qrs_width'),
+            "amplitude": float(np.average([q["amplitude"] for q in summaries], weights=weights))
+        }
+
+    def _merge_wave_summaries(self, summaries, wave_type):
+        """按各段波数加权合并P/T波统计（分段模式不保留逐搏明细）"""
+        summaries = [w for w in summaries if w["detected"]]
+        if not summaries:
+            return self._summarize_waves([], [], [], wave_type)
+        interval_key = f"average_{'pr' if wave_type=='P' else 'qt'}_interval"
+        weights = [w["count"] for w in summaries]
+        amplitude = float(np.average([w["average_amplitude"] for w in summaries], weights=weights))
+        interval = float(np.average([w[interval_key] for w in summaries], weights=weights))
+        return {
+            "detected": True,
+            "count": int(sum(weights)),
+            "average_amplitude": amplitude,
+            interval_key: interval,
+            "assessment": self._assess_wave(wave_type, amplitude, interval)
+        }
+
+    def _render_html_report(self, results, output_path):
+        """生成HTML格式报告（只写HTML，其中的信号图 ecg_plot.png 在浏览器请求时才渲染）"""
         try:
-            # 确保报告目录存在
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
-            # 生成图表路径
-            img_dir = os.path.join(os.path.dirname(output_path), "images")
-            os.makedirs(img_dir, exist_ok=True)
-            ecg_plot_path = os.path.join(img_dir, "ecg_plot.png")
-            
-            # 绘制ECG信号图
-            plt.figure(figsize=(15, 6))
-            plt.plot(results["basic_info"]["ecg_signal"][:1000])
-            plt.title("ECG Signal Segment")
-            plt.xlabel("Samples")
-            plt.ylabel("Amplitude")
-            plt.savefig(ecg_plot_path)
-            plt.close()
-            
             # HTML内容
             html_content = f"""
             <!DOCTYPE html>
@@ -1374,7 +1235,7 @@ class ECGProcessor:
                 
                 <div class="report-section">
                     <h2>ECG Signal</h2>
-                    <img src="images/ecg_plot.png" alt="ECG Signal">
+                    <img src="ecg_plot.png" alt="ECG Signal">
                 </div>
                 
                 <div class="report-section">
@@ -1391,7 +1252,7 @@ class ECGProcessor:
                 
             return True
         except Exception as e:
-            print(f"生成报告失败: {str(e)}")
+            logger.error("生成报告失败 error=%s", e)
             return False
         
 
@@ -1496,6 +1357,7 @@ class ECGProcessor:
 
 🔍【核心指标分析】
 • 心率变异性(RMSSD): {hrv.get('rmssd', 0):.1f} 毫秒 ({hrv.get('assessment', '无法评估')})
+• 交感/迷走平衡(LF/HF): {f"{hrv['frequency']['lf_hf_ratio']:.2f}" if hrv.get('frequency') else '记录过短，无法评估'}
 • QRS波宽度: {qrs.get('average_width', 0):.1f} 毫秒 ({qrs.get('width_status', '无法评估')})
 • 心律评估: {arrhythmia.get('conclusion', '无法评估')}
 • ST段状态: {st_segment.get('assessment', '无法评估')}
@@ -0,0 +1,260 @@
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib import font_manager
+from matplotlib.font_manager import FontProperties
+
+from ecg_metrics import collect, current_timings, get_logger
+from ecg_waveform import envelope_markers, minmax_decimate
+
+logger = get_logger('render')
+
+# 绘图线程数，可通过环境变量调整
+RENDER_WORKERS = int(os.environ.get('ECG_RENDER_WORKERS', min(4, os.cpu_count() or 1)))
+
+CHINESE_FONT_PATHS = [
+    # Linux
+    '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc',
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/arphic/uming.ttc',
+    # Windows
+    'C:/Windows/Fonts/msyh.ttc',  # 微软雅黑
+    'C:/Windows/Fonts/simhei.ttf',  # 黑体
+    # Mac
+    '/System/Library/Fonts/PingFang.ttc',
+    '/System/Library/Fonts/STHeiti Medium.ttc',
+]
+CHINESE_FONT_NAMES = ['WenQuanYi', 'YaHei', 'Hei', 'PingFang', 'Noto Sans CJK', 'STSong']
+
+# 负号使用ASCII连字符（中文字体普遍缺少U+2212）。
+# 刻度格式化在绘制时读取该全局设置，因此在导入时设置一次，绘图过程中不再修改rcParams
+matplotlib.rcParams['axes.unicode_minus'] = False
+
+# 预设样式：所有图表的线条/标记/网格参数集中在此，绘图时显式传入
+STYLES = {
+    'signal': {'color': '#1f77b4', 'linewidth': 1, 'alpha': 0.8},
+    'segment': {'color': '#1f77b4', 'linewidth': 1},
+    'r_peak': {'color': 'r', 'marker': 'o', 'linestyle': 'none', 'markersize': 4},
+    'p_wave': {'color': 'g', 'marker': '^', 'linestyle': 'none', 'markersize': 4},
+    't_wave': {'color': 'm', 'marker': 'v', 'linestyle': 'none', 'markersize': 4},
+    'radar': {'color': '#1f77b4', 'linewidth': 2, 'marker': 'o'},
+    'grid': {'linestyle': ':', 'alpha': 0.5},
+}
+
+# 图表模板：尺寸、分辨率和固定边距。
+# 边距按图表类型预先确定，保存时不使用 bbox_inches='tight'（它会把整张图多绘制一遍）
+TEMPLATES = {
+    'waveform': {'figsize': (12, 4), 'dpi': 120,
+                 'margins': {'left': 0.06, 'right': 0.98, 'bottom': 0.13, 'top': 0.9}},
+    'segment': {'figsize': (15, 6), 'dpi': 100,
+                'margins': {'left': 0.06, 'right': 0.98, 'bottom': 0.09, 'top': 0.93}},
+    'radar': {'figsize': (8, 8), 'dpi': 120, 'polar': True,
+              'margins': {'left': 0.1, 'right': 0.9, 'bottom': 0.08, 'top': 0.88}},
+    'risk': {'figsize': (10, 6), 'dpi': 120,
+             'margins': {'left': 0.22, 'right': 0.96, 'bottom': 0.1, 'top': 0.92}},
+    'web_segment': {'figsize': (12, 4), 'dpi': 100,
+                    'margins': {'left': 0.06, 'right': 0.98, 'bottom': 0.08, 'top': 0.9}},
+    'placeholder': {'figsize': (8, 4), 'dpi': 100,
+                    'margins': {'left': 0, 'right': 1, 'bottom': 0, 'top': 1}},
+    'mobile_strip': {'figsize': (10, 3), 'dpi': 80,
+                     'margins': {'left': 0, 'right': 1, 'bottom': 0, 'top': 1}},
+    'mobile_radar': {'figsize': (6, 6), 'dpi': 100, 'polar': True,
+                     'margins': {'left': 0.1, 'right': 0.9, 'bottom': 0.1, 'top': 0.9}},
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def chinese_font_path():
+    """
+    可用的中文字体文件，每个进程只查找一次：先检查常见路径，
+    再在matplotlib字体列表（镜像构建时已生成缓存）中按名称查找；没有时返回None
+    """
+    for path in CHINESE_FONT_PATHS:
+        if os.path.exists(path):
+            return path
+    for entry in font_manager.fontManager.ttflist:
+        if any(name.lower() in entry.name.lower() for name in CHINESE_FONT_NAMES):
+            return entry.fname
+    return None
+
+
+@lru_cache(maxsize=None)
+def font(size=10):
+    """
+    指定字号的字体属性（按字号缓存，各图表共享同一对象，调用方不得修改）：
+    有中文字体时使用该字体文件，否则使用默认无衬线字体
+    """
+    path = chinese_font_path()
+    if path:
+        return FontProperties(fname=path, size=size)
+    return FontProperties(family='sans-serif', size=size)
+
+
+def warm_up():
+    """预热：解析字体并完整绘制一张图，加载字体文件和Agg渲染器，避免第一个请求承担冷启动开销"""
+    fig, ax = new_figure('placeholder')
+    ax.text(0.5, 0.5, "心电 ECG 0123" if chinese_font_path() else "ECG 0123", fontproperties=font(14))
+    fig.savefig(io.BytesIO(), format='png')
+
+
+def new_figure(template):
+    """
+    按模板创建独立的Figure（直接绑定Agg画布，不经过pyplot的全局状态），
+    可在多个线程中同时使用；返回 (fig, ax)
+    """
+    spec = TEMPLATES[template]
+    fig = Figure(figsize=spec['figsize'], dpi=spec['dpi'])
+    FigureCanvasAgg(fig)
+    fig.subplots_adjust(**spec['margins'])
+    ax = fig.add_subplot(111, polar=spec.get('polar', False))
+    return fig, ax
+
+
+def save_figure(fig, save_path):
+    fig.savefig(save_path, dpi=fig.dpi)
+    return save_path
+
+
+def template_pixel_width(template):
+    """模板中绘图区（坐标轴内部）的像素宽度"""
+    spec = TEMPLATES[template]
+    margins = spec['margins']
+    return int(spec['figsize'][0] * spec['dpi'] * (margins['right'] - margins['left']))
+
+
+def plot_waveform(save_path, ecg, fs, r_peaks, p_positions=(), t_positions=(), title="ECG波形分析"):
+    """
+    ECG波形图，标注R峰和P/T波位置。
+    任意时长的记录都先按绘图区像素宽度做最小/最大值抽取（约2倍像素宽度个点），
+    绘图耗时和内存与记录时长无关
+    """
+    fig, ax = new_figure('waveform')
+    ecg = np.asarray(ecg)
+    index, bin_size = minmax_decimate(ecg, template_pixel_width('waveform'))
+    t = index / fs
+    values = ecg[index]
+    ax.plot(t, values, **STYLES['signal'])
+    for positions, style, label in ((r_peaks, 'r_peak', 'R峰'),
+                                    (p_positions, 'p_wave', 'P波'),
+                                    (t_positions, 't_wave', 'T波')):
+        if len(positions) > 0:
+            vertices = envelope_markers(index, bin_size, ecg, positions)
+            ax.plot(t[vertices], values[vertices], label=label, **STYLES[style])
+
+    ax.set_title(title, fontproperties=font(12))
+    ax.set_xlabel("时间 (秒)", fontproperties=font(10))
+    ax.set_ylabel("振幅 (mV)", fontproperties=font(10))
+    ax.legend(prop=font(8))
+    ax.grid(True, **STYLES['grid'])
+    return save_figure(fig, save_path)
+
+
+def plot_segment(save_path, ecg_signal, title="ECG Signal Segment", template='segment', axis_labels=True):
+    """信号片段图（横轴为采样点序号）"""
+    fig, ax = new_figure(template)
+    ax.plot(ecg_signal, **STYLES['segment'])
+    ax.set_title(title, fontproperties=font(12))
+    if axis_labels:
+        ax.set_xlabel("Samples", fontproperties=font(10))
+        ax.set_ylabel("Amplitude", fontproperties=font(10))
+    return save_figure(fig, save_path)
+
+
+def plot_radar(save_path, labels, values, title, rmax=100, template='radar', radial_labels=True):
+    """雷达图：labels/values一一对应，自动闭合曲线"""
+    fig, ax = new_figure(template)
+    angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False)
+    closed_values = np.concatenate((values, [values[0]]))
+    closed_angles = np.concatenate((angles, [angles[0]]))
+    ax.plot(closed_angles, closed_values, **STYLES['radar'])
+    ax.fill(closed_angles, closed_values, color=STYLES['radar']['color'], alpha=0.25)
+    ax.set_thetagrids(angles * 180 / np.pi, labels, fontproperties=font(12))
+    ax.set_rlim(0, rmax)
+    if not radial_labels:
+        ax.set_yticklabels([])
+    ax.grid(True, **STYLES['grid'])
+    if title:
+        ax.set_title(title, fontproperties=font(12))
+    return save_figure(fig, save_path)
+
+
+def plot_risk_bars(save_path, names, scores, colors, title, xlabel):
+    """疾病风险横向条形图（评分0-10），条形末端标注分值"""
+    fig, ax = new_figure('risk')
+    y_pos = np.arange(len(names))
+    bars = ax.barh(y_pos, scores, color=colors, alpha=0.7)
+    ax.set_yticks(y_pos)
+    ax.set_yticklabels(names, fontproperties=font(10))
+    ax.set_xlabel(xlabel, fontproperties=font(10))
+    ax.set_title(title, fontproperties=font(12))
+    ax.set_xlim(0, 10)
+    value_font = font(8)
+    for bar in bars:
+        width = bar.get_width()
+        ax.text(width + 0.2, bar.get_y() + bar.get_height() / 2,
+                f'{width:.1f}', ha='left', va='center', fontproperties=value_font)
+    return save_figure(fig, save_path)
+
+
+def plot_placeholder(save_path, text):
+    """占位图：居中显示一段文字"""
+    fig, ax = new_figure('placeholder')
+    ax.text(0.5, 0.5, text, ha='center', va='center', fontproperties=font(14))
+    ax.axis('off')
+    return save_figure(fig, save_path)
+
+
+def plot_mobile_strip(save_path, signal):
+    """移动端ECG条带图（无坐标轴、无边距）"""
+    fig, ax = new_figure('mobile_strip')
+    ax.plot(signal, linewidth=1)
+    ax.axis('off')
+    return save_figure(fig, save_path)
+
+
+def render_executor():
+    """绘图线程池，首次使用时创建（gunicorn fork之后）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix='ecg-render')
+        return _executor
+
+
+def render_all(tasks):
+    """
+    在绘图线程池中并行执行多个绘图任务
+    参数:
+        tasks - [(fn, args), ...]
+    返回:
+        与tasks顺序一致的结果列表；抛出异常的任务结果为None
+    """
+    timings = current_timings()
+    futures = [render_executor().submit(_run_task, timings, fn, args) for fn, args in tasks]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            logger.error("图表渲染失败 error=%s", e)
+            results.append(None)
+    return results
+
+
+def _run_task(timings, fn, args):
+    # 绘图线程中的阶段耗时累加到发起请求的线程的汇总中
+    if timings is None:
+        return fn(*args)
+    with collect(timings=timings):
+        return fn(*args)
@@ -0,0 +1,419 @@
+import math
+import re
+from numbers import Number
+from types import MappingProxyType
+
+import numpy as np
+
+RISK_BASE_SCORES = {'极低': 1, '低': 2, '中': 4, '中高': 6, '高': 8, '极高': 10}
+MATCH_SCORE = 2     # 每个匹配的特征加分
+MAX_SCORE = 10
+
+
+def _freeze(obj):
+    """递归转换为只读映射，共享的配置不会被某个请求意外修改"""
+    if isinstance(obj, dict):
+        return MappingProxyType({key: _freeze(value) for key, value in obj.items()})
+    return obj
+
+
+# 完整的24种疾病特征库（只读）
+# 特征条件写法：'>120ms' / '>=3' 等阈值（单位后缀忽略）、(250, 350) 数值区间、
+# True/False 布尔特征、字符串或字符串元组（取值之一）
+DISEASE_LIBRARY = _freeze({
+    # 一、心律失常类（8种）
+    '心房扑动': {
+        'type': '心律失常',
+        'features': {
+            'hr': (250, 350),
+            'f_waves': True,
+            'regularity': '规则'
+        },
+        'risk_level': '中高',
+        'description': '心房快速规则活动，心室率通常规则'
+    },
+    '心房颤动': {
+        'type': '心律失常',
+        'features': {
+            'irregular': True,
+            'p_waves': '缺失',
+            'fibrillatory_waves': True
+        },
+        'risk_level': '高',
+        'description': '心房电活动紊乱，心室率绝对不齐'
+    },
+    '室性早搏': {
+        'type': '心律失常',
+        'features': {
+            'qrs_width': '>120ms',
+            'compensatory_pause': '完全',
+            'p_waves': '无关'
+        },
+        'risk_level': '中',
+        'description': '心室提前除极引起的异常搏动'
+    },
+    '室性心动过速': {
+        'type': '心律失常',
+        'features': {
+            'hr': '>100',
+            'qrs_width': '>120ms',
+            'consecutive': '>=3'
+        },
+        'risk_level': '极高',
+        'description': '连续3个以上室性早搏'
+    },
+    '房室传导阻滞（一度）': {
+        'type': '传导异常',
+        'features': {
+            'pr_interval': '>200ms',
+            'qrs_width': '<120ms'
+        },
+        'risk_level': '中',
+        'description': 'PR间期延长但每个P波都能下传'
+    },
+    '房室传导阻滞（二度I型）': {
+        'type': '传导异常',
+        'features': {
+            'pr_prolongation': True,
+            'dropped_beats': True
+        },
+        'risk_level': '中高',
+        'description': 'PR间期逐渐延长直至QRS脱落'
+    },
+    '预激综合征（WPW）': {
+        'type': '传导异常',
+        'features': {
+            'pr_interval': '<120ms',
+            'delta_wave': True,
+            'qrs_width': '>110ms'
+        },
+        'risk_level': '中高',
+        'description': '存在房室旁路导致心室预激'
+    },
+    '交界性心律': {
+        'type': '心律失常',
+        'features': {
+            'qrs_width': '<120ms',
+            'p_waves': '逆行或无'
+        },
+        'risk_level': '低',
+        'description': '房室交界区发出的心律'
+    },
+    
+    # 二、心肌缺血/梗死类（3种）
+    '心肌缺血': {
+        'type': '心肌异常',
+        'features': {
+            'st_segment': ('压低', '水平'),
+            't_waves': ('倒置', '平坦'),
+            'duration': '>1min'
+        },
+        'risk_level': '中高',
+        'description': '心内膜下心肌供血不足'
+    },
+    '急性心肌梗死': {
+        'type': '心肌梗死',
+        'features': {
+            'st_segment': '抬高',
+            'q_waves': '病理性',
+            't_waves': '动态演变'
+        },
+        'risk_level': '极高',
+        'description': '冠状动脉急性闭塞导致心肌坏死'
+    },
+    '心内膜下缺血': {
+        'type': '心肌异常',
+        'features': {
+            't_waves': '深倒置',
+            'st_segment': '轻度压低'
+        },
+        'risk_level': '中',
+        'description': '广泛心内膜下缺血'
+    },
+    
+    # 三、电解质/代谢类（3种）
+    '低钾血症': {
+        'type': '电解质紊乱',
+        'features': {
+            'u_waves': '增高',
+            't_waves': '低平',
+            'st_segment': '压低'
+        },
+        'risk_level': '中',
+        'description': '血清钾浓度＜3.5mmol/L'
+    },
+    '高钾血症': {
+        'type': '电解质紊乱',
+        'features': {
+            't_waves': '高尖',
+            'qrs_width': '增宽',
+            'p_waves': '减小'
+        },
+        'risk_level': '高',
+        'description': '血清钾浓度＞5.5mmol/L'
+    },
+    '洋地黄效应': {
+        'type': '药物影响',
+        'features': {
+            'st_segment': '下斜型压低',
+            't_waves': '鱼钩样'
+        },
+        'risk_level': '中',
+        'description': '洋地黄类药物导致的特征性改变'
+    },
+    
+    # 四、遗传/原发性（3种）
+    '长QT综合征': {
+        'type': '遗传性',
+        'features': {
+            'qtc': '>450ms',
+            't_waves': ('切迹', '交替'),
+            'torsades': '可能'
+        },
+        'risk_level': '高',
+        'description': '心肌复极延长导致的恶性心律失常风险'
+    },
+    'Brugada综合征': {
+        'type': '遗传性',
+        'features': {
+            'st_segment': '马鞍形',
+            'leads': ('V1', 'V2'),
+            'hr': '正常'
+        },
+        'risk_level': '极高',
+        'description': '钠离子通道异常导致的猝死高风险'
+    },
+    '早复极综合征': {
+        'type': '原发性',
+        'features': {
+            'j_point': '抬高',
+            'st_segment': '凹面向上'
+        },
+        'risk_level': '低',
+        'description': '良性J点抬高现象'
+    },
+    
+    # 五、其他全身性（7种）
+    '肺栓塞': {
+        'type': '肺源性',
+        'features': {
+            'pattern': 'S1Q3T3',
+            'sinus_tachycardia': True,
+            't_waves': '倒置'
+        },
+        'risk_level': '高',
+        'description': '肺动脉血栓导致右心负荷增加'
+    },
+    '颅内压增高': {
+        'type': '神经系统',
+        'features': {
+            't_waves': '深倒置',
+            'qt_interval': '延长'
+        },
+        'risk_level': '高',
+        'description': '脑部病变导致的特征性改变'
+    },
+    '甲状腺功能亢进': {
+        'type': '内分泌',
+        'features': {
+            'hr': '>100',
+            'st_t_changes': '非特异性'
+        },
+        'risk_level': '中',
+        'description': '甲状腺激素过多导致的心动过速'
+    },
+    '迷走神经张力过高': {
+        'type': '自主神经',
+        'features': {
+            'hr': '<60',
+            'respiratory_variation': True
+        },
+        'risk_level': '低',
+        'description': '迷走神经优势导致的心动过缓'
+    },
+    '体位性心动过速': {
+        'type': '自主神经',
+        'features': {
+            'hr_increase': '>30bpm',
+            'postural_change': True
+        },
+        'risk_level': '中',
+        'description': '体位改变时心率异常增加'
+    },
+    '睡眠呼吸暂停': {
+        'type': '呼吸性',
+        'features': {
+            'hr_variation': '周期性',
+            'bradycardia': '夜间',
+            'qt_interval': '延长'
+        },
+        'risk_level': '中',
+        'description': '睡眠期间反复呼吸暂停导致缺氧'
+    },
+    '慢性阻塞性肺病': {
+        'type': '呼吸性',
+        'features': {
+            'p_pulmonale': True,
+            'right_axis_deviation': True
+        },
+        'risk_level': '中',
+        'description': '慢性肺病导致的右心负荷增加'
+    }
+})
+
+_THRESHOLD_RE = re.compile(r'(>=|<=|>|<)\s*(-?\d+(?:\.\d+)?)\s*[^\d\s]*')
+
+
+def _is_number(value):
+    return isinstance(value, Number) and not isinstance(value, complex)
+
+
+def compile_condition(condition):
+    """
+    将一个特征条件编译为类型化谓词
+    返回:
+        ('range', lo, hi)   数值闭区间（严格不等号转换为相邻浮点数；布尔值按0/1处理）
+        ('category', values) 字符串取值集合
+    """
+    if _is_number(condition):
+        return ('range', float(condition), float(condition))
+    if isinstance(condition, tuple):
+        if len(condition) == 2 and all(_is_number(c) for c in condition):
+            return ('range', float(min(condition)), float(max(condition)))
+        return ('category', frozenset(condition))
+    match = _THRESHOLD_RE.fullmatch(condition.strip())
+    if match:
+        op, number = match.group(1), float(match.group(2))
+        if op == '>':
+            return ('range', math.nextafter(number, math.inf), math.inf)
+        if op == '>=':
+            return ('range', number, math.inf)
+        if op == '<':
+            return ('range', -math.inf, math.nextafter(number, -math.inf))
+        return ('range', -math.inf, number)
+    return ('category', frozenset([condition]))
+
+
+class DiseaseRules:
+    """
+    编译后的疾病规则：所有疾病的特征条件展开为谓词表
+    （数值谓词为 [lo, hi] 区间，字符串谓词为取值集合的独热矩阵），
+    评分时一次numpy运算完成所有记录、所有谓词的匹配：
+        score = clip(基础分 + MATCH_SCORE * 匹配矩阵 @ 谓词-疾病关联矩阵, 0, MAX_SCORE)
+    """
+
+    def __init__(self, library):
+        self.diseases = list(library)
+        self.index = {name: i for i, name in enumerate(self.diseases)}
+        self.library = library
+        self.base_scores = np.array([RISK_BASE_SCORES.get(library[name]['risk_level'], 0)
+                                     for name in self.diseases], dtype=np.float64)
+
+        numeric, category = [], []
+        for d, name in enumerate(self.diseases):
+            for feature, condition in library[name]['features'].items():
+                compiled = compile_condition(condition)
+                if compiled[0] == 'range':
+                    numeric.append((d, feature, compiled[1], compiled[2]))
+                else:
+                    category.append((d, feature, compiled[1]))
+
+        # 数值谓词：特征列 + 区间
+        self.numeric_features = sorted({feature for _, feature, _, _ in numeric})
+        column = {feature: j for j, feature in enumerate(self.numeric_features)}
+        self._num_columns = np.array([column[f] for _, f, _, _ in numeric], dtype=np.intp)
+        self._num_lo = np.array([lo for _, _, lo, _ in numeric], dtype=np.float64)
+        self._num_hi = np.array([hi for _, _, _, hi in numeric], dtype=np.float64)
+
+        # 字符串谓词：(特征, 取值) 词表上的独热编码，谓词为词表列的并集
+        self.vocabulary = {}
+        for _, feature, values in category:
+            for value in sorted(values):
+                self.vocabulary.setdefault((feature, value), len(self.vocabulary))
+        self._category_features = sorted({feature for _, feature, _ in category})
+        self._cat_members = np.zeros((len(self.vocabulary), len(category)), dtype=np.float64)
+        for k, (_, feature, values) in enumerate(category):
+            for value in values:
+                self._cat_members[self.vocabulary[(feature, value)], k] = 1
+
+        # 谓词顺序：先数值后字符串
+        self.predicates = [(d, f) for d, f, _, _ in numeric] + [(d, f) for d, f, _ in category]
+        self._incidence = np.zeros((len(self.predicates), len(self.diseases)), dtype=np.float64)
+        for k, (d, _) in enumerate(self.predicates):
+            self._incidence[k, d] = 1
+
+    def encode(self, rows):
+        """
+        将多条记录的特征字典编码为矩阵
+        返回:
+            (numeric, onehot)  numeric为 N x 数值特征 的浮点矩阵（缺失/非数值为NaN），
+            onehot为 N x 词表 的独热矩阵
+        """
+        numeric = np.full((len(rows), len(self.numeric_features)), np.nan)
+        onehot = np.zeros((len(rows), len(self.vocabulary)), dtype=np.float64)
+        for i, row in enumerate(rows):
+            for j, feature in enumerate(self.numeric_features):
+                value = row.get(feature)
+                if _is_number(value):
+                    numeric[i, j] = value
+            for feature in self._category_features:
+                value = row.get(feature)
+                if isinstance(value, str):
+                    col = self.vocabulary.get((feature, value))
+                    if col is not None:
+                        onehot[i, col] = 1
+        return numeric, onehot
+
+    def match(self, numeric, onehot):
+        """各记录对各谓词的匹配结果（N x 谓词数 的布尔矩阵）"""
+        values = numeric[:, self._num_columns]
+        with np.errstate(invalid='ignore'):
+            numeric_hits = (values >= self._num_lo) & (values <= self._num_hi)
+        category_hits = (onehot @ self._cat_members) > 0
+        return np.hstack([numeric_hits, category_hits])
+
+    def score(self, rows):
+        """
+        批量评分：rows为特征字典列表（每条记录一个）
+        返回:
+            (scores, matched)  scores为 N x 疾病数 的评分矩阵，matched为谓词匹配矩阵
+        """
+        matched = self.match(*self.encode(rows))
+        scores = np.clip(self.base_scores + MATCH_SCORE * (matched @ self._incidence), 0, MAX_SCORE)
+        return scores, matched
+
+    def evaluate_all(self, requests):
+        """
+        一次评分多条 (疾病, 特征) 请求：一条记录的全部疾病，或批量分析中所有记录的全部疾病
+        返回:
+            与requests一一对应的风险结果（见 evaluate）；未知疾病为None
+        """
+        if not requests:
+            return []
+        scores, matched = self.score([features for _, features in requests])
+        return [self._result(disease, features, scores[i], matched[i])
+                for i, (disease, features) in enumerate(requests)]
+
+    def evaluate(self, disease, features):
+        """
+        单个疾病的风险结果（与批量评分使用同一套谓词）
+        返回:
+            {score, risk_level, description, features}；未知疾病返回None
+        """
+        return self.evaluate_all([(disease, features)])[0]
+
+    def _result(self, disease, features, scores, matched):
+        d = self.index.get(disease)
+        if d is None:
+            return None
+        data = self.library[disease]
+        return {
+            'score': round(float(scores[d]), 1),
+            'risk_level': data['risk_level'],
+            'description': data['description'],
+            'features': [f"{feature}={features[feature]}"
+                         for k, (pd, feature) in enumerate(self.predicates) if pd == d and matched[k]]
+        }
+
+
+DISEASE_RULES = DiseaseRules(DISEASE_LIBRARY)
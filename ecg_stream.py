@@ -0,0 +1,298 @@
+import numpy as np
+from werkzeug.datastructures import MultiDict
+from werkzeug.sansio.multipart import MultipartDecoder, Field, File, Data, Epilogue, NeedData
+
+from ecg_filters import R_PEAK_BAND, R_PEAK_ORDER, bandpass_sos
+from ecg_loader import (PROBE_BYTES, FORMAT_RING_TEXT, FORMAT_CSV, INT16_DTYPES,
+                        CSVParser, detect_format, parse_ring_text, narrow_samples)
+
+CHUNK_SIZE = 64 * 1024       # 每次从请求体读取的字节数
+MAX_FIELD_SIZE = 4 * 1024    # 普通表单字段的最大长度
+
+
+class StreamingDecoder:
+    """增量解码上传的字节流为采样点（收到足够的头部字节后确定一次格式）"""
+
+    def __init__(self):
+        self.data_format = None
+        self._pending = b''
+        self._csv = CSVParser()
+
+    def feed(self, data):
+        """送入一段字节，返回本次可解码出的采样点"""
+        self._pending += data
+        if self.data_format is None:
+            if len(self._pending) < PROBE_BYTES:
+                return np.array([], dtype=np.int32)
+            self.data_format = detect_format(self._pending[:PROBE_BYTES])
+        return self._decode(final=False)
+
+    def finish(self):
+        """请求体结束，解码剩余字节"""
+        if self.data_format is None:
+            if not self._pending:
+                return np.array([], dtype=np.int32)
+            self.data_format = detect_format(self._pending[:PROBE_BYTES])
+        return self._decode(final=True)
+
+    def _decode(self, final):
+        if self.data_format in (FORMAT_RING_TEXT, FORMAT_CSV):
+            # 文本格式按行切分，最后一行可能不完整，留到下一次
+            cut = len(self._pending) if final else self._pending.rfind(b'\n') + 1
+            complete, self._pending = self._pending[:cut], self._pending[cut:]
+            if self.data_format == FORMAT_CSV:
+                return self._csv.parse(complete)
+            return parse_ring_text(complete)
+
+        # int16二进制：奇数字节留到下一次
+        cut = len(self._pending) - len(self._pending) % 2
+        complete, self._pending = self._pending[:cut], self._pending[cut:]
+        return np.frombuffer(complete, dtype=INT16_DTYPES[self.data_format]).astype(np.int32)
+
+
+class StreamingAnalysis:
+    """
+    流式接入：字节到达即解码，并执行零相位带通滤波的前向半程；
+    请求体结束后只需完成反向半程，R峰检测直接使用滤波结果
+    """
+
+    def __init__(self, fs=250, lowcut=R_PEAK_BAND[0], highcut=R_PEAK_BAND[1], order=R_PEAK_ORDER, filtering=True):
+        self.fs = fs
+        self.decoder = StreamingDecoder()
+        self.filtering = filtering   # False时只解码（分析在其他进程中进行，滤波结果无法复用）
+        self._sos = bandpass_sos(fs, lowcut, highcut, order) if filtering else None
+        self._zi = None
+        self._raw_chunks = []
+        self._forward_chunks = []
+
+    def feed(self, data):
+        self._push(self.decoder.feed(data))
+
+    def _push(self, samples):
+        if len(samples) == 0:
+            return
+        self._raw_chunks.append(samples)
+        if not self.filtering:
+            return
+        from scipy.signal import sosfilt, sosfilt_zi
+        x = samples.astype(np.float64)
+        if self._zi is None:
+            self._zi = sosfilt_zi(self._sos) * x[0]
+        y, self._zi = sosfilt(self._sos, x, zi=self._zi)
+        self._forward_chunks.append(y)
+
+    def finish(self):
+        """
+        结束接收
+        返回:
+            (ecg_signal, filtered_signal)，数据为空时均为空数组；不滤波时filtered_signal为None
+        """
+        self._push(self.decoder.finish())
+        if not self._raw_chunks:
+            return np.array([], dtype=np.int16), (np.array([]) if self.filtering else None)
+
+        ecg_signal = narrow_samples(np.concatenate(self._raw_chunks))
+        if not self.filtering:
+            self._raw_chunks = []
+            return ecg_signal, None
+        forward = np.concatenate(self._forward_chunks)
+        self._raw_chunks, self._forward_chunks = [], []
+
+        # 反向半程
+        from scipy.signal import sosfilt, sosfilt_zi
+        zi = sosfilt_zi(self._sos) * forward[-1]
+        backward, _ = sosfilt(self._sos, forward[::-1], zi=zi)
+        return ecg_signal, backward[::-1]
+
+
+class OnlineRPeakDetector:
+    """
+    Pan-Tompkins风格的在线R峰检测：带通 -> 五点微分 -> 平方 -> 150ms滑动积分 -> 自适应双阈值。
+    push(chunk) 之间保留滤波器、积分窗和阈值状态，新数据只处理一次；
+    R峰在积分波形越过峰值后立即输出（延迟约一个积分窗），漏检回溯的延迟不超过1.66个RR间期
+    """
+
+    LEARNING_SECONDS = 2.0      # 初始化阈值所用的数据长度
+    REFRACTORY_SECONDS = 0.2    # 不应期
+    SEARCHBACK_RATIO = 1.66     # 超过平均RR的该倍数仍未检出时回溯
+    MAX_SEARCHBACK_SECONDS = 3.0
+
+    def __init__(self, fs=250, lowcut=5.0, highcut=15.0, order=2):
+        self.fs = fs
+        self._sos = bandpass_sos(fs, lowcut, highcut, order)
+        self._zi = None
+        self._window = max(1, int(0.15 * fs))       # 滑动积分窗
+        self._refractory = int(self.REFRACTORY_SECONDS * fs)
+        self._searchback = int(self.MAX_SEARCHBACK_SECONDS * fs)
+        # 原始信号保留长度：回溯候选最早在searchback之前，R峰定位再向前看两个积分窗
+        self._raw_keep = self._searchback + 2 * self._window + 2
+        self._learn_end = int(self.LEARNING_SECONDS * fs)
+
+        self.position = 0                            # 已处理的采样点数
+        self._filtered_tail = np.zeros(4)            # 微分所需的前4个滤波值
+        self._squared_tail = np.zeros(self._window - 1)
+        self._mwi_tail = np.zeros(2)                 # 判断局部极大值所需的前两个积分值
+        self._raw_tail = np.array([], dtype=np.float64)
+
+        # 阈值状态
+        self._learning = []                          # 学习期内的(位置, 积分值)候选
+        self._learning_max = 0.0
+        self._learning_sum = 0.0
+        self._spki = None
+        self._npki = 0.0
+        self._last_qrs = None
+        self._last_r = None                          # 上次输出的R峰（原始信号位置）
+        self._rr_history = []
+        self._noise_since_qrs = []                   # 上次QRS之后低于阈值的候选，供回溯使用
+
+    @property
+    def threshold(self):
+        return self._npki + 0.25 * (self._spki - self._npki) if self._spki is not None else None
+
+    def push(self, chunk):
+        """
+        送入新采样点
+        返回:
+            本次确认的R峰位置（相对整个数据流的采样点序号）
+        """
+        x = np.asarray(chunk, dtype=np.float64)
+        if len(x) == 0:
+            return np.array([], dtype=np.int64)
+        start = self.position
+        if self._spki is None and start < self._learn_end < start + len(x):
+            # 跨过学习期末尾的数据块在学习期边界处拆开：阈值只由前 LEARNING_SECONDS 的数据决定，
+            # 检测结果与分块方式无关
+            split = self._learn_end - start
+            return np.concatenate([self.push(x[:split]), self.push(x[split:])])
+        self.position += len(x)
+        self._raw_tail = np.concatenate([self._raw_tail, x])[-(self._raw_keep + len(x)):]
+
+        # 1. 因果带通
+        from scipy.signal import sosfilt, sosfilt_zi
+        if self._zi is None:
+            self._zi = sosfilt_zi(self._sos) * x[0]
+        filtered, self._zi = sosfilt(self._sos, x, zi=self._zi)
+
+        # 2. 五点微分 + 平方
+        ext = np.concatenate([self._filtered_tail, filtered])
+        derivative = (2 * ext[4:] + ext[3:-1] - ext[1:-3] - 2 * ext[:-4]) / 8.0
+        self._filtered_tail = ext[-4:]
+        squared = derivative ** 2
+
+        # 3. 滑动积分（累加和差分）
+        ext = np.concatenate([self._squared_tail, squared])
+        csum = np.concatenate([[0.0], np.cumsum(ext)])
+        mwi = (csum[self._window:] - csum[:-self._window]) / self._window
+        self._squared_tail = ext[len(ext) - (self._window - 1):] if self._window > 1 else ext[:0]
+
+        # 4. 积分波形局部极大值作为候选（位置比当前数据晚一个点才能确认）
+        ext = np.concatenate([self._mwi_tail, mwi])
+        is_peak = (ext[1:-1] > ext[:-2]) & (ext[1:-1] >= ext[2:])
+        candidates = np.flatnonzero(is_peak) + start - 1
+        values = ext[1:-1][is_peak]
+        self._mwi_tail = ext[-2:]
+
+        detected = []
+        if self._spki is None:
+            self._learning_max = max(self._learning_max, float(mwi.max()))
+            self._learning_sum += float(mwi.sum())
+            self._learning.extend(zip(candidates.tolist(), values.tolist()))
+            if self.position < self._learn_end:
+                return np.array([], dtype=np.int64)
+            self._spki = self._learning_max / 3.0
+            self._npki = self._learning_sum / self.position / 2.0
+            pending, self._learning = self._learning, []
+        else:
+            pending = zip(candidates.tolist(), values.tolist())
+
+        for index, value in pending:
+            detected.extend(self._classify(index, value))
+        return np.array(detected, dtype=np.int64)
+
+    def _classify(self, index, value):
+        """按自适应阈值判定一个积分波形峰值，返回确认的R峰位置列表"""
+        detected = []
+        # 长时间未检出：用半阈值在上次QRS之后的候选中回溯
+        if self._rr_history and self._last_qrs is not None:
+            rr_avg = np.mean(self._rr_history)
+            if index - self._last_qrs > self.SEARCHBACK_RATIO * rr_avg:
+                missed = [(i, v) for i, v in self._noise_since_qrs
+                          if v > 0.5 * self.threshold and i - self._last_qrs > self._refractory]
+                if missed:
+                    i, v = max(missed, key=lambda item: item[1])
+                    self._spki = 0.25 * v + 0.75 * self._spki
+                    detected.append(self._accept(i))
+
+        if value > self.threshold and (self._last_qrs is None or index - self._last_qrs > self._refractory):
+            self._spki = 0.125 * value + 0.875 * self._spki
+            detected.append(self._accept(index))
+        else:
+            self._npki = 0.125 * value + 0.875 * self._npki
+            self._noise_since_qrs.append((index, value))
+            oldest = index - self._searchback   # 以候选位置为准，与分块方式无关
+            while self._noise_since_qrs and self._noise_since_qrs[0][0] < oldest:
+                self._noise_since_qrs.pop(0)
+        return [d for d in detected if d is not None]
+
+    def _accept(self, mwi_index):
+        """
+        确认QRS，并在原始信号中定位R峰（积分峰值之前两个积分窗内的最大值）。
+        定位窗口比不应期长，同一个R峰可能被相邻的两个积分峰值定位到：
+        不应期按输出的R峰位置判断，重复或不晚于上一个R峰的位置不输出（输出严格递增）
+        """
+        tail_start = self.position - len(self._raw_tail)
+        lo = max(tail_start, mwi_index - 2 * self._window)
+        hi = min(self.position, mwi_index + 1)
+        self._noise_since_qrs = []
+        if hi <= lo:
+            self._last_qrs = mwi_index
+            return None
+        segment = self._raw_tail[lo - tail_start:hi - tail_start]
+        r_peak = int(lo + np.argmax(segment - segment.mean()))
+        if self._last_r is not None and r_peak - self._last_r <= self._refractory:
+            self._last_qrs = mwi_index   # 同一QRS波群的另一个积分峰值：延长不应期，不计入RR
+            return None
+
+        if self._last_qrs is not None:
+            self._rr_history = (self._rr_history + [mwi_index - self._last_qrs])[-8:]
+        self._last_qrs = mwi_index
+        self._last_r = r_peak
+        return r_peak
+
+
+def consume_multipart(stream, boundary, open_file, chunk_size=CHUNK_SIZE):
+    """
+    边接收边解析multipart请求体，文件数据不落盘
+    参数:
+        stream - 原始请求体（request.stream）
+        boundary - multipart边界（bytes）
+        open_file - 回调 (字段名, 文件名) -> 实现 feed(bytes) 的接收对象；返回None则丢弃该文件
+    返回:
+        (fields, files)  fields: {字段名: 值}，files: MultiDict {字段名: (文件名, 接收对象)}，同名字段可有多个文件
+    """
+    decoder = MultipartDecoder(boundary)
+    fields, files = {}, MultiDict()
+    part_name, field_value, sink = None, None, None
+
+    while True:
+        event = decoder.next_event()
+        if isinstance(event, NeedData):
+            chunk = stream.read(chunk_size)
+            decoder.receive_data(chunk if chunk else None)
+        elif isinstance(event, Field):
+            part_name, field_value, sink = event.name, bytearray(), None
+        elif isinstance(event, File):
+            part_name, field_value = event.name, None
+            sink = open_file(event.name, event.filename)
+            files.add(event.name, (event.filename, sink))
+        elif isinstance(event, Data):
+            if field_value is not None:
+                if len(field_value) + len(event.data) > MAX_FIELD_SIZE:
+                    raise ValueError(f"表单字段过长: {part_name}")
+                field_value += event.data
+                if not event.more_data:
+                    fields[part_name] = field_value.decode('utf-8', 'replace')
+            elif sink is not None:
+                sink.feed(event.data)
+        elif isinstance(event, Epilogue):
+            return fields, files
@@ -0,0 +1,100 @@
+import base64
+
+import numpy as np
+
+WAVEFORM_WIDTH = 1000                 # 默认列数（约为手机屏幕的物理像素宽度）
+WAVEFORM_MAX_WIDTH = 4000
+WAVEFORM_ENCODINGS = ('delta', 'int16')
+
+
+def minmax_decimate(signal, n_bins):
+    """
+    像素级最小/最大值抽取：把信号等分为n_bins个区间，每个区间保留最小值和最大值两个采样点
+    （按时间先后排列），折线在每个像素列内覆盖原信号的完整振幅范围，QRS尖峰不会被抽掉
+    参数:
+        signal - 一维信号
+        n_bins - 区间数（通常为绘图区像素宽度）
+    返回:
+        (index, bin_size)  index为保留的采样点位置（递增）；信号不长于2*n_bins时原样保留，bin_size为1
+    """
+    x = np.asarray(signal)
+    n = len(x)
+    if n <= 2 * n_bins:
+        return np.arange(n), 1
+
+    bin_size = -(-n // n_bins)
+    n_full = n // bin_size
+    body = x[:n_full * bin_size].reshape(n_full, bin_size)
+    lo = body.argmin(axis=1)
+    hi = body.argmax(axis=1)
+    if n_full * bin_size < n:  # 末尾不足一个区间的采样点单独成一组
+        tail = x[n_full * bin_size:]
+        lo = np.append(lo, tail.argmin())
+        hi = np.append(hi, tail.argmax())
+    base = np.arange(len(lo)) * bin_size
+    index = np.column_stack((np.minimum(lo, hi), np.maximum(lo, hi))) + base[:, None]
+    return index.ravel(), bin_size
+
+
+def envelope_markers(index, bin_size, ecg, positions):
+    """
+    将原信号中的标记位置映射到抽取后的折线顶点：取标记所在区间中较高的那个顶点，
+    同一区间内的多个标记只画一次
+    返回:
+        抽取后序列中的顶点下标
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    if bin_size == 1:
+        return positions
+    pair = np.unique(positions // bin_size) * 2
+    upper = ecg[index[pair + 1]] > ecg[index[pair]]
+    return pair + upper
+
+
+def _quantize(values):
+    """转换为int16；超出int16范围或非整数信号按比例缩放，返回 (采样值, 缩放系数)"""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.integer) and (
+            len(values) == 0 or (values.min() >= -32768 and values.max() <= 32767)):
+        return values.astype(np.int16), 1.0
+    peak = float(np.max(np.abs(values))) if len(values) else 0.0
+    scale = peak / 32767 if peak > 0 else 1.0
+    return np.round(values / scale).astype(np.int16), scale
+
+
+def compact_waveform(ecg, fs, annotations, width=WAVEFORM_WIDTH, encoding='delta'):
+    """
+    供客户端自行绘制的紧凑波形：按列做最小/最大值抽取，每列两个顶点，
+    第k个顶点位于第 k//2 列，对应原信号的第 (k//2)*bin_size 个采样点附近
+    参数:
+        ecg - 原始信号
+        fs - 采样率
+        annotations - {名称: 原信号中的标记位置}，如 {"r": r_peaks}
+        width - 列数
+        encoding - 'delta'：首个值和相邻差分组成的整数列表（JSON中较短）；
+                   'int16'：int16小端字节的base64字符串
+    返回:
+        可JSON序列化的dict；采样值 = 编码值 * scale，annotations为顶点下标
+    """
+    ecg = np.asarray(ecg)
+    index, bin_size = minmax_decimate(ecg, width)
+    if bin_size == 1:
+        index = np.repeat(index, 2)  # 不需要抽取时每个采样点也占一列，客户端统一按两点一列绘制
+        marks = {name: 2 * np.unique(np.asarray(pos, dtype=np.int64)) for name, pos in annotations.items()}
+    else:
+        marks = {name: envelope_markers(index, bin_size, ecg, pos) for name, pos in annotations.items()}
+
+    samples, scale = _quantize(ecg[index])
+    if encoding == 'int16':
+        encoded = base64.b64encode(samples.astype('<i2').tobytes()).decode('ascii')
+    else:
+        encoded = np.diff(samples.astype(np.int32), prepend=0).tolist()
+    return {
+        "fs": fs,
+        "length": len(ecg),
+        "bin_size": int(bin_size),
+        "encoding": encoding,
+        "scale": scale,
+        "samples": encoded,
+        "annotations": {name: vertices.tolist() for name, vertices in marks.items()}
+    }
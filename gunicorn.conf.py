@@ -1,2 +1,16 @@
+import importlib
+import time
+
 timeout = 300  # 增加超时时间
 workers = 1
+
+
+def post_worker_init(worker):
+    """worker加载应用后、开始接收请求前，执行应用模块中的warm_up()（如有）"""
+    module = importlib.import_module(worker.app.app_uri.split(':')[0])
+    warm_up = getattr(module, 'warm_up', None)
+    if warm_up is None:
+        return
+    start = time.perf_counter()
+    warm_up()
+    worker.log.info("预热完成，用时 %.2f 秒", time.perf_counter() - start)
@@ -0,0 +1,59 @@
+// 根据 /api/report/<id>/<token>/waveform 返回的紧凑波形在canvas上绘制心电条带
+// 每两个顶点为一列（该列的最小/最大值），annotations为需要标记的顶点下标
+(function () {
+    var MARK_COLORS = {r: '#f5222d', p: '#52c41a', t: '#722ed1'};
+
+    function decode(data) {
+        var values = [];
+        if (data.encoding === 'int16') {
+            var bytes = atob(data.samples);
+            var view = new DataView(new ArrayBuffer(bytes.length));
+            for (var i = 0; i < bytes.length; i++) view.setUint8(i, bytes.charCodeAt(i));
+            for (var j = 0; j < bytes.length / 2; j++) values.push(view.getInt16(2 * j, true) * data.scale);
+        } else {
+            var acc = 0;
+            for (var k = 0; k < data.samples.length; k++) {
+                acc += data.samples[k];
+                values.push(acc * data.scale);
+            }
+        }
+        return values;
+    }
+
+    function draw(canvas, data) {
+        var ratio = window.devicePixelRatio || 1;
+        canvas.width = canvas.clientWidth * ratio;
+        canvas.height = canvas.clientHeight * ratio;
+        var ctx = canvas.getContext('2d');
+        var values = decode(data);
+        var columns = values.length / 2;
+        var min = Math.min.apply(null, values), max = Math.max.apply(null, values);
+        var x = function (k) { return Math.floor(k / 2) / Math.max(columns - 1, 1) * canvas.width; };
+        var y = function (v) { return canvas.height * (0.95 - 0.9 * (v - min) / ((max - min) || 1)); };
+
+        ctx.strokeStyle = '#1890ff';
+        ctx.lineWidth = ratio;
+        ctx.beginPath();
+        for (var k = 0; k < values.length; k++) {
+            if (k === 0) ctx.moveTo(x(k), y(values[k])); else ctx.lineTo(x(k), y(values[k]));
+        }
+        ctx.stroke();
+
+        Object.keys(data.annotations).forEach(function (name) {
+            ctx.fillStyle = MARK_COLORS[name] || '#333';
+            data.annotations[name].forEach(function (k) {
+                ctx.beginPath();
+                ctx.arc(x(k), y(values[k]), 2.5 * ratio, 0, 2 * Math.PI);
+                ctx.fill();
+            });
+        });
+    }
+
+    document.querySelectorAll('canvas[data-waveform]').forEach(function (canvas) {
+        var width = Math.round(canvas.clientWidth * (window.devicePixelRatio || 1));
+        var url = canvas.getAttribute('data-waveform');
+        fetch(url + (url.indexOf('?') < 0 ? '?' : '&') + 'width=' + width)
+            .then(function (response) { return response.json(); })
+            .then(function (body) { if (body.code === 200) draw(canvas, body.data); });
+    });
+})();
@@ -3,7 +3,7 @@
 # success, results, report = processor.analyze_ecg_file("test.dat")
 # print(f"Success: {success}")
 # print(f"Health Index: {results.get('health_index')}")
-from ecg_processor import ECGProcessor
+from ecg_processor import ECGProcessor, REPORT_HTML
 from flask import Flask, send_file
 import os
 
@@ -20,8 +20,8 @@ def show_report():
     if not success:
         return f"Analysis failed: {results['error']}", 500
     
-    # 返回生成的HTML报告
-    return send_file(report['html_report'])
+    # 返回HTML报告（首次访问时生成）
+    return send_file(processor.render_artifact(report['report_id'], REPORT_HTML))
 
 if __name__ == '__main__':
     # 启动临时Web服务（端口5001避免冲突）
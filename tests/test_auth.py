@@ -0,0 +1,105 @@
+import hashlib
+import time
+import unittest
+
+from ecg_auth import (APP_CONFIG, AUTH_HEADERS, REPORT_URL_TTL, NonceCache, authenticate, release,
+                      report_token, verify_report_token)
+
+
+def signed_params(nonce=None, timestamp=None):
+    """按客户端规则生成签名参数"""
+    timestamp = str(int(time.time())) if timestamp is None else timestamp
+    secret = APP_CONFIG['app1']['secret']
+    fields = ['app1', timestamp, 'ring-1'] + ([nonce] if nonce else []) + [secret]
+    params = {'appId': 'app1', 'time': timestamp, 'id': 'ring-1',
+              'sign': hashlib.md5('|'.join(fields).encode()).hexdigest(), 'servertype': 'ECG'}
+    if nonce:
+        params['nonce'] = nonce
+    return params
+
+
+class TestAuthenticate(unittest.TestCase):
+    def test_replay_rejected(self):
+        cache = NonceCache()
+        params = signed_params()
+        self.assertTrue(authenticate(params, cache))
+        self.assertFalse(authenticate(params, cache))
+
+    def test_nonce_distinguishes_same_second_uploads(self):
+        cache = NonceCache()
+        timestamp = str(int(time.time()))
+        self.assertTrue(authenticate(signed_params('a1', timestamp), cache))
+        self.assertTrue(authenticate(signed_params('b2', timestamp), cache))
+        # nonce参与签名，不能替换
+        forged = dict(signed_params('a1', timestamp), nonce='c3')
+        self.assertFalse(authenticate(forged, cache))
+
+    def test_released_signature_can_retry(self):
+        cache = NonceCache()
+        params = signed_params('retry')
+        self.assertTrue(authenticate(params, cache))
+        release(params, cache)
+        self.assertTrue(authenticate(params, cache))
+
+
+class TestFailedUploadRetry(unittest.TestCase):
+    def test_failed_request_releases_signature(self):
+        from app_bbc import app
+        client = app.test_client()
+        headers = {AUTH_HEADERS[field]: value for field, value in signed_params('upload-1').items()}
+        # 缺少文件的请求失败后释放nonce，同一签名重试不会被当作重放（否则第二次返回403）
+        for _ in range(2):
+            response = client.post('/api/analyze', headers=headers, data={'servertype': 'ECG'},
+                                   content_type='multipart/form-data')
+            self.assertEqual(response.get_json()['code'], 400)
+
+
+class TestReportToken(unittest.TestCase):
+    def test_token_bound_to_report_and_expiry(self):
+        token = report_token('a' * 24)
+        self.assertTrue(verify_report_token('a' * 24, token))
+        self.assertFalse(verify_report_token('b' * 24, token))
+        self.assertFalse(verify_report_token('a' * 24, token, now=time.time() + REPORT_URL_TTL + 1))
+        expires, _, mac = token.partition('-')
+        self.assertFalse(verify_report_token('a' * 24, f"{int(expires) + 3600}-{mac}"))
+        self.assertFalse(verify_report_token('a' * 24, 'waveform'))
+
+
+class TestReportAccess(unittest.TestCase):
+    def test_waveform_requires_token_and_is_private(self):
+        from app_bbc import PROCESSOR, app, report_urls
+        from tests.test_reports import detectable_beats
+        success, _, report = PROCESSOR.analyze_signal(detectable_beats(3), 'access.dat', cache=None)
+        self.assertTrue(success)
+        report_id = report['report_id']
+        with app.test_request_context():
+            url = report_urls(report_id)['waveform_url']
+        client = app.test_client()
+
+        self.assertEqual(client.get(f'/api/report/{report_id}/{report_token("0" * 24)}/waveform').status_code, 403)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response.headers['Cache-Control'])
+        self.assertNotIn('public', response.headers['Cache-Control'])
+        revalidated = client.get(url, headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_signal_file_requires_token(self):
+        from app_bbc import PROCESSOR, app, signal_url
+        from tests.test_reports import detectable_beats
+        success, results, _ = PROCESSOR.analyze_signal(detectable_beats(4), 'signal.dat', cache=None)
+        self.assertTrue(success)
+        name = results['basic_info']['signal_file']
+        with app.test_request_context():
+            url = signal_url(name)
+        client = app.test_client()
+
+        self.assertEqual(client.get(f'/api/signal/{report_token("other")}/{name}').status_code, 403)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response.headers['Cache-Control'])
+        response.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
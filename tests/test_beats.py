@@ -0,0 +1,30 @@
+import unittest
+
+import numpy as np
+
+from ecg_beats import BeatMatrix
+
+
+class TestBeatMatrix(unittest.TestCase):
+    def setUp(self):
+        self.ecg = np.arange(100, dtype=np.int16) % 7
+        self.r_peaks = [2, 50, 98]
+
+    def test_argmax_matches_clipped_slices(self):
+        beats = BeatMatrix(self.ecg, self.r_peaks, -10, 10)
+        positions, amplitudes, found = beats.argmax(-5, 5)
+        for r, pos, amp in zip(self.r_peaks, positions, amplitudes):
+            lo, hi = max(0, r - 5), min(len(self.ecg), r + 5)
+            self.assertEqual(pos, lo + np.argmax(self.ecg[lo:hi]))
+            self.assertEqual(amp, self.ecg[pos])
+        self.assertTrue(found.all())
+
+    def test_windows_outside_signal(self):
+        beats = BeatMatrix(self.ecg, self.r_peaks, -10, 10)
+        means, found = beats.mean(3, 10)
+        np.testing.assert_array_equal(found, [True, True, False])
+        self.assertAlmostEqual(means[0], self.ecg[5:12].mean())
+
+
+if __name__ == '__main__':
+    unittest.main()
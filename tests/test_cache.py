@@ -0,0 +1,57 @@
+import os
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from ecg_cache import AnalysisCache, analysis_key
+from ecg_processor import ECGProcessor
+from tests.test_stream import synthetic_beats
+
+
+class TestAnalysisCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = AnalysisCache(self.tmpdir.name, max_bytes=10 * 1024, ttl=60)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_key_depends_on_samples_and_config(self):
+        signal = np.arange(100, dtype=np.int16)
+        key = analysis_key(signal, {"version": 1})
+        self.assertEqual(key, analysis_key(signal.copy(), {"version": 1}))
+        self.assertNotEqual(key, analysis_key(signal, {"version": 2}))
+        self.assertNotEqual(key, analysis_key(signal[::-1], {"version": 1}))
+
+    def test_ttl_and_size_eviction(self):
+        self.cache.put('old', {"value": np.int64(1)})
+        old_path = os.path.join(self.tmpdir.name, 'old.json')
+        os.utime(old_path, (time.time() - 120, time.time() - 120))
+        self.assertIsNone(self.cache.get('old'))
+
+        for i in range(20):
+            self.cache.put(f'k{i}', {"payload": "x" * 1024})
+        self.assertIsNotNone(self.cache.get('k19'))
+        self.assertIsNone(self.cache.get('k0'))
+
+    def test_repeat_submission_skips_pipeline(self):
+        class CountingProcessor(ECGProcessor):
+            calls = 0
+
+            def _detect_r_peaks(self, ecg_signal, filtered_signal=None):
+                CountingProcessor.calls += 1
+                return super()._detect_r_peaks(ecg_signal, filtered_signal)
+
+        signal = synthetic_beats(beats=20)[0].astype(np.int16)
+        processor = CountingProcessor()
+        _, first, _ = processor.analyze_signal(signal, 'a.dat', render_report=False, cache=self.cache)
+        _, second, _ = processor.analyze_signal(signal, 'b.dat', render_report=False, cache=self.cache)
+        self.assertEqual(CountingProcessor.calls, 1)
+        self.assertEqual(second["wave_features"], first["wave_features"])
+        self.assertEqual(second["basic_info"]["filename"], 'b.dat')
+
+
+if __name__ == '__main__':
+    unittest.main()
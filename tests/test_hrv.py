@@ -0,0 +1,105 @@
+import unittest
+
+import numpy as np
+from scipy.signal import welch
+
+from ecg_hrv import (DFA_SHORT, RESAMPLE_FS, approximate_entropy, dfa, filter_rr, hrv_metrics, poincare,
+                     sample_entropy, time_domain, welch_psd)
+
+
+def modulated_r_peaks(seconds=300, fs=250, lf=0.1, hf=0.25, seed=0):
+    """RR间期受0.1Hz（LF）和0.25Hz（HF）正弦调制的R峰序列，HF幅度为LF的一半"""
+    rng = np.random.default_rng(seed)
+    peaks, t = [], 0.0
+    while t < seconds:
+        rr = 0.8 + 0.04 * np.sin(2 * np.pi * lf * t) + 0.02 * np.sin(2 * np.pi * hf * t) + rng.normal(0, 0.002)
+        t += rr
+        peaks.append(int(round(t * fs)))
+    return np.array(peaks)
+
+
+class TestTimeDomain(unittest.TestCase):
+    def test_known_sequence(self):
+        metrics = time_domain([800, 860, 790, 800, 900])
+        self.assertAlmostEqual(metrics['mean_nn'], 830)
+        self.assertAlmostEqual(metrics['rmssd'], np.sqrt((60 ** 2 + 70 ** 2 + 10 ** 2 + 100 ** 2) / 4))
+        self.assertEqual(metrics['nn50'], 3)
+        self.assertAlmostEqual(metrics['pnn50'], 75.0)
+
+    def test_filter_rr_drops_ectopics(self):
+        rr = np.array([800, 810, 400, 1200, 805, 2500, 790])
+        np.testing.assert_array_equal(filter_rr(rr), [True, True, False, False, True, False, True])
+
+    def test_poincare_identity(self):
+        nn = 800 + 30 * np.random.default_rng(1).standard_normal(500)
+        metrics = poincare(nn)
+        # SD1² + SD2² = 2·SDNN²
+        self.assertAlmostEqual(metrics['sd1'] ** 2 + metrics['sd2'] ** 2, 2 * np.var(nn), places=6)
+        self.assertAlmostEqual(metrics['csi'], metrics['sd2'] / metrics['sd1'])
+
+
+class TestFrequencyDomain(unittest.TestCase):
+    def test_welch_matches_scipy(self):
+        x = np.random.default_rng(2).standard_normal(1200)
+        freqs, psd = welch_psd(x)
+        ref_freqs, ref_psd = welch(x, fs=RESAMPLE_FS, window='hann', nperseg=256)
+        np.testing.assert_allclose(freqs, ref_freqs)
+        np.testing.assert_allclose(psd, ref_psd, rtol=1e-10)
+
+    def test_lf_hf_bands(self):
+        metrics = hrv_metrics(modulated_r_peaks(), 250)
+        frequency = metrics['frequency']
+        self.assertGreater(frequency['lf'], frequency['hf'])
+        self.assertGreater(frequency['hf'], frequency['vlf'])
+        self.assertAlmostEqual(frequency['lf_nu'] + frequency['hf_nu'], 100.0)
+        self.assertTrue(2 < frequency['lf_hf_ratio'] < 8)   # 幅度比2:1，功率比约4:1
+
+    def test_short_recording_has_no_spectrum(self):
+        metrics = hrv_metrics(modulated_r_peaks(seconds=30), 250)
+        self.assertIsNone(metrics['frequency'])
+        self.assertGreater(metrics['rmssd'], 0)
+        self.assertIsNone(hrv_metrics([0, 200], 250))
+
+
+def chebyshev_matches(x, dim, count, tolerance, closed):
+    """逐对计算的参照实现：每个模板与所有模板（含自身）的匹配数"""
+    templates = np.column_stack([x[i:i + count] for i in range(dim)])
+    dist = np.abs(templates[:, None, :] - templates[None, :, :]).max(axis=2)
+    return (dist <= tolerance if closed else dist < tolerance).sum(axis=1)
+
+
+class TestComplexity(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(4)
+        self.nn = np.round(800 + np.cumsum(rng.standard_normal(400)) + 20 * rng.standard_normal(400))
+        self.tolerance = 0.2 * np.std(self.nn, ddof=1)
+
+    def test_sample_entropy_matches_pairwise(self):
+        count = len(self.nn) - 2
+        b = (chebyshev_matches(self.nn, 2, count, self.tolerance, False).sum() - count) / 2
+        a = (chebyshev_matches(self.nn, 3, count, self.tolerance, False).sum() - count) / 2
+        self.assertAlmostEqual(sample_entropy(self.nn), -np.log(a / b))
+
+    def test_approximate_entropy_matches_pairwise(self):
+        phi = [np.mean(np.log(chebyshev_matches(self.nn, m, len(self.nn) - m + 1, self.tolerance, True)
+                              / (len(self.nn) - m + 1))) for m in (2, 3)]
+        self.assertAlmostEqual(approximate_entropy(self.nn), phi[0] - phi[1])
+
+    def test_dfa(self):
+        rng = np.random.default_rng(5)
+        self.assertAlmostEqual(dfa(rng.standard_normal(4000), DFA_SHORT), 0.5, delta=0.15)   # 白噪声（小尺度下略偏高）
+        self.assertAlmostEqual(dfa(np.cumsum(rng.standard_normal(4000)), DFA_SHORT), 1.5, delta=0.15)   # 随机游走
+        self.assertIsNone(dfa(self.nn[:7], DFA_SHORT))   # 窗口长度不足两个
+
+    def test_hrv_metrics_complexity(self):
+        metrics = hrv_metrics(modulated_r_peaks(), 250, complexity=True)
+        complexity = metrics['complexity']
+        self.assertGreater(complexity['sampen'], 0)
+        self.assertIsNotNone(complexity['dfa_alpha1'])
+        self.assertEqual(complexity['entropy_points'], metrics['nn_count'])
+        self.assertNotIn('complexity', hrv_metrics(modulated_r_peaks(), 250))
+        self.assertIsNone(hrv_metrics(modulated_r_peaks(seconds=30), 250, complexity=True)['complexity'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import time
+import unittest
+
+from ecg_jobs import JobQueue, JobStore, process_boot_id
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = JobStore(os.path.join(self.tmpdir.name, 'jobs.sqlite3'))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _wait(self, queue, job_id):
+        for _ in range(100):
+            job = queue.get(job_id)
+            if job['status'] in ('done', 'failed'):
+                return job
+            time.sleep(0.05)
+        self.fail('job did not finish')
+
+    def test_results_and_failures(self):
+        def handler(payload):
+            if payload['n'] < 0:
+                raise ValueError('negative')
+            return {'square': payload['n'] ** 2}
+
+        queue = JobQueue(handler, store=self.store)
+        ok = self._wait(queue, queue.submit({'n': 3}))
+        self.assertEqual(ok['result'], {'square': 9})
+        failed = self._wait(queue, queue.submit({'n': -1}))
+        self.assertEqual(failed['error'], 'negative')
+
+    def test_orphaned_jobs_requeued_on_start(self):
+        job_id = self.store.submit({'n': 2})
+        self.store.claim('999999999:1:ecg-job-0')  # 已退出的进程领取后未完成
+        self.assertEqual(self.store.get(job_id)['status'], 'running')
+
+        queue = JobQueue(lambda payload: payload['n'] + 1, store=self.store)
+        self.assertEqual(self._wait(queue, job_id)['result'], 3)
+
+    def test_restart_with_same_pid_requeues(self):
+        # 容器重启后worker的PID与上次相同，但启动时间不同：上次运行遗留的任务仍需重新排队
+        stale = self.store.submit({'n': 5})
+        self.store.claim(f'{os.getpid()}:0:ecg-job-0')
+        live = self.store.submit({'n': 6})
+        self.store.claim(f'{process_boot_id()}:ecg-job-1')  # 当前进程正在执行的任务
+
+        self.assertEqual(self.store.requeue_orphans(), 1)
+        self.assertEqual(self.store.get(stale)['status'], 'queued')
+        self.assertEqual(self.store.get(live)['status'], 'running')
+
+
+if __name__ == '__main__':
+    unittest.main()
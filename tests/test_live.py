@@ -0,0 +1,52 @@
+import unittest
+
+from ecg_live import LiveSessionRegistry
+from ecg_processor import ECGProcessor
+from tests.test_stream import TEST_RECORDING, chunked, synthetic_beats
+
+
+class TestLiveSession(unittest.TestCase):
+    def test_rolling_metrics(self):
+        registry = LiveSessionRegistry(ECGProcessor)
+        session = registry.open('int16_le')
+        signal, r_peaks = synthetic_beats(beats=60)
+        for chunk in chunked(signal.astype('<i2').tobytes(), 1001):
+            session.feed(chunk)
+        session.finish()
+
+        status = session.status()
+        self.assertEqual(status['total_beats'], len(r_peaks))
+        self.assertLessEqual(status['metrics']['window_beats'], 30 * 2)
+        self.assertTrue(50 < status['metrics']['heart_rate'] < 90)
+
+    def test_large_pushes(self):
+        # 一次推送整段记录（单次请求体可达 CHUNK_SIZE）与小包推送结果一致，R峰不重复
+        with open(TEST_RECORDING, 'rb') as f:
+            raw = f.read()
+        statuses = []
+        for size in (2000, len(raw)):
+            session = LiveSessionRegistry(ECGProcessor).open()
+            peaks = []
+            for chunk in chunked(raw, size):
+                peaks.extend(session.feed(chunk).tolist())
+            peaks.extend(session.finish().tolist())
+            self.assertTrue(all(b > a for a, b in zip(peaks, peaks[1:])))
+            statuses.append(session.status())
+
+        small, large = statuses
+        self.assertEqual(small['total_beats'], large['total_beats'])
+        self.assertGreater(large['total_beats'], 40)
+        self.assertEqual(small['metrics'], large['metrics'])
+        self.assertTrue(60 < large['metrics']['heart_rate'] < 100)
+        self.assertNotIn('心律不齐', large['metrics']['arrhythmia']['types'])
+
+    def test_idle_sessions_expire(self):
+        registry = LiveSessionRegistry(ECGProcessor, idle_ttl=0)
+        session = registry.open()
+        session.last_seen -= 1
+        self.assertIsNone(registry.get(session.session_id))
+        self.assertEqual(len(registry), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
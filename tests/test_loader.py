@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from ecg_loader import (load_ecg_recording, parse_csv, FORMAT_RING_TEXT, FORMAT_CSV,
+                        FORMAT_INT16_LE, FORMAT_INT16_BE)
+
+
+def synthetic_ecg(n=3000, fs=250):
+    t = np.arange(n) / fs
+    return (1000 * np.sin(2 * np.pi * 1.2 * t) + 200 * np.sin(2 * np.pi * 7 * t)).astype(np.int16)
+
+
+class TestLoader(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.signal = synthetic_ecg()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write(self, name, data):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_little_endian(self):
+        path = self._write('le.dat', self.signal.astype('<i2').tobytes())
+        recording = load_ecg_recording(path)
+        self.assertEqual(recording.data_format, FORMAT_INT16_LE)
+        np.testing.assert_array_equal(recording.signal, self.signal)
+        self.assertFalse(recording.signal.flags.owndata)
+
+    def test_big_endian(self):
+        path = self._write('be.dat', self.signal.astype('>i2').tobytes())
+        recording = load_ecg_recording(path)
+        self.assertEqual(recording.data_format, FORMAT_INT16_BE)
+        np.testing.assert_array_equal(recording.signal, self.signal)
+
+    def test_ring_text(self):
+        lines = []
+        for seq, chunk in enumerate(np.array_split(self.signal, 10)):
+            lines.append(f"seq:{seq};ecg:{','.join(map(str, chunk))},")
+        path = self._write('ring.dat', "\n".join(lines).encode('ascii'))
+        recording = load_ecg_recording(path)
+        self.assertEqual(recording.data_format, FORMAT_RING_TEXT)
+        np.testing.assert_array_equal(recording.signal, self.signal)
+
+    def test_csv_single_column(self):
+        text = "ecg\n" + "\n".join(map(str, self.signal)) + "\n"
+        recording = load_ecg_recording(self._write('single.csv', text.encode('ascii')))
+        self.assertEqual(recording.data_format, FORMAT_CSV)
+        self.assertEqual(recording.signal.dtype, np.int16)
+        np.testing.assert_array_equal(recording.signal, self.signal)
+
+    def test_csv_timestamp_value_blocks(self):
+        t = np.arange(len(self.signal)) / 250
+        text = "".join(f"{ts:.3f},{v}\r\n" for ts, v in zip(t, self.signal))
+        # 小块解析，验证跨块的行对齐
+        np.testing.assert_array_equal(parse_csv(text.encode('ascii'), block_bytes=1000), self.signal)
+
+    def test_csv_iso_timestamp_float_values(self):
+        values = self.signal / 1000.0
+        text = "time;mv\n" + "".join(f"2025-05-18T10:00:00;{v}\n" for v in values)
+        recording = load_ecg_recording(self._write('iso.csv', text.encode('ascii')))
+        self.assertEqual(recording.signal.dtype, np.float32)
+        np.testing.assert_allclose(recording.signal, values, rtol=1e-6)
+
+    def test_csv_unparseable_value(self):
+        # 无法解析的字段必须报错，不能截断后把后续数据拼接上来
+        with self.assertRaises(ValueError):
+            parse_csv(b'ecg\n1\n2\n3\nN/A\n5\n6\n7\n')
+        with self.assertRaises(ValueError):
+            parse_csv(b'1.0,1\n2.0,2\n3.0,x\n4.0,4\n')
+        with self.assertRaises(ValueError):
+            parse_csv(b'1.0,1\n2.0,2,9\n3.0\n4.0,4\n')
+
+    def test_empty_file(self):
+        path = self._write('empty.dat', b'')
+        with self.assertRaises(ValueError):
+            load_ecg_recording(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import time
+import unittest
+
+from ecg_live import LiveSessionRegistry
+from ecg_metrics import METRICS, STAGES, StageMetrics, collect, stage, timed
+from ecg_processor import ECGProcessor
+from tests.test_reports import detectable_beats
+from tests.test_stream import chunked, synthetic_beats
+
+
+class TestStageTimers(unittest.TestCase):
+    def test_nested_stages_are_exclusive(self):
+        with collect(observe=False) as timings:
+            with stage('rpeak'):
+                time.sleep(0.02)
+                with stage('filter'):
+                    time.sleep(0.05)
+        self.assertGreaterEqual(timings['filter'], 0.05)
+        self.assertGreaterEqual(timings['rpeak'], 0.02)
+        self.assertLess(timings['rpeak'], 0.05)
+
+    def test_nested_collect_shares_outer(self):
+        @timed('hrv')
+        def work():
+            with collect() as inner:
+                return inner
+
+        with collect(observe=False) as outer:
+            self.assertIs(work(), outer)
+            work()
+        self.assertEqual(set(outer), {'hrv'})
+
+    def test_prometheus_text(self):
+        metrics = StageMetrics()
+        metrics.observe_all({'load': 0.003, 'render': 0.7})
+        metrics.observe('render', 20)
+        text = metrics.render()
+        self.assertIn('# TYPE ecg_stage_duration_seconds histogram', text)
+        self.assertIn('ecg_stage_duration_seconds_bucket{stage="load",le="0.001"} 0', text)
+        self.assertIn('ecg_stage_duration_seconds_bucket{stage="load",le="0.005"} 1', text)
+        self.assertIn('ecg_stage_duration_seconds_bucket{stage="render",le="1.0"} 1', text)
+        self.assertIn('ecg_stage_duration_seconds_bucket{stage="render",le="+Inf"} 2', text)
+        self.assertIn('ecg_stage_duration_seconds_count{stage="render"} 2', text)
+        self.assertIn('ecg_stage_duration_seconds_count{stage="hrv"} 0', text)
+
+
+class TestAnalysisStages(unittest.TestCase):
+    def test_analysis_observes_each_stage_once(self):
+        before = {name: h.snapshot()[1] for name, h in METRICS.histograms.items()}
+        success, _, _ = ECGProcessor().analyze_signal(detectable_beats(1), 'metrics.dat', cache=None)
+        self.assertTrue(success)
+        after = {name: h.snapshot()[1] for name, h in METRICS.histograms.items()}
+        observed = {name for name in STAGES if after[name] - before[name] == 1}
+        self.assertEqual(observed, {'filter', 'rpeak', 'waves', 'hrv', 'risk', 'serialize'})
+        self.assertEqual(after['load'], before['load'])
+
+    def test_live_session_not_observed(self):
+        # 实时会话的滚动指标计算不在请求汇总内，不计入阶段直方图
+        before = {name: h.snapshot()[1] for name, h in METRICS.histograms.items()}
+        session = LiveSessionRegistry(ECGProcessor).open('int16_le')
+        for chunk in chunked(synthetic_beats(beats=30)[0].astype('<i2').tobytes(), 1000):
+            session.feed(chunk)
+        session.finish()
+        self.assertIsNotNone(session.status()['metrics'])
+        after = {name: h.snapshot()[1] for name, h in METRICS.histograms.items()}
+        self.assertEqual(after, before)
+
+
+if __name__ == '__main__':
+    unittest.main()
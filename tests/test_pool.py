@@ -0,0 +1,100 @@
+import os
+import signal
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import numpy as np
+
+from ecg_pool import AnalysisPool, TIMEOUT_GRACE
+from tests.test_reports import detectable_beats
+from tests.test_stream import synthetic_beats
+
+
+def sleep_task(seconds):
+    """在分析进程中执行的测试任务：占用进程一段时间"""
+    time.sleep(seconds)
+    return os.getpid(), {}
+
+
+class TestAnalysisPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = AnalysisPool(workers=1, timeout=60)
+        cls.pool.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown()
+
+    def setUp(self):
+        self.signal = synthetic_beats(beats=20, seed=int.from_bytes(os.urandom(2), 'little'))[0].astype(np.int16)
+
+    def test_analyze_in_worker(self):
+        success, results, report = self.pool.analyze(self.signal, 'pool.dat', render_report=False)
+        self.assertTrue(success)
+        self.assertEqual(results['basic_info']['samples'], len(self.signal))
+        self.assertIsNone(report['html_report'])
+
+    def test_recovers_from_crashed_worker(self):
+        for process in list(self.pool._get_executor()._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+        success, results, _ = self.pool.analyze(self.signal, 'crash.dat', render_report=False)
+        self.assertFalse(success)
+        # 进程池已重建，后续任务正常执行
+        success, _, _ = self.pool.analyze(self.signal, 'after.dat', render_report=False)
+        self.assertTrue(success)
+
+    def test_reset_resubmits_other_requests(self):
+        # 其他任务导致进程池重建时，在途任务重新提交，不会因BrokenProcessPool失败
+        executor = self.pool._get_executor()
+        long_signal = detectable_beats(int.from_bytes(os.urandom(2), 'little'), seconds=300)
+        outcome = []
+        worker = threading.Thread(target=lambda: outcome.append(
+            self.pool.analyze(long_signal, 'inflight.dat', render_report=False)))
+        worker.start()
+        while not executor._pending_work_items and worker.is_alive():
+            time.sleep(0.001)
+        self.assertTrue(self.pool._reset(executor))
+        worker.join()
+        success, results, _ = outcome[0]
+        self.assertTrue(success, results)
+
+
+class TestAnalysisTimeout(unittest.TestCase):
+    def test_task_timeout_in_worker(self):
+        # 进程内SIGALRM中断超时任务，进程池保留，只有该任务报错
+        pool = AnalysisPool(workers=1, timeout=0.001)
+        try:
+            pool.start()
+            executor = pool._get_executor()
+            long_signal = detectable_beats(int.from_bytes(os.urandom(2), 'little'), seconds=300)
+            start = time.monotonic()
+            success, results, report = pool.analyze(long_signal, 'slow.dat', render_report=False)
+            self.assertFalse(success)
+            self.assertEqual(results['error'], '分析超时')
+            self.assertIsNone(report)
+            self.assertLess(time.monotonic() - start, TIMEOUT_GRACE)
+            self.assertIs(pool._get_executor(), executor)
+        finally:
+            pool.shutdown()
+
+    def test_queue_time_not_counted(self):
+        # 单个分析进程、两个排队任务：各自都不超时，第二个任务的排队时间不计入超时
+        pool = AnalysisPool(workers=1, timeout=1)
+        try:
+            pool.start()
+            executor = pool._get_executor()
+            with mock.patch('ecg_pool.TIMEOUT_GRACE', 0.5), ThreadPoolExecutor(max_workers=2) as threads:
+                futures = [threads.submit(pool._call, sleep_task, 0.9) for _ in range(2)]
+                pids = [future.result() for future in futures]
+            self.assertEqual(len(set(pids)), 1)
+            self.assertIs(pool._get_executor(), executor)
+        finally:
+            pool.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
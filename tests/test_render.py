@@ -0,0 +1,56 @@
+import base64
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from ecg_render import plot_waveform
+from ecg_waveform import compact_waveform, envelope_markers, minmax_decimate
+from tests.test_stream import synthetic_beats
+
+
+class TestMinMaxDecimate(unittest.TestCase):
+    def setUp(self):
+        self.signal, self.r_peaks = synthetic_beats(beats=600)
+
+    def test_keeps_bin_extremes(self):
+        index, bin_size = minmax_decimate(self.signal, 1000)
+        self.assertLessEqual(len(index), 2 * 1000 + 2)
+        self.assertTrue(np.all(np.diff(index) >= 0))
+        for b in range(0, len(self.signal) // bin_size, 97):
+            chunk = self.signal[b * bin_size:(b + 1) * bin_size]
+            kept = self.signal[index[2 * b:2 * b + 2]]
+            self.assertEqual(kept.min(), chunk.min())
+            self.assertEqual(kept.max(), chunk.max())
+
+    def test_short_signal_unchanged(self):
+        index, bin_size = minmax_decimate(self.signal[:500], 1000)
+        self.assertEqual(bin_size, 1)
+        np.testing.assert_array_equal(index, np.arange(500))
+
+    def test_markers_on_envelope(self):
+        index, bin_size = minmax_decimate(self.signal, 1000)
+        vertices = envelope_markers(index, bin_size, self.signal, self.r_peaks)
+        # 每个R峰映射到所在区间的较高顶点，振幅不低于原R峰
+        np.testing.assert_array_equal(index[vertices] // bin_size, self.r_peaks // bin_size)
+        self.assertTrue(np.all(self.signal[index[vertices]] >= self.signal[self.r_peaks]))
+
+    def test_compact_encodings_match(self):
+        delta = compact_waveform(self.signal, 250, {"r": self.r_peaks}, width=800)
+        packed = compact_waveform(self.signal, 250, {"r": self.r_peaks}, width=800, encoding='int16')
+        decoded = np.frombuffer(base64.b64decode(packed['samples']), dtype='<i2')
+        np.testing.assert_array_equal(np.cumsum(delta['samples']), decoded)
+        self.assertEqual(delta['annotations'], packed['annotations'])
+        self.assertLessEqual(np.abs(decoded * packed['scale']).max(), np.abs(self.signal).max() + packed['scale'])
+
+    def test_plot_long_recording(self):
+        signal = np.tile(self.signal, 10)
+        r_peaks = (np.arange(10)[:, None] * len(self.signal) + self.r_peaks).ravel()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = plot_waveform(os.path.join(tmp, "ecg_waveform.png"), signal, 250, r_peaks)
+            self.assertGreater(os.path.getsize(path), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import io
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import numpy as np
+
+from ecg_processor import DISEASE_RULES, ECGProcessor, REPORT_HTML, load_report_waveform, report_artifact_path, shared_config
+from tests.test_stream import synthetic_beats
+
+
+class TestLazyReports(unittest.TestCase):
+    def test_artifacts_rendered_on_demand(self):
+        processor = ECGProcessor()
+        signal = synthetic_beats(beats=20, seed=7)[0].astype(np.int16)
+        success, _, report = processor.analyze_signal(signal, 'lazy.dat', cache=None)
+        self.assertTrue(success)
+        self.assertIsNone(report['html_report'])
+
+        report_id = report['report_id']
+        html_path = report_artifact_path(report_id, REPORT_HTML)
+        if os.path.exists(html_path):
+            os.remove(html_path)
+        self.assertEqual(processor.render_artifact(report_id, REPORT_HTML), html_path)
+        with open(html_path, encoding='utf-8') as f:
+            self.assertIn('lazy.dat', f.read())
+
+    def test_compact_waveform(self):
+        processor = ECGProcessor()
+        signal, r_peaks = synthetic_beats(beats=200, seed=3)
+        success, results, report = processor.analyze_signal(signal.astype(np.int16), 'wave.dat', cache=None)
+        self.assertTrue(success)
+
+        data = load_report_waveform(report['report_id'], width=500)
+        self.assertEqual(data['length'], len(signal))
+        self.assertEqual(len(data['samples']), 2 * 500)
+        values = np.cumsum(data['samples']) * data['scale']
+        self.assertEqual(values.max(), signal.astype(np.int16).max())
+        self.assertEqual(len(data['annotations']['r']), len(results['wave_features']['r_peaks']))
+        self.assertIsNone(load_report_waveform('0' * 24))
+
+    def test_rejects_unknown_reports(self):
+        processor = ECGProcessor()
+        self.assertIsNone(processor.render_artifact('../../etc', REPORT_HTML))
+        self.assertIsNone(processor.render_artifact('0' * 24, REPORT_HTML))
+        self.assertIsNone(report_artifact_path('0' * 24, 'results.json'))
+
+
+def detectable_beats(seed, fs=250, seconds=30):
+    """R波较宽、心率较慢的合成心电（_detect_r_peaks 的宽度/阈值条件能检出）"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(seconds * fs)
+    signal = rng.normal(0, 20, len(t))
+    for r in (np.cumsum(rng.uniform(1.3, 1.7, int(seconds / 1.7))) * fs).astype(int):
+        signal += 1000 * np.exp(-0.5 * ((t - r) / 5) ** 2)
+    return signal.astype(np.int16)
+
+
+class TestSharedProcessor(unittest.TestCase):
+    def test_config_shared_and_read_only(self):
+        processor = ECGProcessor()
+        self.assertIs(processor.config, ECGProcessor().config)
+        self.assertIs(processor.config, shared_config(250))
+        with self.assertRaises(TypeError):
+            processor.healthy_ranges['hr'] = (0, 1)
+        with self.assertRaises(TypeError):
+            processor.disease_library['心房颤动']['features']['hr'] = 0
+        with self.assertRaises(AttributeError):
+            processor.fs = 500
+
+    def test_risk_assessment_does_not_mutate_results(self):
+        processor = ECGProcessor()
+        success, results, _ = processor.analyze_signal(detectable_beats(0), 'shared.dat', cache=None)
+        self.assertTrue(success)
+        self.assertIn('qtc', results['wave_features'])
+        wave_features = {k: v for k, v in results['wave_features'].items() if k != 'qtc'}
+        snapshot = dict(wave_features)
+        self.assertEqual(processor._assess_disease_risks({'wave_features': wave_features}), results['disease_risks'])
+        self.assertEqual(wave_features, snapshot)
+
+    def test_concurrent_analysis(self):
+        processor = ECGProcessor()
+        signals = [detectable_beats(seed) for seed in range(4)]
+        expected = [processor.analyze_signal(s, 'shared.dat', cache=None)[1] for s in signals]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(processor.analyze_signal, s, 'shared.dat', cache=None) for s in signals * 2]
+            for i, future in enumerate(futures):
+                success, results, _ = future.result()
+                self.assertTrue(success)
+                self.assertIn('disease_risks', results)
+                self.assertEqual(results['wave_features'], expected[i % 4]['wave_features'])
+                self.assertEqual(results['disease_risks'], expected[i % 4]['disease_risks'])
+    def test_risks_scored_once_per_batch(self):
+        processor = ECGProcessor()
+        records = [{'wave_features': {'hr': hr, 'pr_interval': pr, 'qtc': qtc,
+                                      'qrs_complex': {'width_status': '增宽', 'average_width': width}}}
+                   for hr, pr, qtc, width in ((80, 220, 470, 130), (150, 180, 430, 125), (60, 210, 460, 90))]
+        expected = [processor._assess_disease_risks(record) for record in records]
+        self.assertIn('长QT综合征', expected[0])
+        with mock.patch.object(DISEASE_RULES, 'score', wraps=DISEASE_RULES.score) as score:
+            risks = processor._score_disease_risks([processor._disease_risk_inputs(r) for r in records])
+        self.assertEqual(score.call_count, 1)
+        self.assertEqual(risks, expected)
+
+    def test_analyze_signals_matches_single(self):
+        processor = ECGProcessor()
+        signals = [(detectable_beats(seed), f'batch{seed}.dat') for seed in range(3)]
+        signals.append((detectable_beats(9, seconds=5), 'short.dat'))
+        expected = [processor.analyze_signal(s, name, cache=None) for s, name in signals]
+        with mock.patch.object(processor, '_score_disease_risks', wraps=processor._score_disease_risks) as score:
+            outcomes = processor.analyze_signals(signals, cache=None)
+        self.assertEqual(score.call_count, 1)
+        for (success, results, _), (expected_success, expected_results, _) in zip(outcomes, expected):
+            self.assertEqual(success, expected_success)
+            if success:
+                self.assertEqual(results['disease_risks'], expected_results['disease_risks'])
+                self.assertEqual(results['health_index'], expected_results['health_index'])
+        self.assertFalse(outcomes[-1][0])
+
+
+class TestAppBbbReport(unittest.TestCase):
+    def test_analyze_returns_rendered_report(self):
+        # app_bbb 没有报告文件路由，上传分析的响应必须带有已生成的HTML报告
+        from app_bbb import app
+        from ecg_auth import AUTH_HEADERS
+        from tests.test_auth import signed_params
+        headers = {AUTH_HEADERS[field]: value for field, value in signed_params(os.urandom(8).hex()).items()}
+        upload = (io.BytesIO(detectable_beats(5).astype('<i2').tobytes()), 'bbb.dat')
+        response = app.test_client().post('/api/analyze', headers=headers, data={'file': upload},
+                                          content_type='multipart/form-data')
+        payload = response.get_json()
+        self.assertEqual(payload['code'], 200, payload)
+        self.assertTrue(os.path.exists(payload['data']['html_path']))
+        self.assertEqual(report_artifact_path(payload['data']['report_id'], REPORT_HTML), payload['data']['html_path'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import math
+import unittest
+
+import numpy as np
+
+from ecg_rules import DISEASE_LIBRARY, DISEASE_RULES, compile_condition
+
+
+class TestCompileCondition(unittest.TestCase):
+    def test_thresholds_with_units(self):
+        self.assertEqual(compile_condition('>=3'), ('range', 3.0, math.inf))
+        kind, lo, hi = compile_condition('>120ms')
+        self.assertEqual((kind, hi), ('range', math.inf))
+        self.assertTrue(120 < lo < 120.000001)
+        self.assertEqual(compile_condition('<60')[2], math.nextafter(60.0, -math.inf))
+
+    def test_ranges_booleans_and_categories(self):
+        self.assertEqual(compile_condition((250, 350)), ('range', 250.0, 350.0))
+        self.assertEqual(compile_condition(True), ('range', 1.0, 1.0))
+        self.assertEqual(compile_condition(('倒置', '平坦')), ('category', frozenset({'倒置', '平坦'})))
+        self.assertEqual(compile_condition('正常'), ('category', frozenset({'正常'})))
+
+
+class TestDiseaseRules(unittest.TestCase):
+    def test_library_keys(self):
+        self.assertEqual(len(DISEASE_LIBRARY), 24)
+        for data in DISEASE_LIBRARY.values():
+            self.assertIn(data['risk_level'], ('极低', '低', '中', '中高', '高', '极高'))
+
+    def test_evaluate(self):
+        flutter = DISEASE_RULES.evaluate('心房扑动', {'hr': 300, 'f_waves': True})
+        self.assertEqual(flutter['score'], 10)
+        self.assertEqual(flutter['features'], ['hr=300', 'f_waves=True'])
+        vt = DISEASE_RULES.evaluate('室性心动过速', {'hr': 100, 'qrs_width': 130, 'consecutive': 3})
+        self.assertEqual(vt['score'], 10)
+        self.assertEqual(vt['features'], ['qrs_width=130', 'consecutive=3'])
+        ischemia = DISEASE_RULES.evaluate('心肌缺血', {'t_waves': '平坦', 'st_segment': {'status': '压低'}})
+        self.assertEqual(ischemia['score'], 8)
+        self.assertIsNone(DISEASE_RULES.evaluate('未知', {}))
+
+    def test_batch_matches_single(self):
+        rng = np.random.default_rng(0)
+        rows = [{'hr': float(hr), 'qrs_width': float(w), 'pr_interval': float(pr), 'qtc': float(qtc),
+                 't_waves': t, 'f_waves': bool(f)}
+                for hr, w, pr, qtc, t, f in zip(rng.uniform(40, 320, 200), rng.uniform(70, 150, 200),
+                                               rng.uniform(90, 240, 200), rng.uniform(380, 500, 200),
+                                               rng.choice(['倒置', '高尖', '正常'], 200), rng.integers(0, 2, 200))]
+        scores, _ = DISEASE_RULES.score(rows)
+        self.assertEqual(scores.shape, (200, 24))
+        for i in range(0, 200, 17):
+            for disease in DISEASE_RULES.diseases:
+                d = DISEASE_RULES.index[disease]
+                self.assertEqual(round(scores[i, d], 1), DISEASE_RULES.evaluate(disease, rows[i])['score'])
+
+
+if __name__ == '__main__':
+    unittest.main()
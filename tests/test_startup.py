@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_BUDGET_SECONDS = 1.0
+HEAVY_MODULES = ('matplotlib', 'scipy', 'hrvanalysis', 'pandas')
+
+_MEASURE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(','.join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def measure_import(module):
+    """在新的解释器中导入模块，返回 (耗时秒数, 已加载的重量级依赖)"""
+    output = subprocess.run([sys.executable, '-c', _MEASURE.format(module=module, heavy=HEAVY_MODULES)],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stdout.split('\n')
+    return float(output[0]), [name for name in output[1].split(',') if name]
+
+
+class TestStartup(unittest.TestCase):
+    def test_app_import_budget(self):
+        for module in ('app_bbc', 'app'):
+            seconds, heavy = measure_import(module)
+            self.assertEqual(heavy, [], module)
+            self.assertLess(seconds, IMPORT_BUDGET_SECONDS, module)
+
+    def test_processor_import_budget(self):
+        seconds, heavy = measure_import('ecg_processor')
+        self.assertEqual(heavy, [])
+        self.assertLess(seconds, IMPORT_BUDGET_SECONDS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import unittest
+
+import numpy as np
+
+from ecg_loader import load_ecg_recording
+from ecg_stream import OnlineRPeakDetector, StreamingAnalysis, StreamingDecoder
+from tests.test_loader import synthetic_ecg
+
+
+TEST_RECORDING = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'test.dat')
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def synthetic_beats(beats=120, fs=250, seed=0):
+    """带T波、基线漂移和噪声的合成心拍，返回(信号, 真实R峰位置)"""
+    rng = np.random.default_rng(seed)
+    r_peaks = (np.cumsum(rng.uniform(0.6, 1.1, beats)) * fs).astype(int)
+    t = np.arange(r_peaks[-1] + fs)
+    signal = 300 * np.sin(2 * np.pi * 0.3 * t / fs) + rng.normal(0, 20, len(t))
+    for p in r_peaks:
+        signal += 1000 * np.exp(-0.5 * ((t - p) / 3) ** 2)
+        signal += 200 * np.exp(-0.5 * ((t - p - 70) / 12) ** 2)
+    return signal, r_peaks
+
+
+class TestStreamingDecoder(unittest.TestCase):
+    def setUp(self):
+        self.signal = synthetic_ecg(n=5000)
+
+    def _decode(self, data, chunk_size):
+        decoder = StreamingDecoder()
+        parts = [decoder.feed(chunk) for chunk in chunked(data, chunk_size)]
+        parts.append(decoder.finish())
+        return decoder, np.concatenate(parts)
+
+    def test_binary_odd_chunks(self):
+        decoder, samples = self._decode(self.signal.astype('>i2').tobytes(), 777)
+        self.assertEqual(decoder.data_format, 'int16_be')
+        np.testing.assert_array_equal(samples, self.signal)
+
+    def test_ring_text_split_lines(self):
+        lines = [f"seq:{i};ecg:{','.join(map(str, chunk))},"
+                 for i, chunk in enumerate(np.array_split(self.signal, 20))]
+        decoder, samples = self._decode("\n".join(lines).encode('ascii'), 333)
+        self.assertEqual(decoder.data_format, 'ring_text')
+        np.testing.assert_array_equal(samples, self.signal)
+
+
+class TestStreamingAnalysis(unittest.TestCase):
+    def test_matches_zero_phase_filter(self):
+        from scipy.signal import butter, sosfiltfilt
+
+        signal = synthetic_ecg(n=5000)
+        analysis = StreamingAnalysis(fs=250)
+        for chunk in chunked(signal.astype('<i2').tobytes(), 1000):
+            analysis.feed(chunk)
+        ecg_signal, filtered = analysis.finish()
+
+        np.testing.assert_array_equal(ecg_signal, signal)
+        sos = butter(4, [8.0 / 125, 15.0 / 125], btype='band', output='sos')
+        expected = sosfiltfilt(sos, signal.astype(np.float64))
+        # 两端的瞬态不同，比较中间段
+        np.testing.assert_allclose(filtered[500:-500], expected[500:-500], atol=1.0)
+
+
+class TestOnlineRPeakDetector(unittest.TestCase):
+    def test_detects_all_beats_any_chunk_size(self):
+        signal, r_peaks = synthetic_beats()
+        results = []
+        for size in (1, 37, 1000):
+            detector = OnlineRPeakDetector(fs=250)
+            results.append(np.concatenate([detector.push(c) for c in chunked(signal, size)]))
+
+        for detected in results[1:]:
+            np.testing.assert_array_equal(detected, results[0])
+        self.assertEqual(len(results[0]), len(r_peaks))
+        self.assertLessEqual(np.abs(results[0] - r_peaks).max(), 2)
+
+    def test_real_recording_independent_of_chunking(self):
+        # 真实记录（含开头的噪声段）：首块大小不同时学习期阈值和检测结果都不变
+        signal = np.asarray(load_ecg_recording(TEST_RECORDING, fs=250).signal, dtype=np.float64)
+        results = []
+        for first, size in ((1, 1), (100, 100), (625, 100), (3000, 2000), (len(signal), 1)):
+            detector = OnlineRPeakDetector(fs=250)
+            parts = [detector.push(signal[:first])] + [detector.push(c) for c in chunked(signal[first:], size)]
+            results.append(np.concatenate(parts))
+
+        for detected in results[1:]:
+            np.testing.assert_array_equal(detected, results[0])
+        self.assertGreater(len(results[0]), 40)
+        # 输出严格递增，相邻R峰间隔大于不应期（同一R峰不会输出两次）
+        self.assertGreater(np.diff(results[0]).min(), OnlineRPeakDetector.REFRACTORY_SECONDS * 250)
+
+    def test_bounded_latency(self):
+        signal, r_peaks = synthetic_beats(beats=30)
+        detector = OnlineRPeakDetector(fs=250)
+        latencies = []
+        for start, chunk in zip(range(0, len(signal), 10), chunked(signal, 10)):
+            for peak in detector.push(chunk):
+                latencies.append(start + len(chunk) - peak)
+        # 学习期之后每个R峰在0.5秒内输出
+        self.assertLessEqual(max(latencies[3:]), 125)
+
+
+if __name__ == '__main__':
+    unittest.main()